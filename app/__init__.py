@@ -16,13 +16,84 @@ def create_app(config_name: str = 'default') -> Flask:
     """
     app = Flask(__name__)
     
+    # Validate, spool and decode uploads while the multipart body streams in
+    from app.utils.uploads import UploadRequest
+    app.request_class = UploadRequest
+    
     # Load configuration
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
     
+    # Load pricing rules once at startup (hot-reloaded on file change)
+    from app.services.pricing_rules import pricing_rules
+    pricing_rules.init_app(app)
+    
+    # Storage for processed pictures and generated PDFs (local, memory or S3)
+    from app.services.storage import init_storage
+    init_storage(app)
+    
+    # Autosaved form drafts in SQLite (no-op unless enabled)
+    from app.services.drafts import init_drafts
+    init_drafts(app)
+    
+    # Compressed, indexed archive of generated PDFs (no-op unless enabled)
+    from app.services.archive import init_archive
+    init_archive(app)
+    
+    # Cached proposal layouts, completed per client (no-op unless enabled)
+    from app.services.pdf_layouts import init_pdf_layouts
+    init_pdf_layouts(app)
+    
+    # Rate limits, build slots and idempotency keys for the heavy endpoints (no-op unless enabled)
+    from app.utils.admission import init_admission
+    init_admission(app)
+    
+    # Identical submissions share the build already running (no-op unless enabled)
+    from app.utils.inflight import init_inflight
+    init_inflight(app)
+    
+    # Minified, fingerprinted and precompressed static assets (no-op unless enabled)
+    from app.utils.assets import init_assets
+    init_assets(app)
+    
+    # Streaming brotli/gzip compression of text responses (no-op unless enabled)
+    from app.utils.http_cache import init_http_cache
+    init_http_cache(app)
+    
+    # Request-phase timing instrumentation (no-op unless enabled)
+    from app.utils.timing import init_timing
+    init_timing(app)
+    
+    # Prometheus metrics endpoint (no-op unless enabled)
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Profiles of slow or sampled requests (no-op unless enabled)
+    from app.utils.profiling import init_profiling
+    init_profiling(app)
+    
+    # Per-phase memory tracking and /debug/memory (no-op unless enabled)
+    from app.utils.memory import init_memory_profiling
+    init_memory_profiling(app)
+    
     # Register blueprints
     from app.routes.main import main_bp
     app.register_blueprint(main_bp)
     
+    # Service worker, manifest and offline pricing rules (no-op unless enabled)
+    if app.config['PWA_ENABLED']:
+        from app.routes.pwa import pwa_bp
+        app.register_blueprint(pwa_bp)
+    
+    # Draft autosave and regenerate-from-draft API (no-op unless enabled)
+    if app.config['DRAFTS_ENABLED']:
+        from app.routes.drafts import drafts_bp
+        app.register_blueprint(drafts_bp)
+    
+    # Archive search and download API (no-op unless enabled)
+    if app.config['ARCHIVE_ENABLED']:
+        from app.routes.archive import archive_bp
+        app.register_blueprint(archive_bp)
+    
     return app
 
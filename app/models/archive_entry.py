@@ -0,0 +1,45 @@
+"""Typed data model for an archived PDF."""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass(slots=True)
+class ArchiveEntry:
+    """
+    Index record of one generated PDF kept in the archive.
+
+    Text fields hold the values as entered; searches match them
+    case-insensitively by prefix.
+    """
+
+    id: str
+    kind: str  # 'proposal' or 'comparison'
+    file_name: str  # Download name the PDF was first sent under
+    client_name: str
+    email: str
+    # The form has no project name; a project is identified by its address (first line)
+    project: str = ''
+    brand: str = ''
+    unit: str = ''
+    # A comparison is indexed by its lowest unit TCP
+    tcp: Optional[float] = None
+    created: float = 0.0
+    size: int = 0  # PDF bytes
+    stored_size: int = 0  # Bytes added to the archive storage
+    format: str = 'gzip'  # How the PDF is kept (see archive.FORMATS)
+
+    def to_dict(self) -> Dict:
+        """JSON form returned by the archive API."""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'file_name': self.file_name,
+            'client_name': self.client_name,
+            'email': self.email,
+            'project': self.project,
+            'brand': self.brand,
+            'unit': self.unit,
+            'tcp': self.tcp,
+            'created': self.created,
+            'size': self.size
+        }
@@ -0,0 +1,54 @@
+"""Typed data model for a multi-unit comparison."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.models.proposal import Proposal
+
+
+@dataclass(slots=True)
+class ComparisonUnit:
+    """
+    One unit in a comparison and its payment-scheme figures.
+
+    Scheme figures are rows of ComputationService.compute_grid output for
+    this unit; term-based schemes are keyed by months (or years for the 80%
+    balance). A scheme that is not shown is None or empty.
+    """
+
+    label: str
+    tcp: float
+    reservation_fee: float
+    # (label, value) pairs shown under the unit's heading, e.g. ('Floor Area', '32 sqm')
+    details: List[Tuple[str, str]] = field(default_factory=list)
+
+    # Derived once from the contract details and pricing rules
+    tlp: float = 0.0
+    registration_fee: float = 0.0
+    move_in_fee: float = 0.0
+
+    spot_cash: Optional[Dict[str, float]] = None
+    spot_down_payment: Optional[Dict[str, float]] = None
+    deferred_payment: Dict[int, Dict[str, float]] = field(default_factory=dict)
+    payment_20_80: Dict[int, Dict[str, float]] = field(default_factory=dict)
+    balance_80: Dict[int, Dict[str, float]] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class Comparison:
+    """
+    Several units of one project, rendered as a single PDF.
+
+    ``base`` holds what the units share: client and project details,
+    fee percentages and the picture. Its own scheme results are not computed.
+    """
+
+    base: Proposal
+    units: List[ComparisonUnit]
+
+    # Scheme inputs shared by every unit
+    spot_cash_discount: Optional[float] = None
+    spot_down_discount: Optional[float] = None
+    deferred_terms: List[int] = field(default_factory=list)
+    payment_20_80_terms: List[int] = field(default_factory=list)
+    # (years, interest rate %) of each 80% balance term shown
+    balance_80_terms: List[Tuple[int, float]] = field(default_factory=list)
@@ -0,0 +1,41 @@
+"""Typed data model for a saved form draft."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Draft:
+    """
+    Form state saved while an agent fills in a proposal.
+
+    Fields are the values /generate-proposal takes (without the uploads).
+    Uploaded photos are kept as the one processed picture built from them,
+    along with the name and SHA-256 of each source file, so uploading the
+    same photos again is recognised and skipped.
+    """
+
+    id: str
+    revision: int
+    fields: Dict[str, str] = field(default_factory=dict)
+    picture_key: Optional[str] = None  # In the pictures storage area
+    # [{'file': name, 'sha256': hex}] of the uploads the picture was built from
+    pictures: List[Dict[str, str]] = field(default_factory=list)
+    # [{'file': name, 'reason': why}] of uploads left out of the picture
+    rejected: List[Dict[str, str]] = field(default_factory=list)
+    created: float = 0.0
+    updated: float = 0.0
+    # Secret required by every later call; only known when the draft is created
+    token: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """JSON form returned by the drafts API (storage keys are not exposed)."""
+        left_out = {item['file'] for item in self.rejected}
+        return {
+            'id': self.id,
+            'revision': self.revision,
+            'fields': self.fields,
+            'pictures': [source['file'] for source in self.pictures if source['file'] not in left_out],
+            'rejected': self.rejected,
+            'updated': self.updated,
+            **({'token': self.token} if self.token else {})
+        }
@@ -0,0 +1,65 @@
+"""Typed data model for a single proposal."""
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+
+@dataclass(slots=True)
+class Proposal:
+    """
+    All form inputs and derived values needed to render one proposal.
+    
+    Built once per request by ProposalService and shared by the route,
+    computation and PDF layers. Scheme results are None when the scheme is
+    not shown.
+    """
+    
+    # Client details
+    client_name: str
+    email: str
+    contact_no: str = ''
+    
+    # Project details
+    product_type: str = ''
+    project_type: str = ''
+    brand: str = ''
+    address: str = ''
+    property_details: str = ''
+    tower_building: str = ''
+    floor_unit: str = ''
+    floor_area: str = ''
+    phase: str = ''
+    block_lot: str = ''
+    house_model: str = ''
+    lot_area: str = ''
+    project_advantages: str = ''
+    picture_key: Optional[str] = None  # In the pictures storage area
+    
+    # Contract details
+    tcp: float = 0.0
+    reservation_fee: float = 0.0
+    registration_fee_percent: float = 0.0
+    move_in_fee_percent: float = 0.0
+    use_tlp_toggle: bool = False
+    
+    # Derived once from the contract details and pricing rules
+    tlp: float = 0.0
+    registration_fee: float = 0.0
+    move_in_fee: float = 0.0
+    rules_version: str = ''
+    
+    # Payment scheme computations
+    spot_cash: Optional[Dict[str, Any]] = None
+    deferred_payment: Optional[Dict[str, Any]] = None
+    spot_down_payment: Optional[Dict[str, Any]] = None
+    payment_20_80: Optional[Dict[str, Any]] = None
+    balance_80_amortizations: List[Dict[str, Any]] = field(default_factory=list)
+    
+    @property
+    def is_vertical(self) -> bool:
+        """Whether this is a Vertical (condominium) proposal."""
+        return self.product_type == 'Vertical'
+    
+    @property
+    def is_house_and_lot(self) -> bool:
+        """Whether this is a Horizontal House and Lot proposal."""
+        return not self.is_vertical and self.project_type == 'House and Lot'
@@ -0,0 +1,135 @@
+"""Routes for the PDF archive: searching archived proposals and downloading them again."""
+import hmac
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.services.archive import SEARCH_FIELDS, get_archive
+
+archive_bp = Blueprint('archive', __name__)
+
+# Most entries returned by one search
+MAX_PAGE_SIZE = 500
+
+
+def _not_found():
+    """404 response for an unknown archive entry."""
+    return jsonify({
+        'success': False,
+        'message': 'Archived proposal not found'
+    }), 404
+
+
+@archive_bp.before_request
+def require_token():
+    """
+    Only serve requests that carry ARCHIVE_API_TOKEN as a bearer token.
+
+    The archive holds client details, so without a configured token the
+    API answers 403 to everyone.
+    """
+    token = current_app.config['ARCHIVE_API_TOKEN']
+    if not token:
+        return jsonify({
+            'success': False,
+            'message': 'Archive API is disabled (ARCHIVE_API_TOKEN is not set)'
+        }), 403
+
+    auth = request.authorization
+    if auth is None or auth.type != 'bearer' or not hmac.compare_digest(
+        (auth.token or '').encode('utf-8'), token.encode('utf-8')
+    ):
+        response = jsonify({'success': False, 'message': 'Invalid or missing archive token'})
+        response.status_code = 401
+        response.headers['WWW-Authenticate'] = 'Bearer realm="archive"'
+        return response
+    return None
+
+
+def _timestamp(value: Optional[str], end_of_day: bool = False) -> Optional[float]:
+    """
+    Parse an ISO date or date-time query parameter into Unix seconds (local time).
+
+    Args:
+        value: Parameter value, e.g. '2025-03-01' or '2025-03-01T14:30'
+        end_of_day: Turn a plain date into the start of the next day
+
+    Raises:
+        ValueError: If the value is not an ISO date
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+def _number(name: str) -> Optional[float]:
+    """Parse an optional numeric query parameter."""
+    value = request.args.get(name)
+    return float(value) if value else None
+
+
+@archive_bp.route('/api/archive')
+def search_archive():
+    """
+    Search archived PDFs, newest first.
+
+    Query parameters: ``client``, ``email``, ``project``, ``brand`` and
+    ``unit`` match by prefix (case-insensitive); ``from`` and ``to`` are ISO
+    dates (``to`` inclusive) or date-times; ``tcp_min`` and ``tcp_max`` bound
+    the TCP; ``limit`` and ``before`` (the ``next`` value of the previous
+    page) page through the results.
+
+    Returns:
+        JSON with the matching entries and the cursor of the next page
+    """
+    try:
+        limit = min(int(request.args.get('limit') or current_app.config['ARCHIVE_PAGE_SIZE']), MAX_PAGE_SIZE)
+        entries = get_archive().search(
+            prefixes={name: request.args[name] for name in SEARCH_FIELDS if request.args.get(name)},
+            since=_timestamp(request.args.get('from')),
+            until=_timestamp(request.args.get('to'), end_of_day=True),
+            tcp_min=_number('tcp_min'),
+            tcp_max=_number('tcp_max'),
+            limit=max(1, limit),
+            before=request.args.get('before')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid search: {str(e)}'}), 400
+
+    return jsonify({
+        'success': True,
+        'data': [entry.to_dict() for entry in entries],
+        'next': entries[-1].id if len(entries) == limit else None
+    })
+
+
+@archive_bp.route('/api/archive/<entry_id>')
+def get_archived(entry_id: str):
+    """Return the index record of an archived PDF."""
+    entry = get_archive().get(entry_id)
+    if entry is None:
+        return _not_found()
+    return jsonify({'success': True, 'data': entry.to_dict()})
+
+
+@archive_bp.route('/api/archive/<entry_id>/pdf')
+def download_archived(entry_id: str):
+    """
+    Download an archived PDF as it was generated, without rebuilding it.
+
+    Returns:
+        The PDF (gzip content coding when the client accepts it)
+    """
+    archive = get_archive()
+    entry = archive.get(entry_id)
+    if entry is None:
+        return _not_found()
+    try:
+        return archive.send(entry, accept_gzip=request.accept_encodings['gzip'] > 0)
+    except FileNotFoundError:
+        current_app.logger.error(f"Archived PDF {entry_id} is indexed but missing from storage")
+        return _not_found()
@@ -0,0 +1,203 @@
+"""Routes for form drafts: autosave, saved photos and regenerating a proposal from a draft."""
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from app.routes.main import _archive_pdf, _delete_picture, _process_pictures, _send_pdf
+from app.services.drafts import DraftConflict, check_diff, get_drafts
+from app.services.pdf_layouts import get_pdf_layouts
+from app.services.proposal_service import ProposalService
+from app.services.storage import get_storage
+from app.utils.admission import admit
+from app.utils.fingerprint import hash_stream
+from app.utils.image_header import ImageCheck
+from app.utils.timing import phase
+
+drafts_bp = Blueprint('drafts', __name__)
+
+# Header carrying the token returned when a draft is created
+TOKEN_HEADER = 'X-Draft-Token'
+
+
+def _not_found():
+    """404 response for a missing or expired draft."""
+    return jsonify({
+        'success': False,
+        'message': 'Draft not found (it may have expired)'
+    }), 404
+
+
+@drafts_bp.before_request
+def require_token():
+    """
+    Only let the client that created a draft use it.
+
+    Every call on a draft needs the token returned when it was created, in
+    the X-Draft-Token header. A wrong token gets the same 404 as a missing
+    draft, so draft ids cannot be probed.
+    """
+    draft_id = (request.view_args or {}).get('draft_id')
+    if draft_id is not None and not get_drafts().check_token(draft_id, request.headers.get(TOKEN_HEADER, '')):
+        return _not_found()
+    return None
+
+
+@drafts_bp.route('/api/drafts', methods=['POST'])
+def create_draft():
+    """
+    Start a draft from the current form fields.
+
+    Expects JSON ``{fields: {name: value}}``. Drafts not changed for
+    DRAFT_TTL seconds are removed here, with their pictures.
+
+    Returns:
+        JSON with the new draft, including the ``token`` every later call
+        on it must send in X-Draft-Token
+    """
+    drafts = get_drafts()
+    pictures = get_storage('pictures')
+    for picture_key in drafts.purge_expired():
+        _delete_picture(pictures, picture_key)
+
+    try:
+        fields = check_diff({'set': (request.get_json(silent=True) or {}).get('fields')})['set']
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    draft = drafts.create(fields)
+    return jsonify({'success': True, 'data': draft.to_dict()}), 201
+
+
+@drafts_bp.route('/api/drafts/<draft_id>')
+def get_draft(draft_id: str):
+    """Return a draft's fields and saved photos."""
+    draft = get_drafts().get(draft_id)
+    if draft is None:
+        return _not_found()
+    return jsonify({'success': True, 'data': draft.to_dict()})
+
+
+@drafts_bp.route('/api/drafts/<draft_id>', methods=['PATCH'])
+def update_draft(draft_id: str):
+    """
+    Save the fields that changed since a revision.
+
+    Expects JSON ``{revision, set: {name: value}, unset: [name]}``. Only
+    the change is stored.
+
+    Returns:
+        JSON with the new revision, or 409 with the stored draft if it has
+        moved past ``revision``
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        diff = check_diff(data)
+        revision = int(data.get('revision'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        revision = get_drafts().update(draft_id, revision, diff)
+    except DraftConflict as e:
+        return jsonify({
+            'success': False,
+            'message': 'The draft was changed elsewhere',
+            'data': e.draft.to_dict()
+        }), 409
+    if revision is None:
+        return _not_found()
+    return jsonify({'success': True, 'data': {'id': draft_id, 'revision': revision}})
+
+
+@drafts_bp.route('/api/drafts/<draft_id>', methods=['DELETE'])
+def delete_draft(draft_id: str):
+    """Discard a draft and its saved photos."""
+    _delete_picture(get_storage('pictures'), get_drafts().delete(draft_id))
+    return jsonify({'success': True})
+
+
+@drafts_bp.route('/api/drafts/<draft_id>/pictures', methods=['PUT'])
+@admit
+def save_pictures(draft_id: str):
+    """
+    Process a draft's photos (``pictures``, as for /generate-proposal) once.
+
+    The processed picture replaces the draft's previous one. Sending the
+    same files again (same names and content) keeps it without reprocessing.
+
+    Returns:
+        JSON with the draft's photos and any that were left out
+    """
+    drafts = get_drafts()
+    pictures = get_storage('pictures')
+    try:
+        draft = drafts.get(draft_id)
+        if draft is None:
+            return _not_found()
+
+        with phase('parse'):
+            files = [f for f in request.files.getlist('pictures') if f and f.filename]
+            sources = [{'file': f.filename, 'sha256': hash_stream(f.stream)} for f in files]
+        if sources == draft.pictures and (draft.picture_key or not sources):
+            return jsonify({'success': True, 'data': draft.to_dict()})
+
+        picture_key, rejected = _process_pictures(files, pictures)
+        rejected = [{'file': check.filename, 'reason': check.reason} for check in rejected]
+        try:
+            replaced = drafts.set_picture(draft_id, picture_key, sources, rejected)
+        except KeyError:
+            # Draft removed while the photos were processed
+            _delete_picture(pictures, picture_key)
+            return _not_found()
+        _delete_picture(pictures, replaced)
+
+        return jsonify({'success': True, 'data': drafts.get(draft_id).to_dict()})
+
+    except HTTPException as e:
+        current_app.logger.warning(f"Rejected draft upload: {e.description}")
+        return jsonify({'success': False, 'message': e.description}), e.code
+
+    except Exception as e:
+        current_app.logger.error(f"Error saving draft photos: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error saving photos: {str(e)}'}), 500
+
+
+@drafts_bp.route('/api/drafts/<draft_id>/generate', methods=['POST'])
+@admit
+def generate_from_draft(draft_id: str):
+    """
+    Generate the proposal PDF from a saved draft.
+
+    The draft's processed picture is reused, so a retry only recomputes
+    the figures and rebuilds the PDF. The draft is kept.
+
+    Returns:
+        The PDF, or JSON with an error message
+    """
+    from app.services.pdf_service import PDFService
+
+    drafts = get_drafts()
+    try:
+        draft = drafts.get(draft_id)
+        if draft is None:
+            return _not_found()
+
+        with phase('compute'):
+            proposal = ProposalService().build(draft.fields, draft.picture_key)
+
+        proposals = get_storage('proposals')
+        pdf_service = PDFService(
+            storage=proposals, picture_storage=get_storage('pictures'), layouts=get_pdf_layouts()
+        )
+        pdf_key = pdf_service.generate_proposal(proposal)
+
+        archive_id = _archive_pdf(proposals, pdf_key, proposal)
+        with phase('response'):
+            rejected = [ImageCheck(item['file'], False, item['reason']) for item in draft.rejected]
+            return _send_pdf(proposals, pdf_key, rejected if draft.picture_key else [], archive_id)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating proposal from draft: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error generating proposal: {str(e)}'
+        }), 500
@@ -1,25 +1,39 @@
 """Main routes for the application."""
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
-import os
-import tempfile
-from typing import Dict, Any
+import json
+from typing import Dict, Any, List, Optional, Tuple
 
+from app.services.archive import get_archive
 from app.services.computation_service import ComputationService
-from app.services.pdf_service import PDFService
-from app.services.image_service import ImageService
+from app.services.pdf_layouts import get_pdf_layouts
+from app.services.pricing_rules import pricing_rules
+from app.services.proposal_service import ProposalService
+from app.services.storage import Storage, get_storage
+from app.services.sweep_service import SweepService
+from app.utils import metrics
+from app.utils.admission import admit
+from app.utils.assets import render_page
 from app.utils.file_helper import save_uploaded_file, format_currency
+from app.utils.http_cache import request_etag
+from app.utils.inflight import coalesce
+from app.utils.image_header import ImageCheck
+from app.utils.timing import phase
 
 main_bp = Blueprint('main', __name__)
 
 
 @main_bp.route('/')
 def index():
-    """Render the main form page."""
-    return render_template('index.html')
+    """Render the main form page (rendered once when the asset pipeline is enabled)."""
+    return render_page('index.html')
 
 
 @main_bp.route('/generate-proposal', methods=['POST'])
+@coalesce
+@admit
 def generate_proposal():
     """
     Handle form submission and generate PDF proposal.
@@ -27,249 +41,262 @@ def generate_proposal():
     Returns:
         JSON response with PDF download URL or error message
     """
+    # ReportLab is imported on first use (or by app.warmup.preload)
+    from app.services.pdf_service import PDFService
+    
     try:
-        # Extract form data
-        form_data = request.form.to_dict()
-        
-        # Handle multiple image uploads
-        picture_path = None
-        if 'pictures' in request.files:
+        # Extract form data (parses the multipart body)
+        with phase('parse'):
+            form_data = request.form.to_dict()
             files = request.files.getlist('pictures')
-            if files and any(f.filename for f in files):
-                # Use image service to process images (single or collage)
-                image_service = ImageService(current_app.config['UPLOAD_FOLDER'])
-                picture_path = image_service.process_uploaded_images(files)
-        
-        # Convert numeric fields
-        tcp = float(form_data.get('tcp', 0))
-        reservation_fee = float(form_data.get('reservation_fee', 0))
-        registration_fee_percent = float(form_data.get('registration_fee_percent', 0))
-        move_in_fee_percent = float(form_data.get('move_in_fee_percent', 0))
-        use_tlp_toggle = form_data.get('use_tlp_toggle') == 'on'  # Checkbox value
-        
-        # Get display options
-        show_spot_cash = form_data.get('show_spot_cash') == 'true'
-        show_deferred_payment = form_data.get('show_deferred_payment') == 'true'
-        show_spot_down_payment = form_data.get('show_spot_down_payment') == 'true'
-        show_20_80_payment = form_data.get('show_20_80_payment') == 'true'
-        show_balance_5yr = form_data.get('show_balance_5yr') == 'true'
-        show_balance_7yr = form_data.get('show_balance_7yr') == 'true'
-        show_balance_10yr = form_data.get('show_balance_10yr') == 'true'
         
-        # Initialize computation service
-        comp_service = ComputationService()
-        
-        # Prepare data dictionary
-        data = {
-            'client_name': form_data.get('client_name'),
-            'email': form_data.get('email'),
-            'contact_no': form_data.get('contact_no', ''),
-            'product_type': form_data.get('product_type'),
-            'project_type': form_data.get('project_type', ''),
-            'brand': form_data.get('brand', ''),
-            'address': form_data.get('address', ''),
-            'tcp': tcp,
-            'reservation_fee': reservation_fee,
-            'registration_fee_percent': registration_fee_percent,
-            'move_in_fee_percent': move_in_fee_percent,
-            'picture_path': picture_path,
-            'show_spot_cash': show_spot_cash,
-            'show_deferred_payment': show_deferred_payment,
-            'show_spot_down_payment': show_spot_down_payment,
-            'show_20_80_payment': show_20_80_payment,
-            'show_balance_5yr': show_balance_5yr,
-            'show_balance_7yr': show_balance_7yr,
-            'show_balance_10yr': show_balance_10yr
-        }
-        
-        # Add product-specific fields
-        if form_data.get('product_type') == 'Vertical':
-            data.update({
-                'property_details': form_data.get('property_details_vertical', ''),
-                'tower_building': form_data.get('tower_building', ''),
-                'floor_unit': form_data.get('floor_unit', ''),
-                'floor_area': form_data.get('floor_area', ''),
-                'project_advantages': form_data.get('project_advantages', '')
-            })
-        else:  # Horizontal
-            data.update({
-                'phase': form_data.get('phase', ''),
-                'block_lot': form_data.get('block_lot', ''),
-                'project_advantages': form_data.get('project_advantages_horiz', '')
-            })
+        pictures = get_storage('pictures')
+        proposals = get_storage('proposals')
+        picture_key = None
+        try:
+            # Handle multiple image uploads (single or collage)
+            picture_key, rejected = _process_pictures(files, pictures)
             
-            if form_data.get('project_type') == 'House and Lot':
-                data.update({
-                    'house_model': form_data.get('house_model', ''),
-                    'property_details': form_data.get('property_details', ''),
-                    'lot_area': form_data.get('lot_area', ''),
-                    'floor_area': form_data.get('floor_area', '')
-                })
-            else:  # Lot
-                data['lot_area'] = form_data.get('lot_area', '')
-        
-        # Compute Spot Cash if discount provided and checkbox is checked
-        if show_spot_cash and form_data.get('spot_cash_discount'):
-            discount = float(form_data.get('spot_cash_discount', 0))
-            spot_cash_data = comp_service.compute_spot_cash(
-                tcp, discount, reservation_fee,
-                registration_fee_percent, move_in_fee_percent,
-                use_tlp_toggle
-            )
-            data['spot_cash_data'] = spot_cash_data
-        
-        # Compute Deferred Payment if terms provided and checkbox is checked
-        if show_deferred_payment:
-            deferred_terms = []
-            if form_data.get('deferred_term1'):
-                term1 = int(form_data.get('deferred_term1'))
-                if term1 > 0:
-                    deferred_terms.append(term1)
-            if form_data.get('deferred_term2'):
-                term2 = int(form_data.get('deferred_term2'))
-                if term2 > 0:
-                    deferred_terms.append(term2)
-            if form_data.get('deferred_term3'):
-                term3 = int(form_data.get('deferred_term3'))
-                if term3 > 0:
-                    deferred_terms.append(term3)
+            # Build the proposal model and all computations in one pass
+            with phase('compute'):
+                proposal = ProposalService().build(form_data, picture_key)
             
-            if deferred_terms:
-                deferred_data = comp_service.compute_deferred_payment(
-                    tcp, reservation_fee,
-                    registration_fee_percent, move_in_fee_percent,
-                    deferred_terms,
-                    use_tlp_toggle
-                )
-                data['deferred_payment_data'] = deferred_data
+            # Generate PDF into the proposals storage
+            pdf_service = PDFService(storage=proposals, picture_storage=pictures, layouts=get_pdf_layouts())
+            pdf_key = pdf_service.generate_proposal(proposal)
+        finally:
+            _delete_picture(pictures, picture_key)
         
-        # Compute Spot Down Payment if discount provided and checkbox is checked
-        if show_spot_down_payment and form_data.get('spot_down_discount'):
-            discount = float(form_data.get('spot_down_discount', 0))
-            spot_down_data = comp_service.compute_spot_down_payment(
-                tcp, discount, reservation_fee,
-                registration_fee_percent, move_in_fee_percent,
-                use_tlp_toggle
-            )
-            data['spot_down_payment_data'] = spot_down_data
+        archive_id = _archive_pdf(proposals, pdf_key, proposal)
+        with phase('response'):
+            return _send_pdf(proposals, pdf_key, rejected, archive_id)
+    
+    except HTTPException as e:
+        # Upload rejected while streaming in (too large)
+        current_app.logger.warning(f"Rejected proposal upload: {e.description}")
+        return jsonify({
+            'success': False,
+            'message': e.description
+        }), e.code
+    
+    except ValueError as e:
+        # Bad form values (e.g. a non-numeric TCP) or no usable photos
+        current_app.logger.warning(f"Rejected proposal: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error generating proposal: {str(e)}'
+        }), 400
+    
+    except Exception as e:
+        current_app.logger.error(f"Error generating proposal: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error generating proposal: {str(e)}'
+        }), 500
+
+
+@main_bp.route('/generate-comparison', methods=['POST'])
+@coalesce
+@admit
+def generate_comparison():
+    """
+    Generate one PDF comparing several units of the same project.
+    
+    Accepts the proposal form (multipart, with optional ``pictures``) or a
+    JSON object with the same fields. Either way, ``units`` is a list (a
+    JSON string in a form) of per-unit fields: ``tcp`` and optionally
+    ``label``, ``reservation_fee`` and the unit details.
+    
+    Returns:
+        The comparison PDF, or JSON with an error message
+    """
+    from app.services.pdf_service import PDFService
+    
+    try:
+        with phase('parse'):
+            if request.is_json:
+                data = request.get_json() or {}
+                if not isinstance(data, dict):
+                    raise ValueError("Expected a JSON object of form fields")
+                # Same string values as the form fields ('true', '12', ...)
+                form_data = {key: value if isinstance(value, str) else json.dumps(value) for key, value in data.items()}
+                units = data.get('units')
+                files = []
+            else:
+                form_data = request.form.to_dict()
+                units = json.loads(form_data.get('units') or '[]')
+                files = request.files.getlist('pictures')
+            form_data.pop('units', None)
         
-        # Compute 20/80 Payment if terms provided and checkbox is checked
-        if show_20_80_payment:
-            payment_20_80_terms = []
-            if form_data.get('payment_20_80_term1'):
-                term1 = int(form_data.get('payment_20_80_term1'))
-                if term1 > 0:
-                    payment_20_80_terms.append(term1)
-            if form_data.get('payment_20_80_term2'):
-                term2 = int(form_data.get('payment_20_80_term2'))
-                if term2 > 0:
-                    payment_20_80_terms.append(term2)
-            if form_data.get('payment_20_80_term3'):
-                term3 = int(form_data.get('payment_20_80_term3'))
-                if term3 > 0:
-                    payment_20_80_terms.append(term3)
+        pictures = get_storage('pictures')
+        proposals = get_storage('proposals')
+        picture_key = None
+        try:
+            picture_key, rejected = _process_pictures(files, pictures)
             
-            if payment_20_80_terms:
-                payment_20_80_data = comp_service.compute_20_80_payment(
-                    tcp, reservation_fee,
-                    registration_fee_percent, move_in_fee_percent,
-                    payment_20_80_terms,
-                    use_tlp_toggle
+            # All units are computed together through the grid (batch) path
+            with phase('compute'):
+                comparison = ProposalService().build_comparison(
+                    form_data, units, picture_key,
+                    max_units=current_app.config['COMPARISON_MAX_UNITS']
                 )
-                data['payment_20_80_data'] = payment_20_80_data
-        
-        # Compute 80% balance amortizations with static terms and factor rates
-        # Only include if Spot Down Payment or 20/80 Payment is selected
-        balance_80_amortizations = []
-        
-        if show_spot_down_payment or show_20_80_payment:
-            # Calculate registration fee for 80% balance
-            if tcp <= 3600000:
-                tlp = tcp
-            else:
-                tlp = tcp / 1.12
             
-            if use_tlp_toggle:
-                reg_fee_for_80 = tlp * (registration_fee_percent / 100)
-            else:
-                reg_fee_for_80 = tcp * (registration_fee_percent / 100)
-            
-            # Static terms with factor rates - only include selected ones
-            static_terms = []
-            if show_balance_5yr:
-                static_terms.append({'years': 5, 'rate': 10})
-            if show_balance_7yr:
-                static_terms.append({'years': 7, 'rate': 13})
-            if show_balance_10yr:
-                static_terms.append({'years': 10, 'rate': 15})
-            
-            for term in static_terms:
-                amort = comp_service.compute_80_balance_amortization(
-                    tcp, term['years'], term['rate'], reg_fee_for_80
-                )
-                balance_80_amortizations.append(amort)
-        
-        # Add 80% balance amortizations to whichever payment method is being used
-        if balance_80_amortizations:
-            if data.get('spot_down_payment_data'):
-                data['spot_down_payment_data']['balance_80_amortizations'] = balance_80_amortizations
-            if data.get('payment_20_80_data'):
-                data['payment_20_80_data']['balance_80_amortizations'] = balance_80_amortizations
-        
-        # Calculate base registration and move-in fees
-        tlp = tcp / 1.12
-        data['registration_fee'] = tlp * (registration_fee_percent / 100)
-        data['move_in_fee'] = tlp * (move_in_fee_percent / 100)
-        
-        # Generate PDF in temporary directory
-        temp_dir = tempfile.gettempdir()
-        pdf_service = PDFService(temp_dir)
-        pdf_path = pdf_service.generate_proposal(data)
-        
-        # Send file directly and delete after sending
-        try:
-            return send_file(
-                pdf_path,
-                as_attachment=True,
-                download_name=os.path.basename(pdf_path),
-                mimetype='application/pdf'
-            )
+            pdf_service = PDFService(storage=proposals, picture_storage=pictures)
+            pdf_key = pdf_service.generate_comparison(comparison)
         finally:
-            # Clean up temporary PDF file after sending
-            try:
-                if os.path.exists(pdf_path):
-                    os.remove(pdf_path)
-            except Exception as e:
-                current_app.logger.warning(f"Could not delete temporary PDF file {pdf_path}: {str(e)}")
-            
-            # Clean up uploaded picture file if it exists
-            if picture_path and os.path.exists(picture_path):
-                try:
-                    os.remove(picture_path)
-                except Exception as e:
-                    current_app.logger.warning(f"Could not delete uploaded picture file {picture_path}: {str(e)}")
+            _delete_picture(pictures, picture_key)
+        
+        archive_id = _archive_pdf(proposals, pdf_key, comparison)
+        with phase('response'):
+            return _send_pdf(proposals, pdf_key, rejected, archive_id)
+    
+    except HTTPException as e:
+        current_app.logger.warning(f"Rejected comparison upload: {e.description}")
+        return jsonify({
+            'success': False,
+            'message': e.description
+        }), e.code
+    
+    except (ValueError, TypeError) as e:
+        # Bad body or units list (not an object, count, TCP, or not valid JSON)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     except Exception as e:
-        current_app.logger.error(f"Error generating proposal: {str(e)}")
+        current_app.logger.error(f"Error generating comparison: {str(e)}")
         return jsonify({
             'success': False,
-            'message': f'Error generating proposal: {str(e)}'
+            'message': f'Error generating comparison: {str(e)}'
         }), 500
 
 
+def _process_pictures(files: List[FileStorage], pictures: Storage) -> Tuple[Optional[str], List[ImageCheck]]:
+    """
+    Turn uploaded photos into one processed picture (single image or collage).
+    
+    Args:
+        files: Uploaded files from the ``pictures`` field
+        pictures: Storage for the processed picture
+        
+    Returns:
+        (storage key or None, uploads that were left out and why)
+    """
+    if not files or not any(f.filename for f in files):
+        return None, []
+    
+    # Pillow is imported on first use (or by app.warmup.preload)
+    from app.services.image_service import ImageService
+    
+    with phase('images'), metrics.rendering('image'):
+        image_service = ImageService(
+            current_app.config['UPLOAD_FOLDER'],
+            max_pixels=current_app.config['UPLOAD_MAX_PIXELS'],
+            storage=pictures
+        )
+        picture_key = image_service.process_uploaded_images(files)
+        return picture_key, image_service.rejected
+
 
+def _delete_picture(pictures: Storage, picture_key: Optional[str]) -> None:
+    """Remove the processed picture once it is embedded in the PDF (or the build failed)."""
+    if not picture_key:
+        return
+    try:
+        pictures.delete(picture_key)
+    except Exception as e:
+        current_app.logger.warning(f"Could not delete uploaded picture {picture_key}: {str(e)}")
 
-@main_bp.route('/api/compute', methods=['POST'])
+
+def _archive_pdf(proposals: Storage, pdf_key: str, document) -> Optional[str]:
+    """
+    Archive a compressed copy of a generated PDF when the archive is enabled.
+    
+    Runs as its own 'archive' phase, so callers must not be inside another
+    phase (phases do not nest).
+    
+    Args:
+        proposals: Storage holding the PDF
+        pdf_key: Storage key of the PDF
+        document: Proposal or Comparison the PDF was built from
+        
+    Returns:
+        Archive id, or None if the PDF was not archived
+    """
+    archive = get_archive()
+    if archive is None:
+        return None
+    try:
+        with phase('archive'):
+            return archive.add(proposals, pdf_key, document).id
+    except Exception as e:
+        # The client still gets the PDF
+        current_app.logger.error(f"Could not archive {pdf_key}: {str(e)}")
+        return None
+
+
+def _send_pdf(proposals: Storage, pdf_key: str, rejected: List[ImageCheck],
+              archive_id: Optional[str] = None) -> Response:
+    """
+    Send a generated PDF and delete it once sent.
+    
+    The PDF is not copied through Python where the storage allows it
+    (sendfile, X-Sendfile or X-Accel-Redirect).
+    
+    Args:
+        proposals: Storage holding the PDF
+        pdf_key: Storage key of the PDF
+        rejected: Uploads left out of the PDF
+        archive_id: Id from _archive_pdf(), sent in the X-Archive-Id header
+        
+    Returns:
+        Download response
+    """
+    response = proposals.send(pdf_key, download_name=pdf_key, mimetype='application/pdf', delete=True)
+    if rejected:
+        # Photos left out of the proposal, and why
+        response.headers['X-Rejected-Uploads'] = json.dumps(
+            [{'file': check.filename, 'reason': check.reason} for check in rejected]
+        )
+    if archive_id:
+        response.headers['X-Archive-Id'] = archive_id
+    return response
+
+
+def _api_inputs(*json_fields: str) -> Dict[str, Any]:
+    """
+    Inputs of an API request: the JSON body of a POST, or the query string of a GET.
+    
+    In a query string every parameter is a field; the ``json_fields`` (lists
+    and objects) are given as JSON text, e.g. ``terms=[{"months": 12}]``.
+    """
+    if request.method == 'POST':
+        return request.get_json()
+    data = request.args.to_dict()
+    for field in json_fields:
+        if field in data:
+            data[field] = json.loads(data[field])
+    return data
+
+
+@main_bp.route('/api/compute', methods=['GET', 'POST'])
+@request_etag(version=pricing_rules.cache_key)
 def compute():
     """
     API endpoint for real-time computations.
     
+    Takes a JSON body (POST) or the same fields as query parameters (GET).
+    Responses carry an ETag derived from the request and the pricing rules,
+    so repeating a GET with If-None-Match gets a 304.
+    
     Returns:
         JSON with computed values
     """
     try:
-        data = request.get_json()
-        comp_service = ComputationService()
+        data = _api_inputs('terms')
+        rules = pricing_rules.resolve(data.get('project_type', ''), data.get('brand', ''))
+        comp_service = ComputationService(rules)
         
         computation_type = data.get('type')
         tcp = float(data.get('tcp', 0))
@@ -321,3 +348,46 @@ def compute():
             'message': str(e)
         }), 400
 
+
+
+@main_bp.route('/api/sweep', methods=['GET', 'POST'])
+@request_etag(version=pricing_rules.cache_key)
+def sweep():
+    """
+    API endpoint for scenario sweeps over a grid of scheme inputs.
+    
+    Expects JSON with ``type`` (scheme), ``inputs`` (fixed values, value lists
+    or ``{start, stop, step}`` ranges), and optional ``metrics``,
+    ``summary_only``, ``use_tlp_toggle``, ``project_type`` and ``brand``,
+    or the same as query parameters. Responses carry an ETag, as for
+    /api/compute.
+    
+    Returns:
+        JSON with the result grid and per-metric summary statistics
+    """
+    try:
+        data = _api_inputs('inputs', 'metrics', 'summary_only', 'use_tlp_toggle')
+        rules = pricing_rules.resolve(data.get('project_type', ''), data.get('brand', ''))
+        sweep_service = SweepService(
+            ComputationService(rules),
+            max_points=current_app.config['SWEEP_MAX_POINTS']
+        )
+        
+        result = sweep_service.sweep(
+            data.get('type'),
+            data.get('inputs', {}),
+            metrics=data.get('metrics'),
+            summary_only=bool(data.get('summary_only', False)),
+            use_tlp_for_reg_fee=bool(data.get('use_tlp_toggle', True))
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
@@ -0,0 +1,80 @@
+"""Routes for the installable, offline-capable app: service worker, manifest and pricing rules."""
+import hashlib
+import json
+
+from flask import Blueprint, Response, jsonify, render_template, url_for
+
+from app.services.pricing_rules import pricing_rules
+from app.utils.http_cache import request_etag
+
+pwa_bp = Blueprint('pwa', __name__)
+
+# Static files the form needs offline, besides the page itself
+SHELL_ASSETS = (
+    'css/style.css',
+    'js/outbox.js',
+    'js/preview.js',
+    'js/script.js',
+    'img/Moldex_Page_Header.jpg',
+    'img/icon.svg',
+)
+
+
+@pwa_bp.route('/sw.js')
+def service_worker():
+    """
+    Serve the service worker from the site root, so it controls every page.
+
+    The app shell URLs are filled in here (fingerprinted when the asset
+    pipeline is enabled), so a new build gives a new worker and cache.
+    """
+    shell = [url_for('main.index'), url_for('pwa.manifest'), url_for('pwa.rules')]
+    shell += [url_for('static', filename=name) for name in SHELL_ASSETS]
+    version = hashlib.sha256('\n'.join(shell).encode('utf-8')).hexdigest()[:12]
+
+    body = render_template(
+        'sw.js',
+        version=version,
+        shell=shell,
+        outbox_url=url_for('static', filename='js/outbox.js')
+    )
+    response = Response(body, mimetype='text/javascript')
+    # Browsers check for a new worker on each visit; never let a cache answer for it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@pwa_bp.route('/manifest.webmanifest')
+def manifest():
+    """Serve the web app manifest that makes the form installable."""
+    body = {
+        'name': 'Moldex Realty - Sample Computation',
+        'short_name': 'Sample Computation',
+        'start_url': url_for('main.index'),
+        'scope': url_for('main.index'),
+        'display': 'standalone',
+        'background_color': '#f9fafb',
+        'theme_color': '#1e3a8a',
+        'icons': [{
+            'src': url_for('static', filename='img/icon.svg'),
+            'sizes': 'any',
+            'type': 'image/svg+xml',
+            'purpose': 'any'
+        }]
+    }
+    return Response(json.dumps(body), mimetype='application/manifest+json')
+
+
+@pwa_bp.route('/api/pricing-rules')
+@request_etag(version=pricing_rules.cache_key)
+def rules():
+    """
+    Serve the pricing rules, so the preview computes with them offline.
+
+    Returns:
+        JSON with the rules version and every rule set
+    """
+    return jsonify({
+        'success': True,
+        'data': pricing_rules.export()
+    })
@@ -0,0 +1,401 @@
+"""Archive of generated PDFs: gzip-compressed in storage, indexed in SQLite."""
+import gzip
+import logging
+import math
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask, Response, current_app
+
+from app.models.archive_entry import ArchiveEntry
+from app.models.comparison import Comparison
+from app.models.proposal import Proposal
+from app.services.object_archive import ObjectArchive
+from app.services.storage import Storage, create_storage
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 64 * 1024
+
+# Above every character, so prefix + _MAX_CHAR bounds all strings starting with prefix
+_MAX_CHAR = '\U0010ffff'
+
+# Most matches counted per filter when planning a search
+_PROBE_LIMIT = 10000
+
+# How PDFs are kept: each one gzip-compressed in storage, or split into objects shared
+# between PDFs (ObjectArchive)
+FORMATS = ('gzip', 'objects')
+
+# Search parameter -> indexed (lowercased) column
+SEARCH_FIELDS = {
+    'client': 'client_key',
+    'email': 'email_key',
+    'project': 'project_key',
+    'brand': 'brand_key',
+    'unit': 'unit_key',
+}
+
+_COLUMNS = 'id, kind, file_name, client_name, email, project, brand, unit, tcp, created, size, stored_size, format'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    client_key TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    project TEXT NOT NULL,
+    project_key TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    brand_key TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    tcp REAL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    format TEXT NOT NULL DEFAULT 'gzip'
+);
+CREATE INDEX IF NOT EXISTS archive_client ON archive (client_key, created);
+CREATE INDEX IF NOT EXISTS archive_email ON archive (email_key, created);
+CREATE INDEX IF NOT EXISTS archive_project ON archive (project_key, created);
+CREATE INDEX IF NOT EXISTS archive_brand ON archive (brand_key, created);
+CREATE INDEX IF NOT EXISTS archive_unit ON archive (unit_key, created);
+CREATE INDEX IF NOT EXISTS archive_created ON archive (created);
+CREATE INDEX IF NOT EXISTS archive_tcp ON archive (tcp);
+"""
+
+
+def describe_unit(proposal: Proposal) -> str:
+    """Unit label of a proposal: tower and floor/unit, or phase and block/lot."""
+    if proposal.is_vertical:
+        parts = (proposal.tower_building, proposal.floor_unit)
+    else:
+        parts = (proposal.phase, proposal.block_lot)
+    return ' '.join(part.strip() for part in parts if part and part.strip())
+
+
+def _first_line(text: str) -> str:
+    """First non-blank line of a multi-line field."""
+    return next((line.strip() for line in text.splitlines() if line.strip()), '')
+
+
+def entry_for(document, file_name: str) -> ArchiveEntry:
+    """
+    Index record for a proposal or comparison (without id, time or sizes).
+
+    Args:
+        document: Proposal or Comparison the PDF was built from
+        file_name: Storage key the PDF was generated under
+
+    Returns:
+        ArchiveEntry to complete and store
+    """
+    if isinstance(document, Comparison):
+        base = document.base
+        kind = 'comparison'
+        unit = ', '.join(unit.label for unit in document.units)
+        tcp = min((unit.tcp for unit in document.units), default=None)
+    else:
+        base = document
+        kind = 'proposal'
+        unit = describe_unit(document)
+        tcp = document.tcp
+    return ArchiveEntry(
+        id='', kind=kind, file_name=file_name, client_name=base.client_name.strip(), email=base.email.strip(),
+        project=_first_line(base.address), brand=base.brand.strip(), unit=unit, tcp=tcp
+    )
+
+
+class ProposalArchive:
+    """
+    Generated PDFs kept for later download.
+
+    Each PDF is stored gzip-compressed under ``<id>.pdf.gz`` in its own
+    storage area; an SQLite index holds the client, project and unit
+    details, the TCP and the time. Searches match text fields by prefix
+    (case-insensitively) and TCP and time by range, all through indexes,
+    so they stay fast with hundreds of thousands of entries. Clients that
+    accept gzip get the stored file as is, with ``Content-Encoding: gzip``.
+
+    In the 'objects' format, PDFs go to an ObjectArchive instead, which
+    keeps the images and pages they share once. Each entry records its
+    format, so switching formats leaves earlier entries readable.
+    """
+
+    def __init__(self, path: str, storage: Storage, compression_level: int = 6, format: str = 'gzip',
+                 objects: Optional[ObjectArchive] = None):
+        """
+        Initialize the archive, creating the index if needed.
+
+        Args:
+            path: SQLite index file
+            storage: Storage for the compressed PDFs
+            compression_level: gzip level (1-9)
+            format: How new PDFs are kept, one of FORMATS
+            objects: Store for the 'objects' format
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown archive format: {format!r} (expected one of {', '.join(FORMATS)})")
+        if format == 'objects' and objects is None:
+            raise ValueError("The 'objects' archive format needs an ObjectArchive")
+        self.path = path
+        self.storage = storage
+        self.compression_level = compression_level
+        self.format = format
+        self.objects = objects
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            # Indexes created before formats were added hold only gzip entries
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(archive)')}
+            if 'format' not in columns:
+                conn.execute("ALTER TABLE archive ADD COLUMN format TEXT NOT NULL DEFAULT 'gzip'")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection in autocommit mode and close it afterwards."""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _blob_key(entry_id: str) -> str:
+        """Storage key of an entry's compressed PDF."""
+        return f"{entry_id}.pdf.gz"
+
+    def add(self, source: Storage, pdf_key: str, document) -> ArchiveEntry:
+        """
+        Archive a generated PDF.
+
+        Args:
+            source: Storage holding the PDF
+            pdf_key: Storage key of the PDF (also its download name)
+            document: Proposal or Comparison it was built from
+
+        Returns:
+            The stored index record
+        """
+        entry = entry_for(document, pdf_key)
+        entry.id = uuid.uuid4().hex
+        entry.created = time.time()
+        entry.format = self.format
+
+        if self.format == 'objects':
+            data = source.read(pdf_key)
+            entry.size = len(data)
+            entry.stored_size = self.objects.put(entry.id, data)
+            self._insert([entry])
+            return entry
+
+        with source.open(pdf_key) as pdf, self.storage.writer(self._blob_key(entry.id)) as fh:
+            # mtime=0 keeps the gzip header free of the time
+            with gzip.GzipFile(fileobj=fh, mode='wb', compresslevel=self.compression_level, mtime=0) as gz:
+                for chunk in iter(lambda: pdf.read(_CHUNK), b''):
+                    gz.write(chunk)
+                    entry.size += len(chunk)
+            entry.stored_size = fh.tell()
+
+        self._insert([entry])
+        return entry
+
+    def _insert(self, entries: List[ArchiveEntry]) -> None:
+        """Add index records."""
+        rows = [
+            (entry.id, entry.kind, entry.file_name, entry.client_name, entry.client_name.lower(),
+             entry.email, entry.email.lower(), entry.project, entry.project.lower(),
+             entry.brand, entry.brand.lower(), entry.unit, entry.unit.lower(),
+             entry.tcp, entry.created, entry.size, entry.stored_size, entry.format)
+            for entry in entries
+        ]
+        with self._connect() as conn:
+            conn.execute('BEGIN')
+            conn.executemany(f'INSERT INTO archive VALUES ({", ".join("?" * 18)})', rows)
+            conn.execute('COMMIT')
+
+    def get(self, entry_id: str) -> Optional[ArchiveEntry]:
+        """Return an index record, or None if there is no such entry."""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {_COLUMNS} FROM archive WHERE id = ?', (entry_id,)).fetchone()
+        return ArchiveEntry(*row) if row else None
+
+    def search(self, prefixes: Optional[Dict[str, str]] = None, since: Optional[float] = None,
+               until: Optional[float] = None, tcp_min: Optional[float] = None, tcp_max: Optional[float] = None,
+               limit: int = 50, before: Optional[str] = None) -> List[ArchiveEntry]:
+        """
+        Find archived PDFs, newest first.
+
+        Args:
+            prefixes: Text prefixes by search field (client, email, project, brand, unit)
+            since: Earliest creation time (Unix seconds, inclusive)
+            until: Latest creation time (Unix seconds, exclusive)
+            tcp_min: Lowest TCP (inclusive)
+            tcp_max: Highest TCP (inclusive)
+            limit: Most entries returned
+            before: Id of the last entry of the previous page
+
+        Returns:
+            Matching index records
+
+        Raises:
+            ValueError: If a search field is unknown
+        """
+        # (column, condition on '{column}', parameters) of the filters with their own index
+        indexed = []
+        for name, prefix in (prefixes or {}).items():
+            if name not in SEARCH_FIELDS:
+                raise ValueError(f"Unknown search field: {name!r} (expected one of {', '.join(SEARCH_FIELDS)})")
+            if not prefix:
+                continue
+            # A range on the indexed column, unlike LIKE, can use its index
+            prefix = prefix.strip().lower()
+            indexed.append((SEARCH_FIELDS[name], '{column} >= ? AND {column} < ?', [prefix, prefix + _MAX_CHAR]))
+        bounds = [(condition, value) for condition, value in (('{column} >= ?', tcp_min), ('{column} <= ?', tcp_max))
+                  if value is not None]
+        if bounds:
+            indexed.append(('tcp', ' AND '.join(condition for condition, _ in bounds), [value for _, value in bounds]))
+
+        conditions, params = [], []
+        for condition, value in (('created >= ?', since), ('created < ?', until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        with self._connect() as conn:
+            # Through a filter's index, every match is sorted by time before the first page is
+            # known; walking the time index newest first instead stops after about
+            # limit / selectivity rows. Counting each filter's matches (up to a cap) and assuming
+            # they are independent tells which is cheaper. A unary + keeps SQLite off an index.
+            by_time = False
+            if indexed:
+                total = conn.execute('SELECT MAX(rowid) FROM archive').fetchone()[0] or 1
+                counts = [
+                    self._count(conn, condition.format(column=column), values, _PROBE_LIMIT)
+                    for column, condition, values in indexed
+                ]
+                combined = total * math.prod(count / total for count in counts)
+                by_time = limit * total / max(combined, 1) < min(counts)
+            for column, condition, values in indexed:
+                conditions.append(condition.format(column=f'+{column}' if by_time else column))
+                params += values
+
+            if before:
+                cursor = conn.execute('SELECT created FROM archive WHERE id = ?', (before,)).fetchone()
+                if cursor is None:
+                    return []
+                conditions.append('created <= ? AND (created < ? OR id < ?)')
+                params += [cursor[0], cursor[0], before]
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            rows = conn.execute(
+                f'SELECT {_COLUMNS} FROM archive {where} ORDER BY created DESC, id DESC LIMIT ?',
+                params + [limit]
+            ).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, condition: str, params: List, limit: int) -> int:
+        """Count rows matching a condition, stopping at ``limit``."""
+        (count,) = conn.execute(
+            f'SELECT COUNT(*) FROM (SELECT 1 FROM archive WHERE {condition} LIMIT ?)', params + [limit]
+        ).fetchone()
+        return count
+
+    def send(self, entry: ArchiveEntry, accept_gzip: bool) -> Response:
+        """
+        Build a download response for an archived PDF, without re-rendering it.
+
+        Args:
+            entry: Entry to send
+            accept_gzip: Whether the client accepts gzip content coding
+
+        Returns:
+            The stored file with ``Content-Encoding: gzip``, or the PDF
+            decompressed (or rebuilt from its objects) as it streams out
+
+        Raises:
+            FileNotFoundError: If the PDF is indexed but not stored
+        """
+        if entry.format == 'objects':
+            if self.objects is None:
+                raise FileNotFoundError(entry.id)
+            try:
+                return self._stream(entry, self.objects.iter_pdf(entry.id))
+            except KeyError:
+                raise FileNotFoundError(entry.id) from None
+
+        key = self._blob_key(entry.id)
+        if accept_gzip:
+            response = self.storage.send(key, download_name=entry.file_name, mimetype='application/pdf')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            return response
+
+        fh = self.storage.open(key)
+
+        def inflate():
+            with gzip.GzipFile(fileobj=fh, mode='rb') as gz:
+                for chunk in iter(lambda: gz.read(_CHUNK), b''):
+                    yield chunk
+
+        response = self._stream(entry, inflate())
+        response.call_on_close(fh.close)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @staticmethod
+    def _stream(entry: ArchiveEntry, chunks: Iterator[bytes]) -> Response:
+        """Download response streaming a PDF's bytes."""
+        response = current_app.response_class(chunks, mimetype='application/pdf', direct_passthrough=True)
+        response.headers['Content-Length'] = str(entry.size)
+        response.headers.set('Content-Disposition', 'attachment', filename=entry.file_name)
+        return response
+
+
+def init_archive(app: Flask) -> None:
+    """
+    Create the PDF archive for an app (no-op unless ARCHIVE_ENABLED).
+
+    Adds the 'archive' storage area; call after init_storage.
+
+    Args:
+        app: Flask application
+    """
+    if not app.config['ARCHIVE_ENABLED']:
+        return
+    config = app.config
+    storage = create_storage(app, 'archive')
+    app.extensions['storage']['archive'] = storage
+
+    objects = None
+    # Opened for reading earlier entries too, after a switch back to gzip
+    if config['ARCHIVE_FORMAT'] == 'objects' or os.path.exists(config['ARCHIVE_OBJECTS_DB_PATH']):
+        objects = ObjectArchive(
+            config['ARCHIVE_OBJECTS_DB_PATH'],
+            compression_level=config['ARCHIVE_COMPRESSION_LEVEL'],
+            min_size=config['ARCHIVE_OBJECT_MIN_SIZE']
+        )
+    app.extensions['archive'] = ProposalArchive(
+        config['ARCHIVE_DB_PATH'],
+        storage,
+        compression_level=config['ARCHIVE_COMPRESSION_LEVEL'],
+        format=config['ARCHIVE_FORMAT'],
+        objects=objects
+    )
+    logger.info(f"Archiving generated PDFs ({config['ARCHIVE_FORMAT']}), indexed in {config['ARCHIVE_DB_PATH']}")
+
+
+def get_archive() -> Optional[ProposalArchive]:
+    """Return the current app's archive, or None if it is disabled."""
+    return current_app.extensions.get('archive')
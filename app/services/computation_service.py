@@ -1,12 +1,23 @@
 """Service for handling real estate computation calculations."""
 from typing import Dict, Any, List, Optional
 
+from app.services.pricing_rules import RuleSet, pricing_rules
+
 
 class ComputationService:
     """Service class for real estate payment computations."""
     
-    @staticmethod
+    def __init__(self, rules: Optional[RuleSet] = None):
+        """
+        Initialize computation service.
+        
+        Args:
+            rules: Pricing rule set to compute with (defaults to the global default rules)
+        """
+        self.rules = rules or pricing_rules.resolve()
+    
     def compute_spot_cash(
+        self,
         tcp: float,
         discount_percent: float,
         reservation_fee: float,
@@ -23,7 +34,7 @@ class ComputationService:
             reservation_fee: Reservation fee amount
             registration_fee_percent: Registration fee percentage
             move_in_fee_percent: Move-in fee percentage
-            use_tlp_for_reg_fee: If True, use Net TCP / 1.12 for reg fee calculation
+            use_tlp_for_reg_fee: If True, use TLP (Net TCP less VAT) for reg fee calculation
             
         Returns:
             Dictionary containing computed values
@@ -33,11 +44,8 @@ class ComputationService:
         ntcp = dtcp  # Net Total Contract Price = DTCP
         dtcp_less_rf = dtcp - reservation_fee  # DTCP - RF (for PDF only)
         
-        # Handle special case: TCP <= 3,600,000
-        if tcp <= 3600000:
-            tlp = dtcp  # TLP = DTCP when TCP <= 3,600,000
-        else:
-            tlp = dtcp / 1.12  # Total List Price (removing 12% VAT)
+        # TLP = DTCP when TCP is within the VAT threshold, otherwise DTCP less VAT
+        tlp = self.rules.total_list_price(dtcp, tcp)
         
         # Calculate Registration Fee based on toggle
         if use_tlp_for_reg_fee:
@@ -67,8 +75,8 @@ class ComputationService:
             'total_payment': total_payment
         }
     
-    @staticmethod
     def compute_spot_down_payment(
+        self,
         tcp: float,
         discount_percent: float,
         reservation_fee: float,
@@ -95,11 +103,8 @@ class ComputationService:
         ndp = down_payment - term_discount - reservation_fee  # Net Down Payment
         balance_80 = tcp * 0.80  # 80% Balance
         
-        # Handle special case: TCP <= 3,600,000
-        if tcp <= 3600000:
-            tlp = tcp  # TLP = TCP when TCP <= 3,600,000
-        else:
-            tlp = tcp / 1.12  # Total List Price
+        # TLP = TCP when TCP is within the VAT threshold, otherwise TCP less VAT
+        tlp = self.rules.total_list_price(tcp, tcp)
         
         # Calculate Registration Fee based on toggle
         if use_tlp_for_reg_fee:
@@ -125,8 +130,8 @@ class ComputationService:
             'net_down_payment': ndp
         }
     
-    @staticmethod
     def compute_deferred_payment(
+        self,
         tcp: float,
         reservation_fee: float,
         registration_fee_percent: float,
@@ -151,11 +156,8 @@ class ComputationService:
         ntcp = tcp  # Net Total Contract Price = TCP (no discount in deferred)
         tcp_less_rf = tcp - reservation_fee  # TCP - RF (for PDF and monthly amortization calculation)
         
-        # Handle special case: TCP <= 3,600,000
-        if tcp <= 3600000:
-            tlp = tcp  # TLP = TCP when TCP <= 3,600,000
-        else:
-            tlp = tcp / 1.12  # Total List Price
+        # TLP = TCP when TCP is within the VAT threshold, otherwise TCP less VAT
+        tlp = self.rules.total_list_price(tcp, tcp)
         
         # Calculate Registration Fee based on toggle
         if use_tlp_for_reg_fee:
@@ -184,8 +186,8 @@ class ComputationService:
             'monthly_amortizations': monthly_amortizations
         }
     
-    @staticmethod
     def compute_20_80_payment(
+        self,
         tcp: float,
         reservation_fee: float,
         registration_fee_percent: float,
@@ -211,11 +213,8 @@ class ComputationService:
         ndp = down_payment - reservation_fee  # Net Down Payment
         balance_80 = tcp * 0.80  # 80% Balance
         
-        # Handle special case: TCP <= 3,600,000
-        if tcp <= 3600000:
-            tlp = tcp  # TLP = TCP when TCP <= 3,600,000
-        else:
-            tlp = tcp / 1.12  # Total List Price
+        # TLP = TCP when TCP is within the VAT threshold, otherwise TCP less VAT
+        tlp = self.rules.total_list_price(tcp, tcp)
         
         # Calculate Registration Fee based on toggle
         if use_tlp_for_reg_fee:
@@ -262,8 +261,8 @@ class ComputationService:
             'with_reg_and_move_in': with_reg_and_move_in
         }
     
-    @staticmethod
     def compute_80_balance_amortization(
+        self,
         tcp: float,
         years: float,
         interest_rate: float,
@@ -272,10 +271,8 @@ class ComputationService:
         """
         Calculate 80% Balance Amortization using Factor Rates.
         
-        Factor Rates:
-        - 1-5 years: 0.0212470447
-        - 6-7 years: 0.0181919633
-        - 8-10 years: 0.0161334957
+        Factor rates per term band come from the active pricing rule set
+        (see app/data/pricing_rules.json).
         
         Formula:
         - MA = 80% Balance * Factor Rate
@@ -292,15 +289,8 @@ class ComputationService:
         """
         balance_80 = tcp * 0.80
         
-        # Determine factor rate based on years
-        if 1 <= years <= 5:
-            factor_rate = 0.0212470447
-        elif 6 <= years <= 7:
-            factor_rate = 0.0181919633
-        elif 8 <= years <= 10:
-            factor_rate = 0.0161334957
-        else:
-            factor_rate = 0  # Invalid term
+        # Determine factor rate based on years (0 for terms outside every band)
+        factor_rate = self.rules.factor_rate(years)
         
         # Calculate MA using factor rate
         monthly_amortization = balance_80 * factor_rate
@@ -355,3 +345,114 @@ class ComputationService:
             'monthly_amortization': monthly_amortization
         }
 
+    
+    # Inputs each scheme accepts in column (grid) form, in axis order
+    GRID_INPUTS = {
+        'spot_cash': ('tcp', 'discount', 'reservation_fee', 'registration_fee_percent', 'move_in_fee_percent'),
+        'spot_down_payment': ('tcp', 'discount', 'reservation_fee', 'registration_fee_percent', 'move_in_fee_percent'),
+        'deferred_payment': ('tcp', 'reservation_fee', 'registration_fee_percent', 'move_in_fee_percent', 'term'),
+        '20_80_payment': ('tcp', 'reservation_fee', 'registration_fee_percent', 'move_in_fee_percent', 'term'),
+        '80_balance': ('tcp', 'years', 'registration_fee_percent'),
+    }
+    
+    def compute_grid(
+        self,
+        scheme: str,
+        columns: Dict[str, List[float]],
+        use_tlp_for_reg_fee: bool = True
+    ) -> Dict[str, List[float]]:
+        """
+        Calculate a payment scheme for many input points at once.
+        
+        Inputs and outputs are parallel columns, so each formula runs once per
+        column instead of once per scheme call, and no per-point result dicts
+        are allocated. Formulas match the single-point compute_* methods.
+        Columns are plain lists evaluated element-wise in Python, not numpy
+        arrays: sweeps are capped at SWEEP_MAX_POINTS, which does not justify
+        adding numpy as a dependency.
+        
+        Args:
+            scheme: One of GRID_INPUTS' keys
+            columns: Equal-length input columns keyed by GRID_INPUTS[scheme] names
+            use_tlp_for_reg_fee: If True, use TLP for reg fee calculation
+            
+        Returns:
+            Dictionary of output columns
+        """
+        if scheme not in self.GRID_INPUTS:
+            raise ValueError(f"Unsupported scheme: {scheme}")
+        
+        rules = self.rules
+        tcp = columns['tcp']
+        reg_pct = [p / 100 for p in columns['registration_fee_percent']]
+        
+        if scheme == '80_balance':
+            tlp = [rules.total_list_price(t, t) for t in tcp]
+            reg_base = tlp if use_tlp_for_reg_fee else tcp
+            registration_fee = [b * p for b, p in zip(reg_base, reg_pct)]
+            balance_80 = [t * 0.80 for t in tcp]
+            factor_rate = [rules.factor_rate(y) for y in columns['years']]
+            ma = [b * f for b, f in zip(balance_80, factor_rate)]
+            return {
+                'balance_80': balance_80,
+                'registration_fee': registration_fee,
+                'factor_rate': factor_rate,
+                'ma': ma,
+                'ma_with_reg': [(b + r) * f for b, r, f in zip(balance_80, registration_fee, factor_rate)],
+                'total_amount': [m * y * 12 for m, y in zip(ma, columns['years'])]
+            }
+        
+        reservation_fee = columns['reservation_fee']
+        mif_pct = [p / 100 for p in columns['move_in_fee_percent']]
+        
+        if scheme == 'spot_cash':
+            term_discount = [t * d / 100 for t, d in zip(tcp, columns['discount'])]
+            dtcp = [t - d for t, d in zip(tcp, term_discount)]
+            tlp = [rules.total_list_price(d, t) for d, t in zip(dtcp, tcp)]
+            reg_base = tlp if use_tlp_for_reg_fee else dtcp
+        else:
+            tlp = [rules.total_list_price(t, t) for t in tcp]
+            reg_base = tlp if use_tlp_for_reg_fee else tcp
+        
+        registration_fee = [b * p for b, p in zip(reg_base, reg_pct)]
+        move_in_fee = [t * p for t, p in zip(tlp, mif_pct)]
+        result = {
+            'tlp': tlp,
+            'registration_fee': registration_fee,
+            'move_in_fee': move_in_fee
+        }
+        
+        if scheme == 'spot_cash':
+            result.update({
+                'term_discount': term_discount,
+                'dtcp': dtcp,
+                'dtcp_less_rf': [d - r for d, r in zip(dtcp, reservation_fee)],
+                'total_payment': [d + r + m for d, r, m in zip(dtcp, registration_fee, move_in_fee)]
+            })
+        elif scheme == 'deferred_payment':
+            tcp_less_rf = [t - r for t, r in zip(tcp, reservation_fee)]
+            result.update({
+                'tcp_less_rf': tcp_less_rf,
+                'monthly_amortization': [a / n for a, n in zip(tcp_less_rf, columns['term'])]
+            })
+        else:
+            down_payment = [t * 0.20 for t in tcp]
+            result['down_payment'] = down_payment
+            result['balance_80'] = [t * 0.80 for t in tcp]
+            
+            if scheme == 'spot_down_payment':
+                term_discount = [dp * d / 100 for dp, d in zip(down_payment, columns['discount'])]
+                result['term_discount'] = term_discount
+                result['ndp'] = [dp - d - r for dp, d, r in zip(down_payment, term_discount, reservation_fee)]
+            else:  # 20/80
+                ndp = [dp - r for dp, r in zip(down_payment, reservation_fee)]
+                monthly = [a / n for a, n in zip(ndp, columns['term'])]
+                staggered = [r / n for r, n in zip(registration_fee, columns['term'])]
+                result.update({
+                    'ndp': ndp,
+                    'monthly_amortization_20': monthly,
+                    'staggered_rgf_monthly': staggered,
+                    'total_monthly_with_rgf': [m + s for m, s in zip(monthly, staggered)]
+                })
+        
+        return result
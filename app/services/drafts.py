@@ -0,0 +1,342 @@
+"""SQLite store for form drafts, saved as a snapshot plus a log of field diffs."""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import Flask, current_app
+
+from app.models.draft import Draft
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    snapshot TEXT NOT NULL,
+    snapshot_revision INTEGER NOT NULL,
+    picture_key TEXT,
+    pictures TEXT NOT NULL DEFAULT '[]',
+    rejected TEXT NOT NULL DEFAULT '[]',
+    token_hash TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS drafts_updated ON drafts (updated);
+CREATE TABLE IF NOT EXISTS draft_changes (
+    draft_id TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    diff TEXT NOT NULL,
+    PRIMARY KEY (draft_id, revision)
+) WITHOUT ROWID;
+"""
+
+
+def _dumps(value) -> str:
+    """Compact JSON for storage."""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def _hash_token(token: str) -> str:
+    """Stored form of a draft token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def apply_diff(fields: Dict[str, str], diff: Dict) -> Dict[str, str]:
+    """
+    Apply a field diff: ``{'set': {name: value}, 'unset': [name]}``.
+
+    Args:
+        fields: Fields before the change (not modified)
+        diff: Change to apply
+
+    Returns:
+        Fields after the change
+    """
+    result = dict(fields)
+    result.update(diff.get('set', {}))
+    for name in diff.get('unset', []):
+        result.pop(name, None)
+    return result
+
+
+def check_diff(diff: Dict) -> Dict:
+    """
+    Validate a field diff sent by a client.
+
+    Args:
+        diff: Decoded request body
+
+    Returns:
+        The diff with only its ``set`` and ``unset`` parts
+
+    Raises:
+        ValueError: If a name or value is not a string
+    """
+    changes = diff.get('set') or {}
+    removed = diff.get('unset') or []
+    if not isinstance(changes, dict) or not isinstance(removed, list):
+        raise ValueError("A draft change needs 'set' (an object) and 'unset' (a list)")
+    if not all(isinstance(name, str) and isinstance(value, str) for name, value in changes.items()):
+        raise ValueError("Draft field values must be strings")
+    if not all(isinstance(name, str) for name in removed):
+        raise ValueError("Draft field names must be strings")
+    return {'set': changes, 'unset': removed}
+
+
+class DraftConflict(Exception):
+    """A change was made against an older revision than the stored one."""
+
+    def __init__(self, draft: Draft):
+        super().__init__(f"Draft {draft.id} is at revision {draft.revision}")
+        self.draft = draft
+
+
+class DraftStore:
+    """
+    Drafts in one SQLite file.
+
+    Each save appends only the fields that changed to ``draft_changes``; the
+    full field set is rebuilt from the last snapshot and the changes after
+    it. Every ``snapshot_interval`` changes, they are folded into a new
+    snapshot so reads stay short. The processed picture of a draft is kept
+    with it, so regenerating a PDF does not repeat the upload or the image
+    processing.
+
+    A connection is opened per operation, so one store can be shared by
+    threads and forked worker processes.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, snapshot_interval: int = 50):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds after its last change that a draft is removed
+            snapshot_interval: Changes logged before they are folded into a snapshot
+        """
+        self.path = path
+        self.ttl = ttl
+        self.snapshot_interval = max(1, snapshot_interval)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL lets readers continue while a save is being written
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            if 'token_hash' not in {row['name'] for row in conn.execute('PRAGMA table_info(drafts)')}:
+                # Drafts saved before tokens cannot be opened any more; they expire as usual
+                conn.execute("ALTER TABLE drafts ADD COLUMN token_hash TEXT NOT NULL DEFAULT ''")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection in autocommit mode and close it afterwards."""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction (taken up front, so checks cannot go stale)."""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def create(self, fields: Dict[str, str]) -> Draft:
+        """
+        Start a draft.
+
+        Args:
+            fields: Initial form fields
+
+        Returns:
+            The new draft, at revision 1, with the token that opens it (only its hash is stored)
+        """
+        now = time.time()
+        draft = Draft(
+            id=uuid.uuid4().hex, revision=1, fields=dict(fields), created=now, updated=now,
+            token=secrets.token_urlsafe(32)
+        )
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO drafts (id, revision, snapshot, snapshot_revision, token_hash, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (draft.id, draft.revision, _dumps(draft.fields), draft.revision, _hash_token(draft.token), now, now)
+            )
+        return draft
+
+    def check_token(self, draft_id: str, token: str) -> bool:
+        """Whether a token is the one returned when the draft was created (False for no such draft)."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT token_hash FROM drafts WHERE id = ?', (draft_id,)).fetchone()
+        return row is not None and bool(row['token_hash']) and hmac.compare_digest(
+            row['token_hash'], _hash_token(token)
+        )
+
+    def get(self, draft_id: str) -> Optional[Draft]:
+        """Return a draft, or None if there is no such draft."""
+        with self._connect() as conn:
+            return self._load(conn, draft_id)
+
+    def _load(self, conn: sqlite3.Connection, draft_id: str) -> Optional[Draft]:
+        """Read a draft and replay its changes since the last snapshot."""
+        row = conn.execute('SELECT * FROM drafts WHERE id = ?', (draft_id,)).fetchone()
+        if row is None:
+            return None
+        fields = json.loads(row['snapshot'])
+        changes = conn.execute(
+            'SELECT diff FROM draft_changes WHERE draft_id = ? AND revision > ? ORDER BY revision',
+            (draft_id, row['snapshot_revision'])
+        )
+        for (diff,) in changes:
+            fields = apply_diff(fields, json.loads(diff))
+        return Draft(
+            id=row['id'],
+            revision=row['revision'],
+            fields=fields,
+            picture_key=row['picture_key'],
+            pictures=json.loads(row['pictures']),
+            rejected=json.loads(row['rejected']),
+            created=row['created'],
+            updated=row['updated']
+        )
+
+    def update(self, draft_id: str, revision: int, diff: Dict) -> Optional[int]:
+        """
+        Record a change made against a revision of a draft.
+
+        Args:
+            draft_id: Draft to change
+            revision: Revision the change was made against
+            diff: ``{'set': {name: value}, 'unset': [name]}``
+
+        Returns:
+            The new revision, or None if there is no such draft
+
+        Raises:
+            DraftConflict: If the draft has moved past ``revision``
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT revision, snapshot_revision FROM drafts WHERE id = ?', (draft_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['revision'] != revision:
+                raise DraftConflict(self._load(conn, draft_id))
+            if not diff.get('set') and not diff.get('unset'):
+                return revision
+
+            revision += 1
+            if revision - row['snapshot_revision'] >= self.snapshot_interval:
+                # Fold the log into a new snapshot
+                fields = apply_diff(self._load(conn, draft_id).fields, diff)
+                conn.execute('DELETE FROM draft_changes WHERE draft_id = ?', (draft_id,))
+                conn.execute(
+                    'UPDATE drafts SET snapshot = ?, snapshot_revision = ? WHERE id = ?',
+                    (_dumps(fields), revision, draft_id)
+                )
+            else:
+                conn.execute(
+                    'INSERT INTO draft_changes (draft_id, revision, diff) VALUES (?, ?, ?)',
+                    (draft_id, revision, _dumps(diff))
+                )
+            conn.execute(
+                'UPDATE drafts SET revision = ?, updated = ? WHERE id = ?',
+                (revision, time.time(), draft_id)
+            )
+        return revision
+
+    def set_picture(self, draft_id: str, picture_key: Optional[str], pictures: List[Dict[str, str]],
+                    rejected: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Attach a processed picture to a draft, replacing the previous one.
+
+        Args:
+            draft_id: Draft to change
+            picture_key: Storage key of the processed picture (None to remove it)
+            pictures: Name and SHA-256 of each upload it was built from
+            rejected: Uploads left out, and why
+
+        Returns:
+            Key of the replaced picture, for the caller to delete
+
+        Raises:
+            KeyError: If there is no such draft
+        """
+        with self._transaction() as conn:
+            row = conn.execute('SELECT picture_key FROM drafts WHERE id = ?', (draft_id,)).fetchone()
+            if row is None:
+                raise KeyError(draft_id)
+            conn.execute(
+                'UPDATE drafts SET picture_key = ?, pictures = ?, rejected = ?, updated = ? WHERE id = ?',
+                (picture_key, _dumps(pictures), _dumps(rejected), time.time(), draft_id)
+            )
+        return row['picture_key']
+
+    def delete(self, draft_id: str) -> Optional[str]:
+        """
+        Remove a draft.
+
+        Returns:
+            Key of its picture, for the caller to delete
+        """
+        return next(iter(self._delete(['id = ?'], [draft_id])), None)
+
+    def purge_expired(self) -> List[str]:
+        """
+        Remove drafts not changed for ``ttl`` seconds.
+
+        Returns:
+            Keys of their pictures, for the caller to delete
+        """
+        return self._delete(['updated < ?'], [time.time() - self.ttl])
+
+    def _delete(self, conditions: Iterable[str], params: List) -> List[str]:
+        """Delete matching drafts with their change logs; return their picture keys."""
+        where = ' AND '.join(conditions)
+        with self._transaction() as conn:
+            rows = conn.execute(f'SELECT id, picture_key FROM drafts WHERE {where}', params).fetchall()
+            conn.executemany('DELETE FROM draft_changes WHERE draft_id = ?', [(row['id'],) for row in rows])
+            conn.execute(f'DELETE FROM drafts WHERE {where}', params)
+        return [row['picture_key'] for row in rows if row['picture_key']]
+
+
+def init_drafts(app: Flask) -> None:
+    """
+    Create the draft store for an app (no-op unless DRAFTS_ENABLED).
+
+    Args:
+        app: Flask application
+    """
+    if not app.config['DRAFTS_ENABLED']:
+        return
+    app.extensions['drafts'] = DraftStore(
+        app.config['DRAFTS_DB_PATH'],
+        ttl=app.config['DRAFT_TTL'],
+        snapshot_interval=app.config['DRAFT_SNAPSHOT_INTERVAL']
+    )
+    logger.info(f"Drafts stored in {app.config['DRAFTS_DB_PATH']}")
+
+
+def get_drafts() -> DraftStore:
+    """Return the current app's draft store."""
+    return current_app.extensions['drafts']
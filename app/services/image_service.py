@@ -1,23 +1,40 @@
 """Service for handling image operations including collage generation."""
+import logging
 import os
-import tempfile
+import uuid
 from typing import List, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 from werkzeug.datastructures import FileStorage
 
+from app.services.storage import LocalStorage, Storage
+from app.utils import metrics
+from app.utils.image_header import ImageCheck, check_image
+
+logger = logging.getLogger(__name__)
+
 
 class ImageService:
     """Service class for image operations."""
     
-    def __init__(self, output_folder: str = "uploads"):
+    ALLOWED_FORMATS = {'jpeg', 'png', 'gif', 'bmp', 'webp'}
+    # The collage canvas (_arrange_images); JPEGs are decoded at the smallest DCT scale that still covers it
+    DECODE_SIZE = (800, 600)
+    
+    def __init__(self, output_folder: str = "uploads", max_pixels: Optional[int] = None,
+                 storage: Optional[Storage] = None):
         """
         Initialize image service.
         
         Args:
-            output_folder: Directory to save processed images
+            output_folder: Directory to save processed images (when no storage is given)
+            max_pixels: Reject images whose header declares more pixels (optional)
+            storage: Where to save processed images (default: LocalStorage(output_folder))
         """
         self.output_folder = output_folder
-        os.makedirs(output_folder, exist_ok=True)
+        self.max_pixels = max_pixels
+        self.storage = storage or LocalStorage(output_folder)
+        # Uploads skipped by the last call, with the reason for each
+        self.rejected: List[ImageCheck] = []
     
     def process_uploaded_images(self, files: List[FileStorage]) -> Optional[str]:
         """
@@ -28,8 +45,9 @@ class ImageService:
             files: List of uploaded image files
             
         Returns:
-            Path to processed image file or None if no valid images
+            Storage key of the processed image or None if no valid images
         """
+        self.rejected = []
         if not files:
             return None
         
@@ -38,11 +56,14 @@ class ImageService:
         seen_filenames = set()
         
         for file in files:
-            if file and file.filename and self._is_valid_image(file):
-                # Skip duplicate filenames
-                if file.filename not in seen_filenames:
-                    valid_files.append(file)
-                    seen_filenames.add(file.filename)
+            if not file or not file.filename or file.filename in seen_filenames:
+                continue
+            check = self._check_image(file)
+            if check.ok:
+                valid_files.append(file)
+                seen_filenames.add(file.filename)
+            else:
+                self._reject(check)
         
         if not valid_files:
             return None
@@ -53,79 +74,81 @@ class ImageService:
         # Always use collage creation for consistent formatting
         return self._create_collage(valid_files)
     
-    def _is_valid_image(self, file: FileStorage) -> bool:
-        """Check if file is a valid image."""
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-        if '.' not in file.filename:
-            return False
-        
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        return ext in allowed_extensions
+    def _check_image(self, file: FileStorage) -> ImageCheck:
+        """Check an upload's header (format and dimensions) without decoding it."""
+        # Non-images are already marked while they stream in (ImageUploadStream)
+        reason = getattr(file.stream, 'rejected_reason', None)
+        if reason:
+            return ImageCheck(file.filename, False, reason)
+        return check_image(file.stream, file.filename, self.ALLOWED_FORMATS, self.max_pixels)
+    
+    def _reject(self, check: ImageCheck) -> None:
+        """Record a skipped upload and why."""
+        logger.warning(f"Skipping upload {check.filename}: {check.reason}")
+        self.rejected.append(check)
     
     def _save_single_image(self, file: FileStorage) -> str:
         """Save a single image file."""
-        # Create temporary file
-        temp_fd, temp_path = tempfile.mkstemp(suffix='.jpg', dir=self.output_folder)
-        os.close(temp_fd)
+        # Open and process image
+        image = Image.open(file.stream)
         
-        try:
-            # Open and process image
-            image = Image.open(file.stream)
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize if too large (max 1200px on longest side)
-            image = self._resize_image(image, max_size=1200)
-            
-            # Save as JPEG
-            image.save(temp_path, 'JPEG', quality=85, optimize=True)
-            
-            return temp_path
-            
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise e
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Resize if too large (max 1200px on longest side)
+        image = self._resize_image(image, max_size=1200)
+        
+        # Save as JPEG (the storage removes a partly written file on error)
+        key = self._new_key()
+        with self.storage.writer(key) as fh:
+            image.save(fh, 'JPEG', quality=85, optimize=True)
+        return key
+    
+    def _new_key(self) -> str:
+        """Unique storage key for a processed image."""
+        return f"tmp{uuid.uuid4().hex[:8]}.jpg"
     
     def _create_collage(self, files: List[FileStorage]) -> str:
         """Create a collage from multiple images."""
-        # Create temporary file for collage
-        temp_fd, temp_path = tempfile.mkstemp(suffix='.jpg', dir=self.output_folder)
-        os.close(temp_fd)
+        # Load and process images
+        images = []
+        for file in files:
+            try:
+                # Measure upload size, then reset stream position to beginning
+                size_bytes = file.stream.seek(0, os.SEEK_END)
+                file.stream.seek(0)
+                img = self._open_upload(file)
+                # Decode now so a damaged body is skipped here, not failed in resize
+                img.load()
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                images.append(img)
+                metrics.observe_image(size_bytes, img.width * img.height)
+            except Exception as e:
+                self._reject(ImageCheck(file.filename, False, f"could not be decoded ({e})"))
         
-        try:
-            # Load and process images
-            images = []
-            for file in files:
-                try:
-                    # Reset file stream position to beginning
-                    file.stream.seek(0)
-                    img = Image.open(file.stream)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    images.append(img)
-                except Exception:
-                    continue  # Skip invalid images
-            
-            if not images:
-                raise ValueError("No valid images to create collage")
-            
-            # Create collage based on number of images
-            collage = self._arrange_images(images)
-            
-            # Save collage
-            collage.save(temp_path, 'JPEG', quality=85, optimize=True)
-            
-            return temp_path
-            
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise e
+        if not images:
+            raise ValueError("No valid images to create collage")
+        
+        # Create collage based on number of images
+        collage = self._arrange_images(images)
+        
+        # Save collage (the storage removes a partly written file on error)
+        key = self._new_key()
+        with self.storage.writer(key) as fh:
+            collage.save(fh, 'JPEG', quality=85, optimize=True)
+        
+        return key
+    
+    def _open_upload(self, file: FileStorage) -> Image.Image:
+        """Open an upload, reusing the image decoded while it streamed in when available."""
+        decoded_image = getattr(file.stream, 'decoded_image', None)
+        img = decoded_image() if decoded_image else None
+        if img is None:
+            img = Image.open(file.stream)
+            img.draft('RGB', self.DECODE_SIZE)
+        return img
     
     def _arrange_images(self, images: List[Image.Image]) -> Image.Image:
         """Arrange images into a collage layout matching the specified formats."""
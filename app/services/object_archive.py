@@ -0,0 +1,208 @@
+"""Deduplicated PDF storage: objects shared between PDFs are kept once, by content hash."""
+import hashlib
+import logging
+import os
+import sqlite3
+import struct
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from app.utils.pdf_objects import PDFParseError, object_spans
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+# Record segments: literal bytes (tag, length) or a shared object (tag, object id)
+_LITERAL = struct.Struct('>cI')
+_SHARED = struct.Struct('>cQ')
+
+
+class ObjectArchive:
+    """
+    PDFs split into their indirect objects, with the large objects kept once.
+
+    Proposals of one project embed the same header image, often the same
+    photo collage, and the same disclaimer and note pages. Each object body
+    of at least ``min_size`` bytes is stored once under its SHA-256 (the
+    ``N G obj`` header, which depends on the object's number, is not part
+    of it). Per PDF, a small record lists its bytes in order: literal runs
+    (headers, small objects, the cross-reference table) and references to
+    shared objects. Joining them gives back the exact original file.
+
+    Objects and records are zlib-compressed in one SQLite file, so each PDF
+    is stored in one transaction and read back with two queries. Files
+    this reader cannot split (no classic cross-reference table) are stored
+    as a single literal run.
+    """
+
+    def __init__(self, path: str, compression_level: int = 6, min_size: int = 512):
+        """
+        Initialize the store, creating the database if needed.
+
+        Args:
+            path: SQLite database file
+            compression_level: zlib level for objects and records (1-9)
+            min_size: Smallest object body shared between PDFs; smaller ones stay in the record
+        """
+        self.path = path
+        self.compression_level = compression_level
+        self.min_size = min_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection in autocommit mode and close it afterwards."""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def split(self, data: bytes) -> List[Tuple[bool, bytes]]:
+        """
+        Split a PDF into literal runs and object bodies to share.
+
+        Returns:
+            (shared, bytes) pairs that join back into ``data``
+        """
+        try:
+            spans = object_spans(data)
+        except PDFParseError as e:
+            logger.warning(f"Storing a PDF without deduplication: {str(e)}")
+            return [(False, data)]
+
+        segments = []
+        literal_start = 0
+        for span in spans:
+            if span.end - span.body >= self.min_size:
+                segments.append((False, data[literal_start:span.body]))
+                segments.append((True, data[span.body:span.end]))
+                literal_start = span.end
+        segments.append((False, data[literal_start:]))
+        return [segment for segment in segments if segment[1]]
+
+    def put(self, record_id: str, data: bytes) -> int:
+        """
+        Store a PDF.
+
+        Args:
+            record_id: Id to read it back by
+            data: Whole PDF file
+
+        Returns:
+            Bytes added to the store (the record and objects not stored before)
+        """
+        segments = self.split(data)
+        added = 0
+        record = []
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for shared, chunk in segments:
+                    if not shared:
+                        record.append(_LITERAL.pack(b'L', len(chunk)) + chunk)
+                        continue
+                    digest = hashlib.sha256(chunk).digest()
+                    row = conn.execute('SELECT id FROM objects WHERE hash = ?', (digest,)).fetchone()
+                    if row:
+                        object_id = row[0]
+                        conn.execute('UPDATE objects SET refs = refs + 1 WHERE id = ?', (object_id,))
+                    else:
+                        compressed = zlib.compress(chunk, self.compression_level)
+                        object_id = conn.execute(
+                            'INSERT INTO objects (hash, size, refs, data) VALUES (?, ?, 1, ?)',
+                            (digest, len(chunk), compressed)
+                        ).lastrowid
+                        added += len(compressed)
+                    record.append(_SHARED.pack(b'S', object_id))
+
+                blob = zlib.compress(b''.join(record), self.compression_level)
+                conn.execute('INSERT INTO records (id, data) VALUES (?, ?)', (record_id, blob))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return added + len(blob)
+
+    def iter_pdf(self, record_id: str) -> Iterator[bytes]:
+        """
+        Rebuild a stored PDF, piece by piece.
+
+        The record and its objects are read up front; the pieces are
+        decompressed as they are iterated.
+
+        Raises:
+            KeyError: If there is no such record
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT data FROM records WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                raise KeyError(record_id)
+            segments = _decode_record(zlib.decompress(row[0]))
+            object_ids = sorted({value for shared, value in segments if shared})
+            objects: Dict[int, bytes] = {}
+            # Stay under SQLite's limit on query parameters
+            for index in range(0, len(object_ids), 500):
+                batch = object_ids[index:index + 500]
+                objects.update(conn.execute(
+                    f"SELECT id, data FROM objects WHERE id IN ({', '.join('?' * len(batch))})", batch
+                ))
+        return (zlib.decompress(objects[value]) if shared else value for shared, value in segments)
+
+    def read(self, record_id: str) -> bytes:
+        """Return a stored PDF."""
+        return b''.join(self.iter_pdf(record_id))
+
+    def stats(self) -> Dict[str, int]:
+        """Counts and stored bytes of records and shared objects."""
+        with self._connect() as conn:
+            records, record_bytes = conn.execute('SELECT COUNT(*), TOTAL(LENGTH(data)) FROM records').fetchone()
+            objects, object_bytes, references = conn.execute(
+                'SELECT COUNT(*), TOTAL(LENGTH(data)), TOTAL(refs) FROM objects'
+            ).fetchone()
+        return {
+            'records': records,
+            'record_bytes': int(record_bytes),
+            'objects': objects,
+            'object_bytes': int(object_bytes),
+            'object_references': int(references),
+        }
+
+
+def _decode_record(record: bytes) -> List[Tuple[bool, object]]:
+    """Decode a record into (shared, object id or literal bytes) pairs."""
+    segments = []
+    pos = 0
+    while pos < len(record):
+        tag = record[pos:pos + 1]
+        if tag == b'S':
+            _, object_id = _SHARED.unpack_from(record, pos)
+            segments.append((True, object_id))
+            pos += _SHARED.size
+        elif tag == b'L':
+            _, length = _LITERAL.unpack_from(record, pos)
+            pos += _LITERAL.size
+            segments.append((False, record[pos:pos + length]))
+            pos += length
+        else:
+            raise ValueError(f"Corrupt archive record at byte {pos}")
+    return segments
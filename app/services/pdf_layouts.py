@@ -0,0 +1,175 @@
+"""Cached proposal layouts without client details, completed per client with an incremental update."""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import fields
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, current_app
+
+from app.models.proposal import Proposal
+from app.utils.pdf_objects import (
+    PDFParseError, append_update, next_object_number, page_objects, read_object, read_xref, stream_object
+)
+
+# Proposal fields that only appear in the client block (plus the date, drawn with it)
+CLIENT_FIELDS = ('client_name', 'email', 'contact_no')
+
+_CONTENTS = re.compile(rb'/Contents\s*(\[[^\]]*\]|\d+ \d+ R)')
+_INFO = re.compile(rb'/Info\s+(\d+) \d+ R')
+_DATES = re.compile(rb'/(CreationDate|ModDate)\s*\([^)]*\)')
+
+
+class Slot(NamedTuple):
+    """Where a client-specific flowable was left blank in a cached layout."""
+
+    name: str
+    page: int  # 1-based
+    x: float
+    y: float
+    width: float  # Available width it was wrapped to
+    avail_height: float
+    height: float  # Height it took
+
+
+class Layout(NamedTuple):
+    """A proposal PDF with blank client details, and what is needed to fill them in."""
+
+    pdf: bytes
+    slots: List[Slot]
+    # ReportLab font name -> resource name in the PDF ('/F1'); an overlay may only use these
+    fonts: Dict[str, str]
+    # Page number -> (object number, body) of the pages with slots
+    pages: Dict[int, Tuple[int, bytes]]
+    info: Optional[Tuple[int, bytes]]  # Document information object
+    next_object: int
+
+
+def layout_key(proposal: Proposal, picture: Optional[bytes]) -> str:
+    """
+    Cache key of everything in a proposal except the client details.
+
+    Args:
+        proposal: Proposal with all form data and computations
+        picture: Contents of the property picture, if any (its storage key changes per upload)
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for field in fields(Proposal):
+        if field.name not in CLIENT_FIELDS and field.name != 'picture_key':
+            digest.update(f"{field.name}={getattr(proposal, field.name)!r}\n".encode('utf-8'))
+    digest.update(hashlib.sha256(picture).digest() if picture is not None else b'no picture')
+    return digest.hexdigest()
+
+
+def make_layout(pdf: bytes, slots: List[Slot], fonts: Dict[str, str]) -> Layout:
+    """
+    Read what completing a layout needs from its PDF.
+
+    Raises:
+        PDFParseError: If the PDF cannot be read
+    """
+    sections = read_xref(pdf)
+    numbers = page_objects(pdf)
+    pages = {}
+    for page in {slot.page for slot in slots}:
+        body = read_object(pdf, numbers[page - 1], sections)
+        if not _CONTENTS.search(body):
+            raise PDFParseError(f"Page {page} has no /Contents")
+        pages[page] = (numbers[page - 1], body)
+    info = _INFO.search(sections[0].trailer)
+    if info:
+        info = (int(info.group(1)), read_object(pdf, int(info.group(1)), sections))
+    return Layout(pdf, slots, dict(fonts), pages, info, next_object_number(pdf, sections))
+
+
+def complete_layout(layout: Layout, overlays: Dict[int, bytes]) -> bytes:
+    """
+    Draw client details over a cached layout.
+
+    The layout's bytes are kept as they are; an incremental update appends
+    one content stream per page with slots and points the page at it, and
+    dates the document now.
+
+    Args:
+        layout: Cached layout
+        overlays: Page number -> content stream drawing the client details on it
+
+    Returns:
+        The complete PDF
+    """
+    objects = {}
+    number = layout.next_object
+    # The page's own content runs inside q ... Q, so the overlay starts from the default graphics state
+    save_state = number
+    objects[save_state] = stream_object(b'q')
+    number += 1
+    for page, content in overlays.items():
+        page_object, body = layout.pages[page]
+        objects[number] = stream_object(b'Q\n' + content)
+        contents = _CONTENTS.search(body)
+        existing = contents.group(1).strip(b'[] \n')
+        objects[page_object] = b'%s/Contents [ %d 0 R %s %d 0 R ]%s' % (
+            body[:contents.start()], save_state, existing, number, body[contents.end():]
+        )
+        number += 1
+
+    if layout.info:
+        now = datetime.now().astimezone()
+        offset = now.strftime('%z')
+        stamp = f"D:{now.strftime('%Y%m%d%H%M%S')}{offset[:3]}'{offset[3:]}'".encode('ascii')
+        info_object, body = layout.info
+        objects[info_object] = _DATES.sub(lambda m: b'/%s (%s)' % (m.group(1), stamp), body)
+    return append_update(layout.pdf, objects)
+
+
+class LayoutCache:
+    """Most recently used proposal layouts, by layout_key()."""
+
+    def __init__(self, max_entries: int = 32):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Layouts kept; the least recently used one is dropped beyond that
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._layouts: 'OrderedDict[str, Layout]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[Layout]:
+        """Return a cached layout, or None."""
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+            return layout
+
+    def put(self, key: str, layout: Layout) -> None:
+        """Cache a layout."""
+        with self._lock:
+            self._layouts[key] = layout
+            self._layouts.move_to_end(key)
+            while len(self._layouts) > self.max_entries:
+                self._layouts.popitem(last=False)
+
+
+def init_pdf_layouts(app: Flask) -> None:
+    """
+    Create the layout cache for an app (no-op unless PDF_INCREMENTAL_ENABLED).
+
+    Args:
+        app: Flask application
+    """
+    if not app.config['PDF_INCREMENTAL_ENABLED']:
+        return
+    app.extensions['pdf_layouts'] = LayoutCache(app.config['PDF_LAYOUT_CACHE_SIZE'])
+
+
+def get_pdf_layouts() -> Optional[LayoutCache]:
+    """Return the current app's layout cache, or None if incremental rendering is disabled."""
+    return current_app.extensions.get('pdf_layouts')
@@ -1,45 +1,172 @@
 """Service for generating PDF proposals."""
+import io
 import os
+import time
+import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, BinaryIO, Callable, Optional, Union
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import (
+    Flowable, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, KeepTogether
+)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
+from werkzeug.utils import secure_filename
+
+from app.models.comparison import Comparison, ComparisonUnit
+from app.models.proposal import Proposal
+from app.services.pdf_layouts import Layout, LayoutCache, Slot, complete_layout, layout_key, make_layout
+from app.services.storage import LocalStorage, Storage
+from app.utils import metrics
+from app.utils.timing import phase
+
+
+@lru_cache(maxsize=None)
+def sample_styles():
+    """
+    ReportLab's sample stylesheet, built once per process.
+    
+    The sections only use it as the parent of their own ParagraphStyles and
+    never modify it, so one instance can be shared.
+    """
+    return getSampleStyleSheet()
+
+
+class _LayoutRecorder:
+    """Where the client-specific flowables of a layout being cached would have been drawn."""
+    
+    def __init__(self):
+        self.slots = []
+        # The document's font mapping (ReportLab name -> '/F1'), complete once it is built
+        self.fonts = {}
+    
+    def placeholder(self, name: str, flowable: Flowable) -> Flowable:
+        """Wrap a client-specific flowable so that it takes its space but is not drawn."""
+        return _Placeholder(self, name, flowable)
+
+
+class _Placeholder(Flowable):
+    """Takes the space of a flowable, draws nothing and records where it would have been drawn."""
+    
+    def __init__(self, recorder: _LayoutRecorder, name: str, flowable: Flowable):
+        super().__init__()
+        self.recorder = recorder
+        self.name = name
+        self.flowable = flowable
+        self._available = (0, 0)
+    
+    def wrap(self, availWidth, availHeight):
+        self._available = (availWidth, availHeight)
+        self.width, self.height = self.flowable.wrap(availWidth, availHeight)
+        return self.width, self.height
+    
+    def getSpaceBefore(self):
+        return self.flowable.getSpaceBefore()
+    
+    def getSpaceAfter(self):
+        return self.flowable.getSpaceAfter()
+    
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.recorder.slots.append(Slot(self.name, canvas.getPageNumber(), x, y, *self._available, self.height))
+        self.recorder.fonts = canvas._doc.fontMapping
+    
+    def draw(self):
+        pass
 
 
 class PDFService:
     """Service class for generating PDF proposals."""
     
-    def __init__(self, output_folder: str = "uploads"):
+    def __init__(self, output_folder: str = "uploads", storage: Optional[Storage] = None,
+                 picture_storage: Optional[Storage] = None, layouts: Optional[LayoutCache] = None):
         """
         Initialize PDF service.
         
         Args:
-            output_folder: Directory to save generated PDFs
+            output_folder: Directory to save generated PDFs (when no storage is given)
+            storage: Where to save generated PDFs (default: LocalStorage(output_folder))
+            picture_storage: Where proposal pictures are kept (default: the PDF storage)
+            layouts: Cached proposal layouts to complete per client (default: lay out every proposal)
         """
         self.output_folder = output_folder
-        os.makedirs(output_folder, exist_ok=True)
+        self.storage = storage or LocalStorage(output_folder)
+        self.picture_storage = picture_storage or self.storage
+        self.layouts = layouts
     
-    def generate_proposal(self, data: Dict[str, Any]) -> str:
+    def generate_proposal(self, proposal: Proposal) -> str:
         """
         Generate a complete proposal PDF.
         
         Args:
-            data: Dictionary containing all form data and computations
+            proposal: Proposal with all form data and computations
             
         Returns:
-            Path to generated PDF file
+            Storage key (file name) of the generated PDF
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"proposal_{data['client_name'].replace(' ', '_')}_{timestamp}.pdf"
-        filepath = os.path.join(self.output_folder, filename)
+        # Random suffix keeps concurrent proposals for the same client from sharing a file
+        # (secure_filename also keeps a '/' in the client name out of the storage key)
+        filename = secure_filename(
+            f"proposal_{proposal.client_name.replace(' ', '_')}_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
+        )
+        with self.storage.writer(filename) as fh:
+            self.render(proposal, fh)
+        return filename
+    
+    def generate_comparison(self, comparison: Comparison) -> str:
+        """
+        Generate one PDF comparing several units.
         
+        Args:
+            comparison: Comparison with shared details and per-unit computations
+            
+        Returns:
+            Storage key (file name) of the generated PDF
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = secure_filename(
+            f"comparison_{comparison.base.client_name.replace(' ', '_')}_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
+        )
+        with self.storage.writer(filename) as fh:
+            self.render_comparison(comparison, fh)
+        return filename
+    
+    def render(self, proposal: Proposal, target: Union[str, BinaryIO]) -> None:
+        """
+        Lay out and write a proposal PDF.
+        
+        With a layout cache, proposals that differ only in the client
+        details share one layout: see _render_from_layout().
+        
+        Args:
+            proposal: Proposal with all form data and computations
+            target: File path or writable binary file object (e.g. BytesIO)
+        """
+        if self.layouts is not None and self._render_from_layout(proposal, target):
+            return
+        self._write(target, lambda: self._build_story(proposal), 'proposal')
+    
+    def render_comparison(self, comparison: Comparison, target: Union[str, BinaryIO]) -> None:
+        """
+        Lay out and write a comparison PDF.
+        
+        The header, client details, disclaimer, signature and note pages
+        appear once; each unit gets one compact payment-terms table.
+        
+        Args:
+            comparison: Comparison with shared details and per-unit computations
+            target: File path or writable binary file object (e.g. BytesIO)
+        """
+        self._write(target, lambda: self._build_comparison_story(comparison), 'comparison')
+    
+    def _write(self, target: Union[str, BinaryIO], build_story: Callable[[], list], kind: str) -> None:
+        """Build a story and write it as a PDF, timing both phases."""
         doc = SimpleDocTemplate(
-            filepath,
+            target,
             pagesize=letter,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
@@ -47,9 +174,164 @@ class PDFService:
             bottomMargin=0.75*inch
         )
         
-        # Build PDF content
+        with phase('story'):
+            story = build_story()
+        
+        # Lay out and write the PDF
+        with phase('pdf'), metrics.rendering('pdf'):
+            started = time.perf_counter()
+            doc.build(story)
+        size = os.path.getsize(target) if isinstance(target, str) else target.tell()
+        metrics.observe_pdf(kind, time.perf_counter() - started, size)
+    
+    def _render_from_layout(self, proposal: Proposal, target: Union[str, BinaryIO]) -> bool:
+        """
+        Write a proposal by drawing its client details over a cached layout.
+        
+        The layout is the whole proposal with the date and client details
+        left blank (their space kept), laid out once per project, unit,
+        payment terms and picture. Each client's PDF is that layout plus an
+        incremental update drawing the date and client table where they
+        belong, so the payment terms, disclaimer and note pages are not laid
+        out again.
+        
+        Returns:
+            False if the client details do not fit the layout (e.g. a line
+            break in a field makes the table taller); nothing is written then
+        """
+        with phase('story'):
+            picture = self._picture_source(proposal.picture_key)
+            if isinstance(picture, str):
+                with open(picture, 'rb') as fh:
+                    picture = fh.read()
+            key = layout_key(proposal, picture.getvalue() if isinstance(picture, io.BytesIO) else picture)
+        
+        layout = self.layouts.get(key)
+        metrics.observe_cache('pdf_layout', layout is not None)
+        started = time.perf_counter()
+        if layout is None:
+            recorder = _LayoutRecorder()
+            buffer = io.BytesIO()
+            self._write(buffer, lambda: self._build_story(proposal, recorder), 'layout')
+            layout = make_layout(buffer.getvalue(), recorder.slots, recorder.fonts)
+            self.layouts.put(key, layout)
+        
+        with phase('pdf'):
+            overlays = self._draw_client_details(layout, proposal)
+            if overlays is None:
+                return False
+            data = complete_layout(layout, overlays)
+            if isinstance(target, str):
+                with open(target, 'wb') as fh:
+                    fh.write(data)
+            else:
+                target.write(data)
+        metrics.observe_pdf('proposal', time.perf_counter() - started, len(data))
+        return True
+    
+    def _draw_client_details(self, layout: Layout, proposal: Proposal) -> Optional[Dict[int, bytes]]:
+        """
+        Draw a client's date line and details table where a layout left them blank.
+        
+        Returns:
+            Page number -> content stream, or None if they do not fit the layout
+        """
+        flowables = {'date': self._date_line(), 'client': self._client_table(proposal)}
+        pages = {}
+        for slot in layout.slots:
+            flowable = flowables[slot.name]
+            width, height = flowable.wrap(slot.width, slot.avail_height)
+            if height != slot.height:
+                return None
+            page = pages.get(slot.page)
+            if page is None:
+                page = pages[slot.page] = canvas.Canvas(io.BytesIO(), pagesize=letter)
+                # Name fonts as the layout's PDF does (its page resources hold only those)
+                page._doc.fontMapping.update(layout.fonts)
+            flowable.drawOn(page, slot.x, slot.y, _sW=slot.width - width)
+        
+        overlays = {}
+        for number, page in pages.items():
+            if not page._doc.fontMapping.items() <= layout.fonts.items():
+                return None
+            overlays[number] = '\n'.join([page._preamble] + page._code).encode('latin-1')
+        return overlays
+    
+    def _picture_source(self, key: Optional[str]) -> Union[str, BinaryIO, None]:
+        """File path (local storage) or in-memory copy of a proposal picture, if it exists."""
+        if not key or not self.picture_storage.exists(key):
+            return None
+        path = self.picture_storage.local_path(key)
+        return path if path else io.BytesIO(self.picture_storage.read(key))
+    
+    def _build_story(self, proposal: Proposal, recorder: Optional[_LayoutRecorder] = None) -> list:
+        """Build the list of flowables for a proposal (with blank client details for a recorder)."""
         story = []
-        styles = getSampleStyleSheet()
+        title_style, heading_style = self._story_styles()
+        
+        # Header, title, greeting and client details
+        self._add_intro(story, proposal, "Proposal", title_style, heading_style, recorder)
+        
+        # Project Details
+        story.append(Paragraph("PROJECT DETAILS", heading_style))
+        story.append(self._create_project_details_section(proposal))
+        story.append(Spacer(1, 0.2*inch))
+        
+        # Property picture and advantages
+        self._add_picture_and_advantages(story, proposal, heading_style)
+        
+        # Contract Details
+        story.append(Paragraph("CONTRACT DETAILS", heading_style))
+        story.append(self._create_contract_details_section(proposal))
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Payment Terms Computations
+        story.append(PageBreak())
+        story.append(Paragraph("PAYMENT TERMS", heading_style))
+        
+        # Add computation tables for the schemes that were computed
+        if proposal.spot_cash:
+            story.append(self._create_spot_cash_section(proposal.spot_cash, proposal.use_tlp_toggle))
+            story.append(Spacer(1, 0.3*inch))
+        
+        if proposal.deferred_payment:
+            story.extend(self._create_deferred_payment_section(proposal.deferred_payment, proposal.use_tlp_toggle))
+            story.append(Spacer(1, 0.3*inch))
+        
+        if proposal.spot_down_payment:
+            story.append(self._create_spot_down_payment_section(proposal.spot_down_payment, proposal.use_tlp_toggle))
+            story.append(Spacer(1, 0.3*inch))
+            
+            # Add 80% Balance section if available (for Spot Down Payment)
+            if proposal.balance_80_amortizations:
+                story.extend(self._create_80_balance_section(
+                    proposal.balance_80_amortizations,
+                    proposal.spot_down_payment['balance_80'],
+                    proposal.registration_fee
+                ))
+                story.append(Spacer(1, 0.3*inch))
+        
+        if proposal.payment_20_80:
+            story.extend(self._create_20_80_payment_section(proposal.payment_20_80, proposal.use_tlp_toggle))
+            story.append(Spacer(1, 0.3*inch))
+            
+            # Add 80% Balance section if available (for 20/80 Payment)
+            if proposal.balance_80_amortizations:
+                story.extend(self._create_80_balance_section(
+                    proposal.balance_80_amortizations,
+                    proposal.payment_20_80['balance_80'],
+                    proposal.registration_fee
+                ))
+                story.append(Spacer(1, 0.3*inch))
+        
+        # Disclaimer, signatures and note
+        self._add_closing(story, heading_style)
+        
+        return story
+    
+    def _story_styles(self) -> tuple:
+        """Title and section heading styles shared by every document."""
+        styles = sample_styles()
         
         # Custom styles
         title_style = ParagraphStyle(
@@ -72,14 +354,17 @@ class PDFService:
             fontName='Helvetica-Bold'
         )
         
-        subheading_style = ParagraphStyle(
-            'CustomSubHeading',
-            parent=styles['Heading3'],
-            fontSize=12,
-            textColor=colors.HexColor('#2563eb'),
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        )
+        return title_style, heading_style
+    
+    def _add_intro(self, story: list, proposal: Proposal, title: str, title_style: ParagraphStyle,
+                   heading_style: ParagraphStyle, recorder: Optional[_LayoutRecorder] = None) -> None:
+        """Append the header image, title, date, greeting and client details."""
+        styles = sample_styles()
+        date_line = self._date_line()
+        client_table = self._client_table(proposal)
+        if recorder is not None:
+            date_line = recorder.placeholder('date', date_line)
+            client_table = recorder.placeholder('client', client_table)
         
         # Add header image if exists
         header_img_path = os.path.join('img', 'Moldex_Page_Header.jpg')
@@ -92,11 +377,8 @@ class PDFService:
                 pass
         
         # Title
-        story.append(Paragraph("Proposal", title_style))
-        story.append(Paragraph(
-            f"Date: {datetime.now().strftime('%B %d, %Y')}", 
-            ParagraphStyle('Date', parent=styles['Normal'], alignment=TA_RIGHT)
-        ))
+        story.append(Paragraph(title, title_style))
+        story.append(date_line)
         story.append(Spacer(1, 0.3*inch))
         
         # Greeting
@@ -106,10 +388,22 @@ class PDFService:
         
         # Client Details
         story.append(Paragraph("CLIENT'S DETAILS", heading_style))
+        story.append(client_table)
+        story.append(Spacer(1, 0.2*inch))
+    
+    def _date_line(self) -> Paragraph:
+        """Today's date, right-aligned."""
+        return Paragraph(
+            f"Date: {datetime.now().strftime('%B %d, %Y')}", 
+            ParagraphStyle('Date', parent=sample_styles()['Normal'], alignment=TA_RIGHT)
+        )
+    
+    def _client_table(self, proposal: Proposal) -> Table:
+        """Client name, email and contact number."""
         client_data = [
-            ['Client\'s Name:', data['client_name']],
-            ['Email Address:', data['email']],
-            ['Contact No.:', data.get('contact_no', 'N/A')]
+            ['Client\'s Name:', proposal.client_name],
+            ['Email Address:', proposal.email],
+            ['Contact No.:', proposal.contact_no]
         ]
         client_table = Table(client_data, colWidths=[2*inch, 4*inch])
         client_table.setStyle(TableStyle([
@@ -120,91 +414,32 @@ class PDFService:
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
         ]))
-        story.append(client_table)
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Project Details
-        story.append(Paragraph("PROJECT DETAILS", heading_style))
-        story.append(self._create_project_details_section(data))
-        story.append(Spacer(1, 0.2*inch))
+        return client_table
+    
+    def _add_picture_and_advantages(self, story: list, proposal: Proposal, heading_style: ParagraphStyle) -> None:
+        """Append the property picture and project advantages, when present."""
+        styles = sample_styles()
         
         # Add property picture if available
-        if data.get('picture_path') and os.path.exists(data['picture_path']):
+        picture = self._picture_source(proposal.picture_key)
+        if picture is not None:
             try:
-                prop_img = Image(data['picture_path'], width=4*inch, height=3*inch)
+                prop_img = Image(picture, width=4*inch, height=3*inch)
                 story.append(prop_img)
                 story.append(Spacer(1, 0.2*inch))
             except:
                 pass
         
         # Project Advantages (if provided)
-        if data.get('project_advantages'):
+        if proposal.project_advantages:
             story.append(Paragraph("PROJECT ADVANTAGES", heading_style))
-            advantages_text = data['project_advantages'].replace('\n', '<br/>')
+            advantages_text = proposal.project_advantages.replace('\n', '<br/>')
             advantages_para = Paragraph(advantages_text, styles['Normal'])
             story.append(advantages_para)
             story.append(Spacer(1, 0.3*inch))
-        
-        # Contract Details
-        story.append(Paragraph("CONTRACT DETAILS", heading_style))
-        story.append(self._create_contract_details_section(data))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Payment Terms Computations
-        story.append(PageBreak())
-        story.append(Paragraph("PAYMENT TERMS", heading_style))
-        
-        # Add computation tables based on available data and display options
-        if data.get('show_spot_cash', True) and data.get('spot_cash_data'):
-            story.append(self._create_spot_cash_section(data['spot_cash_data']))
-            story.append(Spacer(1, 0.3*inch))
-        
-        if data.get('show_deferred_payment', True) and data.get('deferred_payment_data'):
-            deferred_elements = self._create_deferred_payment_section(data['deferred_payment_data'])
-            if isinstance(deferred_elements, list):
-                story.extend(deferred_elements)
-            else:
-                story.append(deferred_elements)
-            story.append(Spacer(1, 0.3*inch))
-        
-        if data.get('show_spot_down_payment', True) and data.get('spot_down_payment_data'):
-            story.append(self._create_spot_down_payment_section(data['spot_down_payment_data']))
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Add 80% Balance section if available (for Spot Down Payment)
-            if data['spot_down_payment_data'].get('balance_80_amortizations'):
-                balance_elements = self._create_80_balance_section(
-                    data['spot_down_payment_data']['balance_80_amortizations'],
-                    data['spot_down_payment_data']['balance_80'],
-                    data.get('registration_fee', 0)
-                )
-                if isinstance(balance_elements, list):
-                    story.extend(balance_elements)
-                else:
-                    story.append(balance_elements)
-                story.append(Spacer(1, 0.3*inch))
-        
-        if data.get('show_20_80_payment', True) and data.get('payment_20_80_data'):
-            payment_elements = self._create_20_80_payment_section(data['payment_20_80_data'])
-            if isinstance(payment_elements, list):
-                story.extend(payment_elements)
-            else:
-                story.append(payment_elements)
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Add 80% Balance section if available (for 20/80 Payment)
-            if data['payment_20_80_data'].get('balance_80_amortizations'):
-                balance_elements = self._create_80_balance_section(
-                    data['payment_20_80_data']['balance_80_amortizations'],
-                    data['payment_20_80_data']['balance_80'],
-                    data.get('registration_fee', 0)
-                )
-                if isinstance(balance_elements, list):
-                    story.extend(balance_elements)
-                else:
-                    story.append(balance_elements)
-                story.append(Spacer(1, 0.3*inch))
-        
+    
+    def _add_closing(self, story: list, heading_style: ParagraphStyle) -> None:
+        """Append the disclaimer, signature and note sections (starting on a new page)."""
         # Disclaimer
         story.append(PageBreak())
         story.append(Paragraph("DISCLAIMER / ACKNOWLEDGEMENT", heading_style))
@@ -217,40 +452,193 @@ class PDFService:
         
         # Note section with Move-In and Registration Fee details
         story.append(self._create_note_section())
+    
+    def _build_comparison_story(self, comparison: Comparison) -> list:
+        """Build the list of flowables for a comparison."""
+        story = []
+        base = comparison.base
+        title_style, heading_style = self._story_styles()
+        
+        # Shared pages: header, client and project details, picture and advantages
+        self._add_intro(story, base, "Unit Comparison", title_style, heading_style)
+        
+        story.append(Paragraph("PROJECT DETAILS", heading_style))
+        story.append(self._create_comparison_project_section(comparison))
+        story.append(Spacer(1, 0.2*inch))
+        
+        self._add_picture_and_advantages(story, base, heading_style)
+        
+        story.append(Paragraph("CONTRACT DETAILS", heading_style))
+        story.append(self._create_comparison_contract_section(comparison))
+        story.append(Spacer(1, 0.3*inch))
+        
+        # One compact table per unit, kept whole on a page
+        story.append(PageBreak())
+        story.append(Paragraph("PAYMENT TERMS BY UNIT", heading_style))
+        for unit in comparison.units:
+            story.append(KeepTogether([self._create_unit_terms_table(comparison, unit), Spacer(1, 0.25*inch)]))
         
-        # Build PDF
-        doc.build(story)
+        # Disclaimer, signatures and note, once for all units
+        self._add_closing(story, heading_style)
         
-        return filepath
+        return story
     
-    def _create_project_details_section(self, data: Dict[str, Any]) -> Table:
+    def _create_comparison_project_section(self, comparison: Comparison) -> Table:
+        """Create the project details shared by the compared units."""
+        base = comparison.base
+        project_data = [
+            ['Product Type:', base.product_type],
+            ['Project Type:', base.project_type],
+            ['Brand:', base.brand],
+            ['Address:', base.address],
+        ]
+        if base.is_vertical and base.tower_building:
+            project_data.append(['Tower/Building:', base.tower_building])
+        elif not base.is_vertical and base.phase:
+            project_data.append(['Phase:', base.phase])
+        project_data.append(['Units Compared:', ', '.join(unit.label for unit in comparison.units)])
+        
+        table = Table(project_data, colWidths=[2*inch, 4*inch])
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#374151')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        return table
+    
+    def _create_comparison_contract_section(self, comparison: Comparison) -> Table:
+        """Create the contract terms shared by the compared units."""
+        base = comparison.base
+        contract_data = [
+            ['Registration Fee %:', f"{base.registration_fee_percent:.2f}%"],
+            ['Move-in Fee %:', f"{base.move_in_fee_percent:.2f}%"],
+        ]
+        if comparison.spot_cash_discount is not None:
+            contract_data.append(['Spot Cash Discount:', f"{comparison.spot_cash_discount:g}%"])
+        if comparison.spot_down_discount is not None:
+            contract_data.append(['Spot Down Payment Discount:', f"{comparison.spot_down_discount:g}%"])
+        
+        table = Table(contract_data, colWidths=[2.5*inch, 3.5*inch])
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#374151')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        return table
+    
+    def _create_unit_terms_table(self, comparison: Comparison, unit: ComparisonUnit) -> Table:
+        """Create one unit's payment terms as a single compact table."""
+        styles = sample_styles()
+        subheading = ParagraphStyle(
+            'UnitHeading',
+            parent=styles['Heading3'],
+            fontSize=11,
+            textColor=colors.white,
+            fontName='Helvetica-Bold'
+        )
+        fmt = self._format_currency
+        title = unit.label
+        if unit.details:
+            title += ' &nbsp;·&nbsp; ' + ' &nbsp;·&nbsp; '.join(f"{label}: {value}" for label, value in unit.details)
+        
+        rows = [
+            [Paragraph(title, subheading), '', ''],
+            ['Description', 'Amount', 'With Reg. Fee'],
+            ['Total Contract Price (TCP)', fmt(unit.tcp), ''],
+            ['Reservation Fee (RF)', fmt(unit.reservation_fee), ''],
+            ['Registration Fee (RGF) / Move-in Fee (MIF)', fmt(unit.registration_fee), fmt(unit.move_in_fee)],
+        ]
+        section_rows = []
+    
+        def section(name: str) -> None:
+            section_rows.append(len(rows))
+            rows.append([name, '', ''])
+        
+        if unit.spot_cash:
+            section(f"Spot Cash ({comparison.spot_cash_discount:g}% discount)")
+            rows.append(['Net TCP (TCP - TD)', fmt(unit.spot_cash['dtcp']), ''])
+            rows.append(['Total Payment (NTCP + RGF + MIF)', fmt(unit.spot_cash['total_payment']), ''])
+        
+        if unit.deferred_payment:
+            section("Deferred Payment (monthly, TCP - RF)")
+            for term, figures in unit.deferred_payment.items():
+                ma = figures['monthly_amortization']
+                rows.append([f"{term} months", fmt(ma), fmt(ma + unit.registration_fee / term)])
+        
+        if unit.spot_down_payment:
+            section(f"Spot Down Payment ({comparison.spot_down_discount:g}% discount)")
+            rows.append(['Net Down Payment (20% - TD - RF)', fmt(unit.spot_down_payment['ndp']), ''])
+            rows.append(['80% Balance', fmt(unit.spot_down_payment['balance_80']), ''])
+        
+        if unit.payment_20_80:
+            section("20/80 Payment (monthly, 20% - RF)")
+            for term, figures in unit.payment_20_80.items():
+                rows.append([f"{term} months", fmt(figures['monthly_amortization_20']),
+                             fmt(figures['total_monthly_with_rgf'])])
+        
+        if unit.balance_80:
+            section("80% Balance (monthly amortization)")
+            rates = dict(comparison.balance_80_terms)
+            for years, figures in unit.balance_80.items():
+                rows.append([f"{years} years ({rates[years]:.0f}%)", fmt(figures['ma']), fmt(figures['ma_with_reg'])])
+        
+        table = Table(rows, colWidths=[3.1*inch, 1.5*inch, 1.5*inch], hAlign='CENTER')
+        commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a8a')),
+            ('SPAN', (0, 0), (-1, 0)),
+            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#e5e7eb')),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('LEADING', (0, 1), (-1, -1), 9.5),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#1f2937')),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 1), (-1, -1), 0.5, colors.grey),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ]
+        for row in section_rows:
+            commands.extend([
+                ('SPAN', (0, row), (-1, row)),
+                ('FONTNAME', (0, row), (-1, row), 'Helvetica-Bold'),
+                ('TEXTCOLOR', (0, row), (-1, row), colors.HexColor('#2563eb')),
+                ('BACKGROUND', (0, row), (-1, row), colors.HexColor('#f3f4f6')),
+            ])
+        table.setStyle(TableStyle(commands))
+        return table
+    
+    def _create_project_details_section(self, proposal: Proposal) -> Table:
         """Create project details table."""
-        project_data = []
-        project_data.append(['Product Type:', data.get('product_type', 'N/A')])
-        
-        if data.get('product_type') == 'Vertical':
-            project_data.append(['Project Type:', data.get('project_type', 'N/A')])
-            project_data.append(['Brand:', data.get('brand', 'N/A')])
-            project_data.append(['Address:', data.get('address', 'N/A')])
-            if data.get('property_details'):
-                project_data.append(['Property Details:', data.get('property_details', 'N/A')])
-            project_data.append(['Tower/Building:', data.get('tower_building', 'N/A')])
-            project_data.append(['Floor/Unit:', data.get('floor_unit', 'N/A')])
-            project_data.append(['Floor Area:', data.get('floor_area', 'N/A')])
+        project_data = [
+            ['Product Type:', proposal.product_type],
+            ['Project Type:', proposal.project_type],
+            ['Brand:', proposal.brand],
+            ['Address:', proposal.address],
+        ]
+        
+        if proposal.is_vertical:
+            if proposal.property_details:
+                project_data.append(['Property Details:', proposal.property_details])
+            project_data.append(['Tower/Building:', proposal.tower_building])
+            project_data.append(['Floor/Unit:', proposal.floor_unit])
+            project_data.append(['Floor Area:', proposal.floor_area])
         else:  # Horizontal
-            project_data.append(['Project Type:', data.get('project_type', 'N/A')])
-            project_data.append(['Brand:', data.get('brand', 'N/A')])
-            project_data.append(['Address:', data.get('address', 'N/A')])
-            project_data.append(['Phase:', data.get('phase', 'N/A')])
-            project_data.append(['Block/Lot:', data.get('block_lot', 'N/A')])
+            project_data.append(['Phase:', proposal.phase])
+            project_data.append(['Block/Lot:', proposal.block_lot])
             
-            if data.get('project_type') == 'House and Lot':
-                project_data.append(['House Model:', data.get('house_model', 'N/A')])
-                project_data.append(['Property Details:', data.get('property_details', 'N/A')])
-                project_data.append(['Lot Area:', data.get('lot_area', 'N/A')])
-                project_data.append(['Floor Area:', data.get('floor_area', 'N/A')])
+            if proposal.is_house_and_lot:
+                project_data.append(['House Model:', proposal.house_model])
+                project_data.append(['Property Details:', proposal.property_details])
+                project_data.append(['Lot Area:', proposal.lot_area])
+                project_data.append(['Floor Area:', proposal.floor_area])
             else:  # Lot
-                project_data.append(['Lot Area:', data.get('lot_area', 'N/A')])
+                project_data.append(['Lot Area:', proposal.lot_area])
         
         table = Table(project_data, colWidths=[2*inch, 4*inch])
         table.setStyle(TableStyle([
@@ -263,13 +651,13 @@ class PDFService:
         ]))
         return table
     
-    def _create_contract_details_section(self, data: Dict[str, Any]) -> Table:
+    def _create_contract_details_section(self, proposal: Proposal) -> Table:
         """Create contract details table - UPDATED to remove Registration and Move-in Fee."""
         contract_data = [
-            ['Total Contract Price (TCP):', self._format_currency(data.get('tcp', 0))],
-            ['Reservation Fee:', self._format_currency(data.get('reservation_fee', 0))],
-            ['Registration Fee %:', f"{data.get('registration_fee_percent', 0):.2f}%"],
-            ['Move-in Fee %:', f"{data.get('move_in_fee_percent', 0):.2f}%"],
+            ['Total Contract Price (TCP):', self._format_currency(proposal.tcp)],
+            ['Reservation Fee:', self._format_currency(proposal.reservation_fee)],
+            ['Registration Fee %:', f"{proposal.registration_fee_percent:.2f}%"],
+            ['Move-in Fee %:', f"{proposal.move_in_fee_percent:.2f}%"],
         ]
         
         table = Table(contract_data, colWidths=[2.5*inch, 3.5*inch])
@@ -284,9 +672,9 @@ class PDFService:
         ]))
         return table
     
-    def _create_spot_cash_section(self, data: Dict[str, float]) -> Table:
+    def _create_spot_cash_section(self, data: Dict[str, float], use_tlp_for_reg_fee: bool = True) -> Table:
         """Create Spot Cash computation table."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         subheading = ParagraphStyle(
             'TableSubheading',
             parent=styles['Heading3'],
@@ -305,7 +693,7 @@ class PDFService:
             ['Discounted TCP (DTCP)/Net TCP (NTCP)', 'TCP - TD', self._format_currency(data['dtcp'])],
             ['Less Reservation Fee (RF)', 'Input', self._format_currency(data['reservation_fee'])],
             ['DTCP - RF', 'DTCP - RF', self._format_currency(data.get('dtcp_less_rf', 0))],
-            ['Registration Fee (RGF)', 'TLP × RGF%', self._format_currency(data['registration_fee'])],
+            ['Registration Fee (RGF)', self._reg_fee_formula(use_tlp_for_reg_fee, 'DTCP'), self._format_currency(data['registration_fee'])],
             ['Move-in Fee (MIF)', 'TLP × MIF%', self._format_currency(data['move_in_fee'])],
             ['Total Payment', 'NTCP + RGF + MIF', self._format_currency(data.get('total_payment', 0))],
         ]
@@ -327,9 +715,9 @@ class PDFService:
         ]))
         return table
     
-    def _create_deferred_payment_section(self, data: Dict[str, Any]) -> list:
+    def _create_deferred_payment_section(self, data: Dict[str, Any], use_tlp_for_reg_fee: bool = True) -> list:
         """Create Deferred Payment computation section with new table format."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         elements = []
         
         subheading = ParagraphStyle(
@@ -349,7 +737,7 @@ class PDFService:
             ['Total Contract Price (TCP)/Net TCP (NTCP)', '—', self._format_currency(data['tcp'])],
             ['Less Reservation Fee (RF)', 'Input', self._format_currency(data['reservation_fee'])],
             ['TCP - RF', 'TCP - RF', self._format_currency(data.get('tcp_less_rf', 0))],
-            ['Registration Fee (RGF)', 'TLP × RGF%', self._format_currency(data['registration_fee'])],
+            ['Registration Fee (RGF)', self._reg_fee_formula(use_tlp_for_reg_fee, 'TCP'), self._format_currency(data['registration_fee'])],
             ['Move-in Fee (MIF)', 'TLP × MIF%', self._format_currency(data['move_in_fee'])],
         ]
         
@@ -437,9 +825,9 @@ class PDFService:
         ]))
         return table
     
-    def _create_spot_down_payment_section(self, data: Dict[str, float]) -> Table:
+    def _create_spot_down_payment_section(self, data: Dict[str, float], use_tlp_for_reg_fee: bool = True) -> Table:
         """Create Spot Down Payment computation table."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         subheading = ParagraphStyle(
             'TableSubheading',
             parent=styles['Heading3'],
@@ -459,7 +847,7 @@ class PDFService:
             ['Less Reservation Fee (RF)', 'Input', self._format_currency(data['reservation_fee'])],
             ['Net Down Payment (NDP)', 'DP - (TD + RF)', self._format_currency(data['ndp'])],
             ['80% Balance', 'TCP × 80%', self._format_currency(data['balance_80'])],
-            ['Registration Fee (RGF)', 'TLP × RGF%', self._format_currency(data['registration_fee'])],
+            ['Registration Fee (RGF)', self._reg_fee_formula(use_tlp_for_reg_fee, 'TCP'), self._format_currency(data['registration_fee'])],
             ['Move-in Fee (MIF)', 'TLP × MIF%', self._format_currency(data['move_in_fee'])],
         ]
         
@@ -480,9 +868,9 @@ class PDFService:
         ]))
         return table
     
-    def _create_20_80_payment_section(self, data: Dict[str, Any]) -> list:
+    def _create_20_80_payment_section(self, data: Dict[str, Any], use_tlp_for_reg_fee: bool = True) -> list:
         """Create 20/80 Payment computation section with new table format."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         elements = []
         
         subheading = ParagraphStyle(
@@ -504,7 +892,7 @@ class PDFService:
             ['Less Reservation Fee (RF)', 'Input', self._format_currency(data['reservation_fee'])],
             ['Net Down Payment (NDP)', 'DP - RF', self._format_currency(data['ndp'])],
             ['80% Balance', 'TCP × 80%', self._format_currency(data['balance_80'])],
-            ['Registration Fee (RGF)', 'TLP × RGF%', self._format_currency(data['registration_fee'])],
+            ['Registration Fee (RGF)', self._reg_fee_formula(use_tlp_for_reg_fee, 'TCP'), self._format_currency(data['registration_fee'])],
             ['Move-in Fee (MIF)', 'TLP × MIF%', self._format_currency(data['move_in_fee'])],
             [''],
             ['Payment Options:', '', ''],
@@ -541,7 +929,7 @@ class PDFService:
     
     def _create_80_balance_section(self, amortizations: list, balance_80: float, registration_fee: float) -> list:
         """Create 80% Balance Terms computation section."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         elements = []
         
         subheading = ParagraphStyle(
@@ -648,7 +1036,7 @@ class PDFService:
         # Join with HTML line breaks for proper rendering in PDF
         disclaimer_text = "<br/><br/>".join(disclaimer_items)
         
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         normal_style = ParagraphStyle(
             'DisclaimerStyle',
             parent=styles['Normal'],
@@ -675,7 +1063,7 @@ class PDFService:
     
     def _create_signature_section(self) -> Table:
         """Create signature section."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         label_style = ParagraphStyle(
             'SignatureLabel',
             parent=styles['Normal'],
@@ -707,7 +1095,7 @@ class PDFService:
     
     def _create_note_section(self) -> Table:
         """Create note section with Move-In and Registration fees details."""
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         
         note_style = ParagraphStyle(
             'NoteStyle',
@@ -787,6 +1175,11 @@ as part of the legal process for property registration and turnover."""
         
         return table
     
+    @staticmethod
+    def _reg_fee_formula(use_tlp_for_reg_fee: bool, base: str) -> str:
+        """Registration fee formula: on TLP with the toggle on, otherwise on ``base``."""
+        return f"{'TLP' if use_tlp_for_reg_fee else base} × RGF%"
+    
     @staticmethod
     def _format_currency(amount: float) -> str:
         """Format amount as Philippine Peso currency."""
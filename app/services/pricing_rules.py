@@ -0,0 +1,284 @@
+"""Service for loading and resolving data-driven pricing rules."""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = '*'
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'pricing_rules.json'
+)
+
+
+@dataclass(frozen=True)
+class FactorBand:
+    """Factor rate applied to an inclusive range of amortization years."""
+
+    min_years: float
+    max_years: float
+    factor_rate: float
+
+
+@dataclass(frozen=True)
+class BalanceTerm:
+    """Static 80% balance term offered in proposals."""
+
+    years: int
+    rate: float
+
+
+class RuleSet:
+    """
+    Pricing constants for one project/brand over an effective date range.
+
+    Factor bands are kept sorted by their lower bound so that lookups are a
+    single bisect instead of a chain of comparisons.
+    """
+
+    __slots__ = (
+        'id', 'version', 'project_type', 'brand', 'effective_from', 'effective_to',
+        'vat_divisor', 'vat_threshold', 'factor_bands', 'balance_80_terms', '_band_mins'
+    )
+
+    def __init__(
+        self,
+        rule_id: str,
+        version: str,
+        project_type: str,
+        brand: str,
+        effective_from: date,
+        effective_to: Optional[date],
+        vat_divisor: float,
+        vat_threshold: float,
+        factor_bands: List[FactorBand],
+        balance_80_terms: List[BalanceTerm]
+    ):
+        self.id = rule_id
+        self.version = version
+        self.project_type = project_type
+        self.brand = brand
+        self.effective_from = effective_from
+        self.effective_to = effective_to
+        self.vat_divisor = vat_divisor
+        self.vat_threshold = vat_threshold
+        self.factor_bands = tuple(sorted(factor_bands, key=lambda band: band.min_years))
+        self.balance_80_terms = tuple(balance_80_terms)
+        self._band_mins = [band.min_years for band in self.factor_bands]
+
+    @classmethod
+    def from_dict(cls, raw: Dict, version: str) -> 'RuleSet':
+        """Build a rule set from its JSON representation."""
+        effective_to = raw.get('effective_to')
+        return cls(
+            rule_id=raw.get('id', 'unnamed'),
+            version=version,
+            project_type=raw.get('project_type', WILDCARD),
+            brand=raw.get('brand', WILDCARD),
+            effective_from=date.fromisoformat(raw.get('effective_from', '2000-01-01')),
+            effective_to=date.fromisoformat(effective_to) if effective_to else None,
+            vat_divisor=float(raw['vat_divisor']),
+            vat_threshold=float(raw['vat_threshold']),
+            factor_bands=[
+                FactorBand(float(b['min_years']), float(b['max_years']), float(b['factor_rate']))
+                for b in raw.get('factor_rates', [])
+            ],
+            balance_80_terms=[
+                BalanceTerm(int(t['years']), float(t['rate']))
+                for t in raw.get('balance_80_terms', [])
+            ]
+        )
+
+    def factor_rate(self, years: float) -> float:
+        """Return the factor rate for a term, or 0 if no band covers it."""
+        index = bisect.bisect_right(self._band_mins, years) - 1
+        if index < 0:
+            return 0
+        band = self.factor_bands[index]
+        return band.factor_rate if years <= band.max_years else 0
+
+    def total_list_price(self, amount: float, tcp: float) -> float:
+        """
+        Remove VAT from an amount unless the TCP is within the VAT-exempt threshold.
+
+        Args:
+            amount: Amount to convert (TCP or discounted TCP)
+            tcp: Total Contract Price used to test the threshold
+
+        Returns:
+            Total List Price
+        """
+        if tcp <= self.vat_threshold:
+            return amount
+        return amount / self.vat_divisor
+
+    def is_effective(self, on: date) -> bool:
+        """Check whether the rule set applies on a given date."""
+        if on < self.effective_from:
+            return False
+        return self.effective_to is None or on <= self.effective_to
+
+    def __repr__(self):
+        return f'<RuleSet {self.id} v{self.version} {self.project_type}/{self.brand}>'
+
+
+class PricingRules:
+    """
+    Registry of rule sets indexed by (project type, brand) and effective date.
+
+    The rules file is parsed once and re-parsed only when its modification
+    time changes, so every worker picks up edits without a restart and
+    requests never pay for parsing.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval: float = 5.0):
+        """
+        Initialize the registry.
+
+        Args:
+            path: Path to the pricing rules JSON file
+            reload_interval: Minimum seconds between modification checks
+        """
+        self.path = path or DEFAULT_RULES_PATH
+        self.reload_interval = reload_interval
+        self.version: Optional[str] = None
+        # Short hash of the rules file, so edits that keep the version still change cache keys
+        self.digest: Optional[str] = None
+        self._raw: Dict = {}
+        self._index: Dict[Tuple[str, str], Tuple[List[date], List[RuleSet]]] = {}
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        """Configure the registry from the Flask app and load the rules."""
+        self.path = app.config.get('PRICING_RULES_PATH') or DEFAULT_RULES_PATH
+        self.reload_interval = app.config.get('PRICING_RULES_RELOAD_INTERVAL', self.reload_interval)
+        self.load()
+        app.extensions['pricing_rules'] = self
+
+    def load(self) -> None:
+        """Parse the rules file and atomically swap in the new index."""
+        with open(self.path, 'rb') as handle:
+            content = handle.read()
+        raw = json.loads(content.decode('utf-8'))
+        mtime = os.path.getmtime(self.path)
+
+        version = str(raw.get('version', '0'))
+        grouped: Dict[Tuple[str, str], List[RuleSet]] = {}
+        for raw_rule in raw.get('rule_sets', []):
+            rule_set = RuleSet.from_dict(raw_rule, version)
+            grouped.setdefault((rule_set.project_type, rule_set.brand), []).append(rule_set)
+
+        if not grouped:
+            raise ValueError(f"No rule sets defined in {self.path}")
+
+        index = {}
+        for key, rule_sets in grouped.items():
+            rule_sets.sort(key=lambda rule_set: rule_set.effective_from)
+            index[key] = ([rule_set.effective_from for rule_set in rule_sets], rule_sets)
+
+        # Swap references in one go so concurrent readers see old or new, never a mix
+        self._index = index
+        self.version = version
+        self.digest = hashlib.sha256(content).hexdigest()[:12]
+        self._raw = raw
+        self._mtime = mtime
+        self._last_check = time.monotonic()
+        logger.info(f"Loaded pricing rules v{version} from {self.path}")
+
+    def maybe_reload(self) -> None:
+        """Reload the rules file if it changed since the last check."""
+        now = time.monotonic()
+        if self._mtime is not None and now - self._last_check < self.reload_interval:
+            return
+
+        with self._lock:
+            if self._mtime is not None and now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self._mtime:
+                    self.load()
+            except (OSError, ValueError, KeyError) as e:
+                if self._mtime is None:
+                    raise
+                logger.error(f"Keeping pricing rules v{self.version}; reload failed: {str(e)}")
+
+    def export(self) -> Dict:
+        """
+        The loaded rules file as parsed JSON, for clients that compute offline.
+
+        Returns:
+            Dictionary with ``version``, ``digest`` and ``rule_sets``
+        """
+        self.maybe_reload()
+        raw = self._raw
+        return {'version': self.version, 'digest': self.digest, 'rule_sets': raw.get('rule_sets', [])}
+
+    def cache_key(self, on: Optional[date] = None) -> str:
+        """
+        Token that changes whenever resolved rules could change.
+
+        Combines the rules file's version and content hash with the pricing date,
+        since rule sets take effect by date.
+
+        Args:
+            on: Date the proposal is priced for (defaults to today)
+
+        Returns:
+            Cache key string
+        """
+        self.maybe_reload()
+        return f"{self.version}-{self.digest}@{(on or date.today()).isoformat()}"
+
+    def resolve(self, project_type: str = '', brand: str = '', on: Optional[date] = None) -> RuleSet:
+        """
+        Find the rule set for a project and brand on a given date.
+
+        Exact (project type, brand) matches win over wildcard entries. Among
+        the rule sets of a match that cover the date, the one that took effect
+        last wins, so a promo running from March to June overrides an
+        open-ended base set only while it runs.
+
+        Args:
+            project_type: Project type from the form (e.g. 'High Rise Building')
+            brand: Brand from the form (e.g. 'The Grand Series')
+            on: Date the proposal is priced for (defaults to today)
+
+        Returns:
+            Matching rule set
+        """
+        self.maybe_reload()
+        on = on or date.today()
+        index = self._index
+
+        for key in (
+            (project_type, brand),
+            (project_type, WILDCARD),
+            (WILDCARD, brand),
+            (WILDCARD, WILDCARD)
+        ):
+            entry = index.get(key)
+            if entry is None:
+                continue
+            dates, rule_sets = entry
+            # Latest set that started by then and has not ended (earlier ones may still run)
+            for position in range(bisect.bisect_right(dates, on) - 1, -1, -1):
+                if rule_sets[position].is_effective(on):
+                    return rule_sets[position]
+
+        raise LookupError(f"No pricing rules effective for {project_type or WILDCARD}/{brand or WILDCARD} on {on}")
+
+
+pricing_rules = PricingRules()
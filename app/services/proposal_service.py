@@ -0,0 +1,288 @@
+"""Service for assembling proposals from submitted form data."""
+from typing import Any, Dict, List, Optional
+
+from app.models.comparison import Comparison, ComparisonUnit
+from app.models.proposal import Proposal
+from app.services.computation_service import ComputationService
+from app.services.pricing_rules import RuleSet, pricing_rules
+
+
+class ProposalService:
+    """Service class that turns form data into a computed Proposal."""
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        """
+        Initialize proposal service.
+
+        Args:
+            rules: Pricing rule set to use (resolved per project and brand if omitted)
+        """
+        self.rules = rules
+
+    def build(self, form_data: Dict[str, str], picture_key: Optional[str] = None) -> Proposal:
+        """
+        Build a proposal and all of its computations in a single pass.
+
+        Args:
+            form_data: Submitted form fields
+            picture_key: Storage key of the processed property picture, if any
+
+        Returns:
+            Fully computed proposal
+        """
+        rules = self._resolve_rules(form_data)
+        proposal = self._build_details(form_data, picture_key, rules)
+        self._compute_schemes(proposal, form_data, ComputationService(rules))
+        return proposal
+
+    def build_comparison(
+        self,
+        form_data: Dict[str, str],
+        units: List[Dict[str, Any]],
+        picture_key: Optional[str] = None,
+        max_units: int = 10
+    ) -> Comparison:
+        """
+        Build a comparison of several units that share the same form inputs.
+
+        Each scheme is computed for all units at once with
+        ComputationService.compute_grid (one call per scheme, with one point
+        per unit and term) instead of building a full proposal per unit.
+
+        Args:
+            form_data: Submitted form fields shared by every unit
+            units: Per-unit fields: ``tcp`` (required), and optionally ``label``,
+                ``reservation_fee`` and the unit details (floor_unit, floor_area,
+                tower_building, phase, block_lot, lot_area, house_model)
+            picture_key: Storage key of the processed property picture, if any
+            max_units: Largest number of units accepted
+
+        Returns:
+            Comparison with per-unit scheme figures
+
+        Raises:
+            ValueError: If there are fewer than two units, more than max_units,
+                or a unit is not an object or has no positive TCP
+        """
+        if not isinstance(units, list) or not 2 <= len(units) <= max_units:
+            raise ValueError(f"A comparison needs between 2 and {max_units} units")
+
+        rules = self._resolve_rules(form_data)
+        comp_service = ComputationService(rules)
+        base = self._build_details(form_data, picture_key, rules)
+        comparison = Comparison(base=base, units=[self._build_unit(base, unit, i, rules) for i, unit in enumerate(units)])
+        self._compute_unit_schemes(comparison, form_data, comp_service)
+        return comparison
+
+    def _resolve_rules(self, form_data: Dict[str, str]) -> RuleSet:
+        """Pricing rules for the submitted project type and brand."""
+        return self.rules or pricing_rules.resolve(
+            form_data.get('project_type', ''), form_data.get('brand', '')
+        )
+
+    def _build_details(self, form_data: Dict[str, str], picture_key: Optional[str], rules: RuleSet) -> Proposal:
+        """Build a proposal's client, project and contract details, without scheme results."""
+        tcp = float(form_data.get('tcp', 0))
+        registration_fee_percent = float(form_data.get('registration_fee_percent', 0))
+        move_in_fee_percent = float(form_data.get('move_in_fee_percent', 0))
+        use_tlp_toggle = form_data.get('use_tlp_toggle') == 'on'  # Checkbox value
+
+        # Base TLP and fees are derived once and reused by every section
+        tlp = rules.total_list_price(tcp, tcp)
+        reg_fee_base = tlp if use_tlp_toggle else tcp
+
+        proposal = Proposal(
+            client_name=form_data.get('client_name', ''),
+            email=form_data.get('email', ''),
+            contact_no=form_data.get('contact_no', ''),
+            product_type=form_data.get('product_type', ''),
+            project_type=form_data.get('project_type', ''),
+            brand=form_data.get('brand', ''),
+            address=form_data.get('address', ''),
+            picture_key=picture_key,
+            tcp=tcp,
+            reservation_fee=float(form_data.get('reservation_fee', 0)),
+            registration_fee_percent=registration_fee_percent,
+            move_in_fee_percent=move_in_fee_percent,
+            use_tlp_toggle=use_tlp_toggle,
+            tlp=tlp,
+            registration_fee=reg_fee_base * (registration_fee_percent / 100),
+            move_in_fee=tlp * (move_in_fee_percent / 100),
+            rules_version=rules.version
+        )
+
+        # Add product-specific fields
+        if proposal.is_vertical:
+            proposal.property_details = form_data.get('property_details_vertical', '')
+            proposal.tower_building = form_data.get('tower_building', '')
+            proposal.floor_unit = form_data.get('floor_unit', '')
+            proposal.floor_area = form_data.get('floor_area', '')
+            proposal.project_advantages = form_data.get('project_advantages', '')
+        else:  # Horizontal
+            proposal.phase = form_data.get('phase', '')
+            proposal.block_lot = form_data.get('block_lot', '')
+            proposal.project_advantages = form_data.get('project_advantages_horiz', '')
+            proposal.lot_area = form_data.get('lot_area', '')
+
+            if proposal.is_house_and_lot:
+                proposal.house_model = form_data.get('house_model', '')
+                proposal.property_details = form_data.get('property_details', '')
+                proposal.floor_area = form_data.get('floor_area', '')
+
+        return proposal
+
+    def _compute_schemes(
+        self,
+        proposal: Proposal,
+        form_data: Dict[str, str],
+        comp_service: ComputationService
+    ) -> None:
+        """Compute every selected payment scheme onto the proposal."""
+        common = (
+            proposal.reservation_fee,
+            proposal.registration_fee_percent,
+            proposal.move_in_fee_percent
+        )
+
+        # Compute Spot Cash if discount provided and checkbox is checked
+        if form_data.get('show_spot_cash') == 'true' and form_data.get('spot_cash_discount'):
+            proposal.spot_cash = comp_service.compute_spot_cash(
+                proposal.tcp, float(form_data['spot_cash_discount']), *common,
+                proposal.use_tlp_toggle
+            )
+
+        # Compute Deferred Payment if terms provided and checkbox is checked
+        if form_data.get('show_deferred_payment') == 'true':
+            deferred_terms = self._parse_terms(form_data, 'deferred_term')
+            if deferred_terms:
+                proposal.deferred_payment = comp_service.compute_deferred_payment(
+                    proposal.tcp, *common, deferred_terms, proposal.use_tlp_toggle
+                )
+
+        # Compute Spot Down Payment if discount provided and checkbox is checked
+        if form_data.get('show_spot_down_payment') == 'true' and form_data.get('spot_down_discount'):
+            proposal.spot_down_payment = comp_service.compute_spot_down_payment(
+                proposal.tcp, float(form_data['spot_down_discount']), *common,
+                proposal.use_tlp_toggle
+            )
+
+        # Compute 20/80 Payment if terms provided and checkbox is checked
+        if form_data.get('show_20_80_payment') == 'true':
+            payment_20_80_terms = self._parse_terms(form_data, 'payment_20_80_term')
+            if payment_20_80_terms:
+                proposal.payment_20_80 = comp_service.compute_20_80_payment(
+                    proposal.tcp, *common, payment_20_80_terms, proposal.use_tlp_toggle
+                )
+
+        # 80% balance amortizations only apply to Spot Down Payment or 20/80 Payment
+        if proposal.spot_down_payment or proposal.payment_20_80:
+            for term in comp_service.rules.balance_80_terms:
+                if form_data.get(f'show_balance_{term.years}yr') != 'true':
+                    continue
+                proposal.balance_80_amortizations.append(
+                    comp_service.compute_80_balance_amortization(
+                        proposal.tcp, term.years, term.rate, proposal.registration_fee
+                    )
+                )
+
+    # Per-unit detail fields and their labels, by product
+    UNIT_DETAIL_FIELDS = {
+        'Vertical': (('tower_building', 'Tower/Building'), ('floor_unit', 'Floor/Unit'), ('floor_area', 'Floor Area')),
+        'House and Lot': (('phase', 'Phase'), ('block_lot', 'Block/Lot'), ('house_model', 'House Model'),
+                          ('lot_area', 'Lot Area'), ('floor_area', 'Floor Area')),
+        'Lot': (('phase', 'Phase'), ('block_lot', 'Block/Lot'), ('lot_area', 'Lot Area')),
+    }
+
+    def _build_unit(self, base: Proposal, unit: Dict[str, Any], index: int, rules: RuleSet) -> ComparisonUnit:
+        """Parse one unit's fields and derive its TLP and fees like a single proposal."""
+        if not isinstance(unit, dict):
+            raise ValueError(f"Unit {index + 1} must be an object of unit fields")
+        tcp = float(unit.get('tcp') or 0)
+        if tcp <= 0:
+            raise ValueError(f"Unit {index + 1} needs a positive TCP")
+
+        product = 'Vertical' if base.is_vertical else ('House and Lot' if base.is_house_and_lot else 'Lot')
+        details = [
+            (label, str(unit[name])) for name, label in self.UNIT_DETAIL_FIELDS[product]
+            if unit.get(name) not in (None, '')
+        ]
+        label = str(unit.get('label') or unit.get('floor_unit') or unit.get('block_lot') or f"Unit {index + 1}")
+
+        tlp = rules.total_list_price(tcp, tcp)
+        reg_fee_base = tlp if base.use_tlp_toggle else tcp
+        return ComparisonUnit(
+            label=label,
+            tcp=tcp,
+            reservation_fee=float(unit.get('reservation_fee', base.reservation_fee) or 0),
+            details=details,
+            tlp=tlp,
+            registration_fee=reg_fee_base * (base.registration_fee_percent / 100),
+            move_in_fee=tlp * (base.move_in_fee_percent / 100)
+        )
+
+    def _compute_unit_schemes(
+        self,
+        comparison: Comparison,
+        form_data: Dict[str, str],
+        comp_service: ComputationService
+    ) -> None:
+        """Compute every selected payment scheme for all units, one grid call per scheme."""
+        base = comparison.base
+        units = comparison.units
+        inputs = [{
+            'tcp': unit.tcp,
+            'reservation_fee': unit.reservation_fee,
+            'registration_fee_percent': base.registration_fee_percent,
+            'move_in_fee_percent': base.move_in_fee_percent,
+        } for unit in units]
+
+        def grid(scheme: str, name: str, values: list) -> List[List[Dict[str, float]]]:
+            # One compute_grid call over every (unit, value) pair; returns per unit one output row per value
+            points = [dict(point, **{name: value}) for point in inputs for value in values]
+            columns = {column: [point[column] for point in points] for column in ComputationService.GRID_INPUTS[scheme]}
+            outputs = comp_service.compute_grid(scheme, columns, base.use_tlp_toggle)
+            rows = [{metric: column[i] for metric, column in outputs.items()} for i in range(len(points))]
+            return [rows[i:i + len(values)] for i in range(0, len(rows), len(values))]
+
+        if form_data.get('show_spot_cash') == 'true' and form_data.get('spot_cash_discount'):
+            comparison.spot_cash_discount = float(form_data['spot_cash_discount'])
+            for unit, rows in zip(units, grid('spot_cash', 'discount', [comparison.spot_cash_discount])):
+                unit.spot_cash = rows[0]
+
+        if form_data.get('show_deferred_payment') == 'true':
+            comparison.deferred_terms = self._parse_terms(form_data, 'deferred_term')
+            if comparison.deferred_terms:
+                for unit, rows in zip(units, grid('deferred_payment', 'term', comparison.deferred_terms)):
+                    unit.deferred_payment = dict(zip(comparison.deferred_terms, rows))
+
+        if form_data.get('show_spot_down_payment') == 'true' and form_data.get('spot_down_discount'):
+            comparison.spot_down_discount = float(form_data['spot_down_discount'])
+            for unit, rows in zip(units, grid('spot_down_payment', 'discount', [comparison.spot_down_discount])):
+                unit.spot_down_payment = rows[0]
+
+        if form_data.get('show_20_80_payment') == 'true':
+            comparison.payment_20_80_terms = self._parse_terms(form_data, 'payment_20_80_term')
+            if comparison.payment_20_80_terms:
+                for unit, rows in zip(units, grid('20_80_payment', 'term', comparison.payment_20_80_terms)):
+                    unit.payment_20_80 = dict(zip(comparison.payment_20_80_terms, rows))
+
+        # 80% balance amortizations only apply to Spot Down Payment or 20/80 Payment
+        if comparison.spot_down_discount is not None or comparison.payment_20_80_terms:
+            comparison.balance_80_terms = [
+                (term.years, term.rate) for term in comp_service.rules.balance_80_terms
+                if form_data.get(f'show_balance_{term.years}yr') == 'true'
+            ]
+            years = [years for years, _ in comparison.balance_80_terms]
+            if years:
+                for unit, rows in zip(units, grid('80_balance', 'years', years)):
+                    unit.balance_80 = dict(zip(years, rows))
+
+    @staticmethod
+    def _parse_terms(form_data: Dict[str, str], prefix: str, count: int = 3) -> List[int]:
+        """Collect the positive month terms from numbered form fields."""
+        terms = []
+        for i in range(1, count + 1):
+            value = form_data.get(f'{prefix}{i}')
+            if value and int(value) > 0:
+                terms.append(int(value))
+        return terms
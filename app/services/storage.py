@@ -0,0 +1,391 @@
+"""Storage backends for processed pictures and generated PDFs."""
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, ContextManager, Dict, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+from werkzeug.utils import send_file
+
+logger = logging.getLogger(__name__)
+
+# Storage areas and the config key holding each one's local folder
+NAMESPACES = {
+    'pictures': 'UPLOAD_FOLDER',
+    'proposals': 'PROPOSAL_FOLDER',
+    'archive': 'ARCHIVE_FOLDER',
+}
+
+# Areas created by the feature using them, only when it is enabled
+OPTIONAL_NAMESPACES = ('archive',)
+
+SERVE_MODES = ('direct', 'x-sendfile', 'x-accel')
+
+# Chunk size for streaming S3 objects to the client
+_STREAM_CHUNK = 64 * 1024
+
+
+class Storage:
+    """
+    Interface shared by the storage backends.
+
+    Keys are plain file names (no directories), unique per storage area.
+    """
+
+    def save(self, key: str, data: bytes) -> str:
+        """Store bytes under a key and return the key."""
+        with self.writer(key) as fh:
+            fh.write(data)
+        return key
+
+    def read(self, key: str) -> bytes:
+        """Return the bytes stored under a key."""
+        with self.open(key) as fh:
+            return fh.read()
+
+    def open(self, key: str) -> BinaryIO:
+        """Open a stored object for reading."""
+        raise NotImplementedError
+
+    def writer(self, key: str) -> ContextManager[BinaryIO]:
+        """Context manager yielding a binary file; its contents are stored on exit."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under a key."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a stored object; missing keys are ignored."""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of a stored object, or None if it does not live on local disk."""
+        return None
+
+    def send(self, key: str, download_name: str, mimetype: str, delete: bool = False) -> Response:
+        """
+        Build a download response for a stored object.
+
+        Args:
+            key: Object to send
+            download_name: File name offered to the browser
+            mimetype: Content type of the object
+            delete: Remove the object once it has been sent
+
+        Returns:
+            Response with the object as an attachment
+        """
+        data = self.read(key)
+        if delete:
+            self.delete(key)
+        return send_file(
+            io.BytesIO(data), request.environ, mimetype=mimetype, as_attachment=True,
+            download_name=download_name, response_class=current_app.response_class
+        )
+
+
+def check_key(key: str) -> str:
+    """
+    Reject keys that could escape their storage area.
+
+    Args:
+        key: Key to check
+
+    Returns:
+        The key unchanged
+
+    Raises:
+        ValueError: If the key is empty, hidden or contains a path separator
+    """
+    if not key or key.startswith('.') or '/' in key or '\\' in key or '\0' in key:
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+class LocalStorage(Storage):
+    """
+    Objects are files in one folder.
+
+    Downloads are served from the file itself: through ``wsgi.file_wrapper``
+    (which lets servers such as gunicorn use ``sendfile``), or by handing the
+    path to the front-end server with ``X-Sendfile`` (Apache, lighttpd) or
+    ``X-Accel-Redirect`` (nginx). Either way the PDF bytes are never copied
+    through Python.
+    """
+
+    def __init__(self, root: str, serve_mode: str = 'direct', accel_prefix: str = '',
+                 handoff_ttl: float = 300):
+        """
+        Initialize local storage.
+
+        Args:
+            root: Folder holding the objects (created if missing)
+            serve_mode: 'direct', 'x-sendfile' or 'x-accel'
+            accel_prefix: Internal nginx location mapped to ``root`` (x-accel mode)
+            handoff_ttl: Seconds to keep files handed to the front-end server before purging them
+        """
+        if serve_mode not in SERVE_MODES:
+            raise ValueError(f"Unknown serve mode: {serve_mode!r} (expected one of {', '.join(SERVE_MODES)})")
+        self.root = root
+        self.serve_mode = serve_mode
+        self.accel_prefix = accel_prefix.rstrip('/') + '/'
+        self.handoff_ttl = handoff_ttl
+        self._last_purge = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Filesystem path for a key."""
+        return os.path.join(self.root, check_key(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), 'rb')
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        path = self.path(key)
+        try:
+            with open(path, 'wb') as fh:
+                yield fh
+        except BaseException:
+            self.delete(key)
+            raise
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path(key)
+
+    def send(self, key: str, download_name: str, mimetype: str, delete: bool = False) -> Response:
+        path = self.path(key)
+        handoff = self.serve_mode != 'direct'
+        response = send_file(
+            path, request.environ, mimetype=mimetype, as_attachment=True, download_name=download_name,
+            use_x_sendfile=handoff, response_class=current_app.response_class,
+            _root_path=current_app.root_path
+        )
+        if self.serve_mode == 'x-accel':
+            del response.headers['X-Sendfile']
+            response.headers['X-Accel-Redirect'] = self.accel_prefix + key
+
+        if delete:
+            if handoff:
+                # The front-end server reads the file after this response; purge it later
+                self.purge_expired()
+            else:
+                # send_file holds the file open, so it can be unlinked before it is streamed
+                self.delete(key)
+        return response
+
+    def purge_expired(self) -> int:
+        """
+        Delete files older than the hand-off TTL (at most once per TTL).
+
+        Returns:
+            Number of files deleted
+        """
+        now = time.time()
+        if now - self._last_purge < self.handoff_ttl:
+            return 0
+        self._last_purge = now
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > self.handoff_ttl:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info(f"Purged {removed} expired file(s) from {self.root}")
+        return removed
+
+
+class MemoryStorage(Storage):
+    """
+    Objects are kept in a dict in this process.
+
+    For tests and single-process development; objects are not shared
+    between worker processes.
+    """
+
+    def __init__(self):
+        """Initialize in-memory storage."""
+        self._objects: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def save(self, key: str, data: bytes) -> str:
+        with self._lock:
+            self._objects[check_key(key)] = bytes(data)
+        return key
+
+    def read(self, key: str) -> bytes:
+        with self._lock:
+            try:
+                return self._objects[key]
+            except KeyError:
+                raise FileNotFoundError(key) from None
+
+    def open(self, key: str) -> BinaryIO:
+        return io.BytesIO(self.read(key))
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        check_key(key)
+        buffer = io.BytesIO()
+        yield buffer
+        self.save(key, buffer.getvalue())
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._objects
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._objects.pop(key, None)
+
+
+class S3Storage(Storage):
+    """
+    Objects live in an S3-compatible bucket under a key prefix.
+
+    boto3 is only needed when this backend is used. Point ``endpoint_url``
+    at MinIO or ``moto_server`` to run against a local stand-in.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', client=None, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, spool_threshold: int = 1024 * 1024):
+        """
+        Initialize S3 storage.
+
+        Args:
+            bucket: Bucket name
+            prefix: Key prefix for this storage area (e.g. 'proposals/')
+            client: boto3 S3 client to use (default: one built from the arguments below)
+            endpoint_url: Custom endpoint for S3-compatible servers
+            region: Region name
+            spool_threshold: Uploads larger than this are buffered on disk before sending
+        """
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+            client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.spool_threshold = spool_threshold
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + check_key(key)
+
+    def save(self, key: str, data: bytes) -> str:
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key) from None
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[BinaryIO]:
+        object_key = self._object_key(key)
+        with SpooledTemporaryFile(max_size=self.spool_threshold, mode='w+b') as buffer:
+            yield buffer
+            buffer.seek(0)
+            self.client.upload_fileobj(buffer, self.bucket, object_key)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def send(self, key: str, download_name: str, mimetype: str, delete: bool = False) -> Response:
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key) from None
+        # Stream the body in chunks instead of reading it all into memory
+        body = obj['Body']
+        response = current_app.response_class(body.iter_chunks(_STREAM_CHUNK), mimetype=mimetype)
+        response.content_length = obj['ContentLength']
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        response.call_on_close(body.close)
+        if delete:
+            response.call_on_close(lambda: self.delete(key))
+        return response
+
+
+def create_storage(app: Flask, namespace: str) -> Storage:
+    """
+    Build the configured backend for one storage area.
+
+    Args:
+        app: Flask application (STORAGE_* settings)
+        namespace: Storage area, one of NAMESPACES
+
+    Returns:
+        Storage instance
+    """
+    config = app.config
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(
+            config[NAMESPACES[namespace]],
+            serve_mode=config['STORAGE_SERVE_MODE'],
+            accel_prefix=f"{config['STORAGE_ACCEL_PREFIX'].rstrip('/')}/{namespace}",
+            handoff_ttl=config['STORAGE_HANDOFF_TTL']
+        )
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 's3':
+        if not config['STORAGE_S3_BUCKET']:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires STORAGE_S3_BUCKET")
+        return S3Storage(
+            config['STORAGE_S3_BUCKET'],
+            prefix=f"{config['STORAGE_S3_PREFIX']}{namespace}/",
+            endpoint_url=config['STORAGE_S3_ENDPOINT_URL'],
+            region=config['STORAGE_S3_REGION']
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r} (expected local, memory or s3)")
+
+
+def init_storage(app: Flask) -> None:
+    """
+    Create the storage areas for an app.
+
+    Args:
+        app: Flask application
+    """
+    app.extensions['storage'] = {
+        namespace: create_storage(app, namespace) for namespace in NAMESPACES if namespace not in OPTIONAL_NAMESPACES
+    }
+    logger.info(f"Storage backend: {app.config['STORAGE_BACKEND']}")
+
+
+def get_storage(namespace: str) -> Storage:
+    """Return the current app's storage for one area ('pictures', 'proposals' or 'archive')."""
+    return current_app.extensions['storage'][namespace]
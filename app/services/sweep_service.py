@@ -0,0 +1,165 @@
+"""Service for scenario sweeps over payment-scheme inputs."""
+import itertools
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.computation_service import ComputationService
+
+
+class SweepService:
+    """Service class for computing payment schemes over a grid of inputs."""
+
+    # Inputs that divide the result and therefore must be strictly positive
+    POSITIVE_INPUTS = {'term', 'years'}
+
+    def __init__(self, comp_service: ComputationService, max_points: int = 10000):
+        """
+        Initialize sweep service.
+
+        Args:
+            comp_service: Computation service holding the pricing rules to use
+            max_points: Maximum number of grid points per sweep
+        """
+        self.comp_service = comp_service
+        self.max_points = max_points
+
+    def sweep(
+        self,
+        scheme: str,
+        inputs: Dict[str, Any],
+        metrics: Optional[List[str]] = None,
+        summary_only: bool = False,
+        use_tlp_for_reg_fee: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Compute a scheme over the cartesian product of its swept inputs.
+
+        Each input is either a single number (held fixed), a list of values,
+        or a range object ``{"start": .., "stop": .., "step": ..}`` with an
+        inclusive stop. Only inputs with more than one value become axes.
+
+        Args:
+            scheme: Scheme name (spot_cash, spot_down_payment, deferred_payment, 20_80_payment, 80_balance)
+            inputs: Input values or ranges keyed by input name
+            metrics: Output metrics to return (defaults to all)
+            summary_only: If True, return only min/max/mean per metric
+            use_tlp_for_reg_fee: If True, use TLP for reg fee calculation
+
+        Returns:
+            Dictionary with axes, grid shape, metric grids and/or summaries
+
+        Raises:
+            ValueError: If the scheme, inputs or metrics are invalid, or the grid is too large
+        """
+        input_names = ComputationService.GRID_INPUTS.get(scheme)
+        if input_names is None:
+            raise ValueError(f"Unsupported scheme: {scheme}")
+        if not isinstance(inputs, dict):
+            raise ValueError("inputs must be an object of input values or ranges")
+        if metrics is not None and (
+            not isinstance(metrics, list) or not all(isinstance(metric, str) for metric in metrics)
+        ):
+            raise ValueError("metrics must be a list of metric names")
+
+        unknown = set(inputs) - set(input_names)
+        if unknown:
+            raise ValueError(f"Unknown inputs for {scheme}: {', '.join(sorted(unknown))}")
+
+        values = {name: self._expand(name, inputs.get(name, 0)) for name in input_names}
+        axes = [(name, values[name]) for name in input_names if len(values[name]) > 1]
+        shape = [len(axis_values) for _, axis_values in axes]
+        self._check_size(shape)
+
+        # Build flat input columns in row-major order over all inputs
+        points = list(itertools.product(*(values[name] for name in input_names)))
+        columns = {name: [point[i] for point in points] for i, name in enumerate(input_names)}
+
+        outputs = self.comp_service.compute_grid(scheme, columns, use_tlp_for_reg_fee)
+        if metrics:
+            missing = [metric for metric in metrics if metric not in outputs]
+            if missing:
+                raise ValueError(f"Unknown metrics for {scheme}: {', '.join(missing)}")
+            outputs = {metric: outputs[metric] for metric in metrics}
+
+        result = {
+            'scheme': scheme,
+            'axes': {name: axis_values for name, axis_values in axes},
+            'fixed': {name: values[name][0] for name in input_names if len(values[name]) == 1},
+            'shape': shape,
+            'points': len(points),
+            'rules_version': self.comp_service.rules.version,
+            'summary': {
+                metric: self._summarize(column, axes, shape)
+                for metric, column in outputs.items()
+            }
+        }
+
+        if not summary_only:
+            result['metrics'] = {
+                metric: self._reshape(column, shape)
+                for metric, column in outputs.items()
+            }
+
+        return result
+
+    def _expand(self, name: str, spec: Any) -> List[float]:
+        """Expand an input spec into its list of values, enforcing the grid cap."""
+        if isinstance(spec, dict):
+            start = float(spec['start'])
+            stop = float(spec['stop'])
+            step = float(spec.get('step', 1))
+            if step <= 0 or stop < start:
+                raise ValueError(f"Invalid range for {name}: start <= stop and step > 0 required")
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            if count > self.max_points:
+                raise ValueError(f"Range for {name} has {count} values; the limit is {self.max_points} grid points")
+            expanded = [round(start + i * step, 10) for i in range(count)]
+        elif isinstance(spec, (list, tuple)):
+            if not spec:
+                raise ValueError(f"Empty value list for {name}")
+            expanded = [float(value) for value in spec]
+        else:
+            expanded = [float(spec)]
+
+        if name in self.POSITIVE_INPUTS and any(value <= 0 for value in expanded):
+            raise ValueError(f"All values for {name} must be greater than 0")
+
+        return expanded
+
+    def _check_size(self, shape: List[int]) -> None:
+        """Raise if a grid of the given shape exceeds the point cap."""
+        total = math.prod(shape) if shape else 1
+        if total > self.max_points:
+            raise ValueError(f"Grid has {total} points; the limit is {self.max_points}")
+
+    @staticmethod
+    def _reshape(column: List[float], shape: List[int]) -> Any:
+        """Turn a flat row-major column into nested lists of the given shape."""
+        if not shape:
+            return column[0]
+        nested = column
+        for size in reversed(shape[1:]):
+            nested = [nested[i:i + size] for i in range(0, len(nested), size)]
+        return nested
+
+    @staticmethod
+    def _summarize(column: List[float], axes: List[Tuple[str, List[float]]], shape: List[int]) -> Dict[str, Any]:
+        """Compute min/max/mean of a metric and the axis coordinates of its extremes."""
+        min_index = min(range(len(column)), key=column.__getitem__)
+        max_index = max(range(len(column)), key=column.__getitem__)
+        return {
+            'min': column[min_index],
+            'max': column[max_index],
+            'mean': math.fsum(column) / len(column),
+            'min_at': SweepService._coordinates(min_index, axes, shape),
+            'max_at': SweepService._coordinates(max_index, axes, shape)
+        }
+
+    @staticmethod
+    def _coordinates(flat_index: int, axes: List[Tuple[str, List[float]]], shape: List[int]) -> Dict[str, float]:
+        """Map a flat row-major index back to axis values."""
+        coordinates = {}
+        for (name, axis_values), size in zip(reversed(axes), reversed(shape)):
+            flat_index, position = divmod(flat_index, size)
+            coordinates[name] = axis_values[position]
+        return dict(reversed(list(coordinates.items())))
@@ -0,0 +1,167 @@
+/**
+ * Offline outbox for proposal submissions, shared by the page and the service worker.
+ *
+ * Submissions made without a connection are kept in IndexedDB (uploaded photos
+ * included) and replayed to /generate-proposal once it is back. Each result, a
+ * PDF or an error message, waits in a second store until the page picks it up.
+ */
+const Outbox = (() => {
+    const DB_NAME = 'realty-outbox';
+    const DB_VERSION = 1;
+    const PENDING = 'pending';
+    const RESULTS = 'results';
+    const ENDPOINT = '/generate-proposal';
+    // Responses that leave an entry queued for the next flush (network errors do too)
+    const RETRY_STATUSES = [429, 502, 503, 504];
+
+    // The flush in progress, so overlapping triggers do not send an entry twice
+    let flushing = null;
+
+    function openDatabase() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(PENDING, { keyPath: 'id' });
+                request.result.createObjectStore(RESULTS, { keyPath: 'id' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    /**
+     * Run fn(transaction) in one transaction and resolve with the result of
+     * the request it returns, once the transaction has committed
+     */
+    async function transact(stores, mode, fn) {
+        const db = await openDatabase();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(stores, mode);
+            const request = fn(tx);
+            tx.oncomplete = () => {
+                db.close();
+                resolve(request ? request.result : undefined);
+            };
+            tx.onerror = tx.onabort = () => {
+                db.close();
+                reject(tx.error);
+            };
+        });
+    }
+
+    function newId() {
+        if (self.crypto && self.crypto.randomUUID) {
+            return self.crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+    }
+
+    /**
+     * Queue a submission; returns the stored entry
+     */
+    async function add(formData) {
+        const entry = {
+            id: newId(),
+            created: Date.now(),
+            label: formData.get('client_name') || '',
+            fields: Array.from(formData.entries())
+        };
+        await transact(PENDING, 'readwrite', tx => tx.objectStore(PENDING).put(entry));
+        return entry;
+    }
+
+    function count() {
+        return transact(PENDING, 'readonly', tx => tx.objectStore(PENDING).count());
+    }
+
+    /**
+     * Send queued submissions, oldest first, until one cannot be sent yet.
+     * Resolves with the ids sent and the number still queued.
+     */
+    function flush() {
+        if (!flushing) {
+            flushing = sendPending().finally(() => {
+                flushing = null;
+            });
+        }
+        return flushing;
+    }
+
+    async function sendPending() {
+        const entries = await transact(PENDING, 'readonly', tx => tx.objectStore(PENDING).getAll());
+        entries.sort((a, b) => a.created - b.created);
+
+        const sent = [];
+        for (const entry of entries) {
+            const result = await send(entry);
+            if (!result) {
+                break;
+            }
+            // Store the result and drop the entry together
+            await transact([PENDING, RESULTS], 'readwrite', tx => {
+                tx.objectStore(PENDING).delete(entry.id);
+                return tx.objectStore(RESULTS).put(result);
+            });
+            sent.push(entry.id);
+        }
+        return { sent, remaining: entries.length - sent.length };
+    }
+
+    /**
+     * POST one entry; resolves with its result, or null to retry later
+     */
+    async function send(entry) {
+        const formData = new FormData();
+        entry.fields.forEach(([name, value]) => formData.append(name, value));
+
+        let response;
+        try {
+            response = await fetch(ENDPOINT, {
+                method: 'POST',
+                body: formData,
+                headers: { 'Idempotency-Key': entry.id }
+            });
+        } catch (error) {
+            // Still offline
+            return null;
+        }
+        if (RETRY_STATUSES.includes(response.status)) {
+            // Busy, or unreachable behind the proxy; any other error is stored as the result
+            return null;
+        }
+
+        const result = { id: entry.id, label: entry.label, created: entry.created };
+        const contentType = response.headers.get('content-type') || '';
+        if (response.ok && contentType.includes('application/pdf')) {
+            result.pdf = await response.blob();
+            result.filename = filenameFrom(response.headers.get('content-disposition'));
+        } else {
+            try {
+                result.error = (await response.json()).message;
+            } catch {
+                result.error = null;
+            }
+            result.error = result.error || `Failed to generate proposal (HTTP ${response.status})`;
+        }
+        return result;
+    }
+
+    function filenameFrom(contentDisposition) {
+        const match = (contentDisposition || '').match(/filename[^;=\n]*=((['"]).*?\2|[^;\n]*)/);
+        return match && match[1] ? match[1].replace(/['"]/g, '') : 'proposal.pdf';
+    }
+
+    /**
+     * Remove and return every finished result
+     */
+    function takeResults() {
+        return transact(RESULTS, 'readwrite', tx => {
+            const store = tx.objectStore(RESULTS);
+            const request = store.getAll();
+            store.clear();
+            return request;
+        });
+    }
+
+    return { add, count, flush, takeResults };
+})();
@@ -0,0 +1,513 @@
+/**
+ * Client-side proposal preview.
+ *
+ * Computes a proposal from the form the way ProposalService does, with the
+ * pricing rules from /api/pricing-rules (cached by the service worker, with a
+ * built-in copy of the default rules as a last resort), and lays it out in the
+ * same sections and tables as PDFService. It needs no connection, and the
+ * browser's print dialog turns it into a PDF.
+ */
+const ProposalPreview = (() => {
+    const WILDCARD = '*';
+
+    // Same as the default rule set in app/data/pricing_rules.json
+    const DEFAULT_RULES = {
+        version: 'built-in',
+        rule_sets: [{
+            id: 'default',
+            project_type: WILDCARD,
+            brand: WILDCARD,
+            effective_from: '2000-01-01',
+            effective_to: null,
+            vat_divisor: 1.12,
+            vat_threshold: 3600000,
+            factor_rates: [
+                { min_years: 1, max_years: 5, factor_rate: 0.0212470447 },
+                { min_years: 6, max_years: 7, factor_rate: 0.0181919633 },
+                { min_years: 8, max_years: 10, factor_rate: 0.0161334957 }
+            ],
+            balance_80_terms: [
+                { years: 5, rate: 10 },
+                { years: 7, rate: 13 },
+                { years: 10, rate: 15 }
+            ]
+        }]
+    };
+
+    const DISCLAIMER = [
+        '1. This sample computation is valid for one whole calendar week (7 calendar days) from the date of signing.',
+        '2. The bank-accredited appraiser will be for cash and check deposit is exclusive for application fees only.',
+        '3. All check payments must be payable to Moldex Realty Inc. / Moldex Land Inc.',
+        '4. Inclusive terms, terms, and discounts are for cash basis only and must be settled within 7 days from reservation or notice.',
+        '5. Prices are VAT inclusive whenever applicable.',
+        '6. The developer reserves the right to correct any figure in this sample computation in case of typographical error.',
+        '7. Sellers and organic employees on-site are not allowed to issue official receipts, provisional receipts, or acknowledgment receipts.',
+        '8. The depositor\'s copy and photocopy of the check must be attached to the sales documents.',
+        '9. The buyer understands (and evidences by their signature in the form) that the sample computation may only be considered final if approved by management.'
+    ];
+    const MOVE_IN_ITEMS = [
+        'Occupancy Permit',
+        'Fire Safety Compliance',
+        'Fire Insurance (para sa In-House Fin)',
+        'Electric Guarantee Consumption/Service',
+        'Water Guarantee Deposit/Connection Charges',
+        'Processing Fee/Service Fee'
+    ];
+    const REGISTRATION_ITEMS = [
+        'Documentary Stamp',
+        'Transfer Fee',
+        'Registration and IT Fee',
+        'Annotation/Legal/Notarization Fees',
+        'Processing Fee',
+        'Service Fee'
+    ];
+
+    let pictureUrls = [];
+
+    /* ---------- Pricing rules ---------- */
+
+    async function loadRules(url) {
+        if (url) {
+            try {
+                const response = await fetch(url);
+                if (response.ok) {
+                    return (await response.json()).data;
+                }
+            } catch {
+                // Offline and not cached yet
+            }
+        }
+        return DEFAULT_RULES;
+    }
+
+    /**
+     * Pick the rule set for a project and brand on a date, like PricingRules.resolve
+     */
+    function resolveRules(registry, projectType, brand, on) {
+        const pad = value => String(value).padStart(2, '0');
+        const today = `${on.getFullYear()}-${pad(on.getMonth() + 1)}-${pad(on.getDate())}`;
+        const keys = [[projectType, brand], [projectType, WILDCARD], [WILDCARD, brand], [WILDCARD, WILDCARD]];
+        for (const [type, brandKey] of keys) {
+            const candidates = registry.rule_sets
+                .filter(rs => (rs.project_type || WILDCARD) === type && (rs.brand || WILDCARD) === brandKey)
+                .filter(rs => (rs.effective_from || '2000-01-01') <= today)
+                .filter(rs => !rs.effective_to || today <= rs.effective_to)
+                .sort((a, b) => (a.effective_from || '2000-01-01').localeCompare(b.effective_from || '2000-01-01'));
+            const latest = candidates[candidates.length - 1];
+            if (latest) {
+                return latest;
+            }
+        }
+        return DEFAULT_RULES.rule_sets[0];
+    }
+
+    function totalListPrice(rules, amount, tcp) {
+        return tcp <= rules.vat_threshold ? amount : amount / rules.vat_divisor;
+    }
+
+    function factorRate(rules, years) {
+        const bands = [...rules.factor_rates].sort((a, b) => a.min_years - b.min_years);
+        let band = null;
+        bands.forEach(candidate => {
+            if (candidate.min_years <= years) {
+                band = candidate;
+            }
+        });
+        return band && years <= band.max_years ? band.factor_rate : 0;
+    }
+
+    /* ---------- Computations (as in ComputationService) ---------- */
+
+    function parseTerms(form, prefix) {
+        const terms = [];
+        for (let i = 1; i <= 3; i++) {
+            const value = parseInt(form[`${prefix}${i}`], 10);
+            if (value > 0) {
+                terms.push(value);
+            }
+        }
+        return terms;
+    }
+
+    function fees(rules, base, tcp, proposal) {
+        const tlp = totalListPrice(rules, base, tcp);
+        const regBase = proposal.use_tlp_toggle ? tlp : base;
+        return {
+            tlp,
+            registration_fee: regBase * (proposal.registration_fee_percent / 100),
+            move_in_fee: tlp * (proposal.move_in_fee_percent / 100)
+        };
+    }
+
+    /**
+     * Build the proposal model from the submitted form fields, like ProposalService.build
+     */
+    function buildProposal(formData, registry) {
+        const form = {};
+        formData.forEach((value, key) => {
+            if (!(key in form) && typeof value === 'string') {
+                form[key] = value;
+            }
+        });
+
+        const number = name => parseFloat(form[name]) || 0;
+        const rules = resolveRules(registry, form.project_type || '', form.brand || '', new Date());
+        const tcp = number('tcp');
+        const proposal = {
+            client_name: form.client_name || '',
+            email: form.email || '',
+            contact_no: form.contact_no || '',
+            product_type: form.product_type || '',
+            project_type: form.project_type || '',
+            brand: form.brand || '',
+            address: form.address || '',
+            tcp,
+            reservation_fee: number('reservation_fee'),
+            registration_fee_percent: number('registration_fee_percent'),
+            move_in_fee_percent: number('move_in_fee_percent'),
+            use_tlp_toggle: form.use_tlp_toggle === 'on',
+            rules_version: registry.version
+        };
+        Object.assign(proposal, fees(rules, tcp, tcp, proposal));
+
+        if (proposal.product_type === 'Vertical') {
+            Object.assign(proposal, {
+                property_details: form.property_details_vertical || '',
+                tower_building: form.tower_building || '',
+                floor_unit: form.floor_unit || '',
+                floor_area: form.floor_area || '',
+                project_advantages: form.project_advantages || ''
+            });
+        } else {
+            Object.assign(proposal, {
+                phase: form.phase || '',
+                block_lot: form.block_lot || '',
+                project_advantages: form.project_advantages_horiz || '',
+                lot_area: form.lot_area || ''
+            });
+            if (proposal.project_type === 'House and Lot') {
+                Object.assign(proposal, {
+                    house_model: form.house_model || '',
+                    property_details: form.property_details || '',
+                    floor_area: form.floor_area || ''
+                });
+            }
+        }
+
+        const rf = proposal.reservation_fee;
+        if (form.show_spot_cash === 'true' && form.spot_cash_discount) {
+            const discount = parseFloat(form.spot_cash_discount);
+            const termDiscount = tcp * (discount / 100);
+            const dtcp = tcp - termDiscount;
+            const f = fees(rules, dtcp, tcp, proposal);
+            proposal.spot_cash = {
+                tcp, discount_percent: discount, term_discount: termDiscount, dtcp,
+                reservation_fee: rf, dtcp_less_rf: dtcp - rf, ...f,
+                total_payment: dtcp + f.registration_fee + f.move_in_fee
+            };
+        }
+
+        if (form.show_deferred_payment === 'true') {
+            const terms = parseTerms(form, 'deferred_term');
+            if (terms.length > 0) {
+                proposal.deferred_payment = {
+                    tcp, ntcp: tcp, reservation_fee: rf, tcp_less_rf: tcp - rf,
+                    ...fees(rules, tcp, tcp, proposal), terms
+                };
+            }
+        }
+
+        if (form.show_spot_down_payment === 'true' && form.spot_down_discount) {
+            const discount = parseFloat(form.spot_down_discount);
+            const downPayment = tcp * 0.20;
+            const termDiscount = downPayment * (discount / 100);
+            proposal.spot_down_payment = {
+                tcp, down_payment: downPayment, discount_percent: discount, term_discount: termDiscount,
+                reservation_fee: rf, ndp: downPayment - termDiscount - rf, balance_80: tcp * 0.80,
+                ...fees(rules, tcp, tcp, proposal)
+            };
+        }
+
+        if (form.show_20_80_payment === 'true') {
+            const terms = parseTerms(form, 'payment_20_80_term');
+            if (terms.length > 0) {
+                const downPayment = tcp * 0.20;
+                const ndp = downPayment - rf;
+                const f = fees(rules, tcp, tcp, proposal);
+                proposal.payment_20_80 = {
+                    tcp, down_payment: downPayment, reservation_fee: rf, ndp, balance_80: tcp * 0.80, ...f, terms,
+                    net_down_payment_20: ndp,
+                    with_move_in: ndp + f.move_in_fee,
+                    with_reg_fee: ndp + f.registration_fee,
+                    with_reg_and_move_in: ndp + f.registration_fee + f.move_in_fee
+                };
+            }
+        }
+
+        proposal.balance_80_amortizations = [];
+        if (proposal.spot_down_payment || proposal.payment_20_80) {
+            rules.balance_80_terms.forEach(term => {
+                if (form[`show_balance_${term.years}yr`] !== 'true') {
+                    return;
+                }
+                const rate = factorRate(rules, term.years);
+                proposal.balance_80_amortizations.push({
+                    years: term.years,
+                    rate: term.rate,
+                    ma: tcp * 0.80 * rate,
+                    ma_with_reg: (tcp * 0.80 + proposal.registration_fee) * rate
+                });
+            });
+        }
+        return proposal;
+    }
+
+    /* ---------- Layout (as in PDFService) ---------- */
+
+    function currency(amount) {
+        return 'P' + Number(amount).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+    }
+
+    function esc(value) {
+        return escapeHtml(value === undefined || value === null ? '' : value);
+    }
+
+    function detailsTable(rows, className = '') {
+        return `<table class="pv-details ${className}">${rows.map(([label, value]) =>
+            `<tr><th>${esc(label)}</th><td>${esc(value)}</td></tr>`).join('')}</table>`;
+    }
+
+    function schemeTable(title, rows) {
+        const body = rows.map(row => {
+            if (row === null) {
+                return '<tr class="pv-gap"><td colspan="3"></td></tr>';
+            }
+            if (row.length === 1) {
+                return `<tr class="pv-label"><td colspan="3">${esc(row[0])}</td></tr>`;
+            }
+            return `<tr><td>${esc(row[0])}</td><td>${esc(row[1])}</td><td>${esc(row[2])}</td></tr>`;
+        }).join('');
+        return `<table class="pv-scheme">
+            <tr class="pv-title"><th colspan="3">${esc(title)}</th></tr>
+            <tr class="pv-head"><th>Description</th><th>Formula</th><th>Amount</th></tr>
+            ${body}
+        </table>`;
+    }
+
+    function amortizationTable(terms, net, regFee, moveInFee) {
+        const rows = [...terms].sort((a, b) => a - b).map(term => `<tr>
+            <td>${term}</td>
+            <td>${currency(net / term)}</td>
+            <td>${currency((net + regFee) / term)}</td>
+            <td>${currency((net + moveInFee) / term)}</td>
+            <td>${currency((net + regFee + moveInFee) / term)}</td>
+        </tr>`).join('');
+        return `<table class="pv-ma">
+            <tr><th>Months</th><th>MA</th><th>MA w/ RegF</th><th>MA w/ MIF</th><th>MA w/ RegF &amp; MIF</th></tr>
+            ${rows}
+        </table>`;
+    }
+
+    function balance80Section(proposal, balance80) {
+        const amortizations = proposal.balance_80_amortizations;
+        let html = schemeTable('80% BALANCE TERMS', [
+            ['80% Balance', 'TCP × 80%', currency(balance80)],
+            ['80% with Reg Fee', '80% Balance + Reg Fee', currency(balance80 + proposal.registration_fee)]
+        ]);
+        if (amortizations.length > 0) {
+            html += `<table class="pv-ma">
+                <tr><th>Years (Interest %)</th>${amortizations.map(a => `<th>${a.years} years (${Math.round(a.rate)}%)</th>`).join('')}</tr>
+                <tr><td>MA</td>${amortizations.map(a => `<td>${currency(a.ma)}</td>`).join('')}</tr>
+                <tr><td>MA w/ RegF</td>${amortizations.map(a => `<td>${currency(a.ma_with_reg)}</td>`).join('')}</tr>
+            </table>`;
+        }
+        return html;
+    }
+
+    /**
+     * Registration fee formula: on TLP with the toggle on, otherwise on the given base
+     */
+    function regFeeFormula(proposal, base) {
+        return `${proposal.use_tlp_toggle ? 'TLP' : base} × RGF%`;
+    }
+
+    function paymentTerms(proposal) {
+        const parts = [];
+        const sc = proposal.spot_cash;
+        if (sc) {
+            parts.push(schemeTable('SPOT CASH', [
+                ['Total Contract Price (TCP)', '—', currency(sc.tcp)],
+                ['Less the Term Discount (TD)', `TCP × ${sc.discount_percent}%`, currency(sc.term_discount)],
+                ['Discounted TCP (DTCP)/Net TCP (NTCP)', 'TCP - TD', currency(sc.dtcp)],
+                ['Less Reservation Fee (RF)', 'Input', currency(sc.reservation_fee)],
+                ['DTCP - RF', 'DTCP - RF', currency(sc.dtcp_less_rf)],
+                ['Registration Fee (RGF)', regFeeFormula(proposal, 'DTCP'), currency(sc.registration_fee)],
+                ['Move-in Fee (MIF)', 'TLP × MIF%', currency(sc.move_in_fee)],
+                ['Total Payment', 'NTCP + RGF + MIF', currency(sc.total_payment)]
+            ]));
+        }
+
+        const dp = proposal.deferred_payment;
+        if (dp) {
+            parts.push(schemeTable('DEFERRED PAYMENT', [
+                ['Total Contract Price (TCP)/Net TCP (NTCP)', '—', currency(dp.tcp)],
+                ['Less Reservation Fee (RF)', 'Input', currency(dp.reservation_fee)],
+                ['TCP - RF', 'TCP - RF', currency(dp.tcp_less_rf)],
+                ['Registration Fee (RGF)', regFeeFormula(proposal, 'TCP'), currency(dp.registration_fee)],
+                ['Move-in Fee (MIF)', 'TLP × MIF%', currency(dp.move_in_fee)]
+            ]) + amortizationTable(dp.terms, dp.ntcp, dp.registration_fee, dp.move_in_fee));
+        }
+
+        const sd = proposal.spot_down_payment;
+        if (sd) {
+            parts.push(schemeTable('SPOT DOWN PAYMENT', [
+                ['Total Contract Price (TCP)', '—', currency(sd.tcp)],
+                ['Get the 20% Down Payment (DP)', 'TCP × 20%', currency(sd.down_payment)],
+                ['Less the Term Discount (TD)', `DP × ${sd.discount_percent}%`, currency(sd.term_discount)],
+                ['Less Reservation Fee (RF)', 'Input', currency(sd.reservation_fee)],
+                ['Net Down Payment (NDP)', 'DP - (TD + RF)', currency(sd.ndp)],
+                ['80% Balance', 'TCP × 80%', currency(sd.balance_80)],
+                ['Registration Fee (RGF)', regFeeFormula(proposal, 'TCP'), currency(sd.registration_fee)],
+                ['Move-in Fee (MIF)', 'TLP × MIF%', currency(sd.move_in_fee)]
+            ]));
+            if (proposal.balance_80_amortizations.length > 0) {
+                parts.push(balance80Section(proposal, sd.balance_80));
+            }
+        }
+
+        const p = proposal.payment_20_80;
+        if (p) {
+            parts.push(schemeTable('20/80 PAYMENT TERM', [
+                ['Total Contract Price (TCP)', '—', currency(p.tcp)],
+                ['Get the 20% Down Payment (DP)', 'TCP × 20%', currency(p.down_payment)],
+                ['Less Reservation Fee (RF)', 'Input', currency(p.reservation_fee)],
+                ['Net Down Payment (NDP)', 'DP - RF', currency(p.ndp)],
+                ['80% Balance', 'TCP × 80%', currency(p.balance_80)],
+                ['Registration Fee (RGF)', regFeeFormula(proposal, 'TCP'), currency(p.registration_fee)],
+                ['Move-in Fee (MIF)', 'TLP × MIF%', currency(p.move_in_fee)],
+                null,
+                ['Payment Options:'],
+                ['20% Net Down Payment', '', currency(p.net_down_payment_20)],
+                ['20% with Move-in Fee', '', currency(p.with_move_in)],
+                ['20% with Reg Fee', '', currency(p.with_reg_fee)],
+                ['20% with Reg Fee & Move-in Fee', '', currency(p.with_reg_and_move_in)]
+            ]) + amortizationTable(p.terms, p.ndp, p.registration_fee, p.move_in_fee));
+            if (proposal.balance_80_amortizations.length > 0) {
+                parts.push(balance80Section(proposal, p.balance_80));
+            }
+        }
+        return parts.map(part => `<div class="pv-block">${part}</div>`).join('');
+    }
+
+    function projectRows(proposal) {
+        const rows = [
+            ['Product Type:', proposal.product_type],
+            ['Project Type:', proposal.project_type],
+            ['Brand:', proposal.brand],
+            ['Address:', proposal.address]
+        ];
+        if (proposal.product_type === 'Vertical') {
+            if (proposal.property_details) {
+                rows.push(['Property Details:', proposal.property_details]);
+            }
+            rows.push(['Tower/Building:', proposal.tower_building], ['Floor/Unit:', proposal.floor_unit],
+                ['Floor Area:', proposal.floor_area]);
+        } else {
+            rows.push(['Phase:', proposal.phase], ['Block/Lot:', proposal.block_lot]);
+            if (proposal.project_type === 'House and Lot') {
+                rows.push(['House Model:', proposal.house_model], ['Property Details:', proposal.property_details],
+                    ['Lot Area:', proposal.lot_area], ['Floor Area:', proposal.floor_area]);
+            } else {
+                rows.push(['Lot Area:', proposal.lot_area]);
+            }
+        }
+        return rows;
+    }
+
+    function render(proposal, pictures, headerUrl) {
+        const date = new Date().toLocaleDateString('en-US', { month: 'long', day: '2-digit', year: 'numeric' });
+        const picture = pictures.length > 0
+            ? `<div class="pv-picture pv-picture-${pictures.length}">${pictures.map(url => `<img src="${esc(url)}" alt="">`).join('')}</div>`
+            : '';
+        const advantages = proposal.project_advantages
+            ? `<h2>PROJECT ADVANTAGES</h2><p class="pv-advantages">${esc(proposal.project_advantages)}</p>`
+            : '';
+        const checklist = items => items.map(item => `&#9745; ${esc(item)}`).join('<br>');
+
+        return `
+            <section class="pv-page">
+                ${headerUrl ? `<img class="pv-header" src="${esc(headerUrl)}" alt="Moldex Realty">` : ''}
+                <h1>Proposal</h1>
+                <p class="pv-date">Date: ${esc(date)}</p>
+                <p>Good day! Thank you for considering Moldex Realty as your next investment. Here's a detailed sample computation to help you explore your dream home.</p>
+                <h2>CLIENT'S DETAILS</h2>
+                ${detailsTable([['Client\'s Name:', proposal.client_name], ['Email Address:', proposal.email], ['Contact No.:', proposal.contact_no]])}
+                <h2>PROJECT DETAILS</h2>
+                ${detailsTable(projectRows(proposal))}
+                ${picture}
+                ${advantages}
+                <h2>CONTRACT DETAILS</h2>
+                ${detailsTable([
+                    ['Total Contract Price (TCP):', currency(proposal.tcp)],
+                    ['Reservation Fee:', currency(proposal.reservation_fee)],
+                    ['Registration Fee %:', `${proposal.registration_fee_percent.toFixed(2)}%`],
+                    ['Move-in Fee %:', `${proposal.move_in_fee_percent.toFixed(2)}%`]
+                ], 'pv-contract')}
+            </section>
+            <section class="pv-page">
+                <h2>PAYMENT TERMS</h2>
+                ${paymentTerms(proposal)}
+            </section>
+            <section class="pv-page">
+                <h2>DISCLAIMER / ACKNOWLEDGEMENT</h2>
+                <div class="pv-disclaimer">${DISCLAIMER.map(esc).join('<br><br>')}</div>
+                <table class="pv-signatures">
+                    <tr><td colspan="2">Acknowledged by:</td></tr>
+                    <tr><td>_________________________________</td><td>_________________________________</td></tr>
+                    <tr><td>Buyer's Signature Over Printed Name</td><td>Seller's Signature Over Printed Name</td></tr>
+                </table>
+                <div class="pv-note">
+                    <p><b>Note:</b><br>Registration and Move-In Fees are required under <b>PD 957</b> and <b>DHSUD regulations</b> as part of the legal process for property registration and turnover.</p>
+                    <table>
+                        <tr><th>Move In Fee</th><th>Registration Fee</th></tr>
+                        <tr><td>${checklist(MOVE_IN_ITEMS)}</td><td>${checklist(REGISTRATION_ITEMS)}</td></tr>
+                    </table>
+                </div>
+                <p class="pv-footnote">Preview computed on this device with pricing rules ${esc(proposal.rules_version)}. The generated PDF is the official copy.</p>
+            </section>`;
+    }
+
+    /* ---------- Overlay ---------- */
+
+    /**
+     * Compute and show the preview for a submission's fields
+     */
+    async function show(formData, options) {
+        const overlay = document.getElementById('previewOverlay');
+        const registry = await loadRules(options.rulesUrl);
+        const proposal = buildProposal(formData, registry);
+
+        // Up to four distinct photos, as ImageService puts in the collage
+        const seen = new Set();
+        const files = formData.getAll('pictures').filter(file => {
+            if (!(file instanceof File) || file.size === 0 || seen.has(file.name)) {
+                return false;
+            }
+            seen.add(file.name);
+            return true;
+        });
+        pictureUrls.forEach(url => URL.revokeObjectURL(url));
+        pictureUrls = files.slice(0, 4).map(file => URL.createObjectURL(file));
+
+        document.getElementById('previewDocument').innerHTML = render(proposal, pictureUrls, options.headerUrl);
+        overlay.hidden = false;
+        document.body.classList.add('previewing');
+    }
+
+    function hide() {
+        document.getElementById('previewOverlay').hidden = true;
+        document.body.classList.remove('previewing');
+    }
+
+    return { show, hide, buildProposal };
+})();
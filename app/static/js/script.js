@@ -10,6 +10,8 @@ const brandHorizontal = document.getElementById('brand_horizontal');
 const houseAndLotFields = document.getElementById('house_and_lot_fields');
 const lotOnlyFields = document.getElementById('lot_only_fields');
 const generateBtn = document.getElementById('generateBtn');
+const previewBtn = document.getElementById('previewBtn');
+const regenerateBtn = document.getElementById('regenerateBtn');
 const loadingSpinner = document.getElementById('loadingSpinner');
 const messageDisplay = document.getElementById('messageDisplay');
 
@@ -69,6 +71,15 @@ const balance80MAReg7Field = document.getElementById('balance_80_ma_reg_7');
 const balance80MA10Field = document.getElementById('balance_80_ma_10');
 const balance80MAReg10Field = document.getElementById('balance_80_ma_reg_10');
 
+// Server-side draft of the form: where drafts live, this one's id and token, the revision
+// and fields the server has, the pending autosave and the save in progress
+const DRAFT_STORAGE_KEY = 'realty-draft-id';
+const DRAFT_TOKEN_STORAGE_KEY = 'realty-draft-token';
+const DRAFT_SAVE_DELAY = 1500;
+const draftState = {
+    url: null, id: null, token: null, revision: 0, saved: {}, timer: null, saving: Promise.resolve()
+};
+
 // Event Listeners
 productType.addEventListener('change', handleProductTypeChange);
 projectTypeVertical.addEventListener('change', handleProjectTypeVerticalChange);
@@ -98,6 +109,14 @@ payment2080Term3Field.addEventListener('input', calculateAll);
 
 // Form submission
 proposalForm.addEventListener('submit', handleFormSubmit);
+if (previewBtn) {
+    previewBtn.addEventListener('click', handlePreview);
+    document.getElementById('previewClose').addEventListener('click', () => ProposalPreview.hide());
+    document.getElementById('previewPrint').addEventListener('click', () => window.print());
+}
+if (regenerateBtn) {
+    regenerateBtn.addEventListener('click', handleRegenerate);
+}
 
 // Initialize form state
 handleProductTypeChange();
@@ -559,6 +578,67 @@ function update80BalanceTable(terms, balance80, balance80WithReg) {
     });
 }
 
+/**
+ * Collect the form into the fields /generate-proposal expects
+ */
+function buildFormData() {
+    const formData = new FormData(proposalForm);
+    
+    // Add display options checkboxes
+    formData.set('show_spot_cash', document.getElementById('show_spot_cash').checked);
+    formData.set('show_deferred_payment', document.getElementById('show_deferred_payment').checked);
+    formData.set('show_spot_down_payment', document.getElementById('show_spot_down_payment').checked);
+    formData.set('show_20_80_payment', document.getElementById('show_20_80_payment').checked);
+    formData.set('show_balance_5yr', document.getElementById('show_balance_5yr').checked);
+    formData.set('show_balance_7yr', document.getElementById('show_balance_7yr').checked);
+    formData.set('show_balance_10yr', document.getElementById('show_balance_10yr').checked);
+    
+    // Handle conditional fields based on product type
+    const productTypeValue = formData.get('product_type');
+    
+    if (productTypeValue === 'Vertical') {
+        formData.set('project_type', formData.get('project_type') || '');
+        formData.set('brand', formData.get('brand') || formData.get('brand_vertical') || '');
+        formData.set('address', formData.get('address') || formData.get('address_vertical') || '');
+        formData.set('property_details_vertical', formData.get('property_details_vertical') || '');
+        formData.set('floor_area', formData.get('floor_area') || formData.get('floor_area_vertical') || '');
+        
+        const pictureFiles = document.getElementById('picture_vertical').files;
+        if (pictureFiles.length > 0) {
+            for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
+                formData.append('pictures', pictureFiles[i]);
+            }
+        }
+    } else {
+        formData.set('project_type', formData.get('project_type_horiz') || '');
+        formData.set('brand', formData.get('brand_horiz') || '');
+        formData.set('address', formData.get('address_horiz') || '');
+        
+        if (formData.get('project_type_horiz') === 'House and Lot') {
+            formData.set('lot_area', formData.get('lot_area_hl') || '');
+            formData.set('floor_area', formData.get('floor_area_hl') || '');
+            
+            const pictureFiles = document.getElementById('picture_hl').files;
+            if (pictureFiles.length > 0) {
+                for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
+                    formData.append('pictures', pictureFiles[i]);
+                }
+            }
+        } else {
+            formData.set('lot_area', formData.get('lot_area_lot') || '');
+            
+            const pictureFiles = document.getElementById('picture_lot').files;
+            if (pictureFiles.length > 0) {
+                for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
+                    formData.append('pictures', pictureFiles[i]);
+                }
+            }
+        }
+    }
+    
+    return formData;
+}
+
 /**
  * Handle form submission
  */
@@ -575,114 +655,453 @@ async function handleFormSubmit(e) {
     loadingSpinner.style.display = 'block';
     messageDisplay.style.display = 'none';
     
+    const formData = buildFormData();
     try {
-        const formData = new FormData(proposalForm);
-        
-        // Add display options checkboxes
-        formData.set('show_spot_cash', document.getElementById('show_spot_cash').checked);
-        formData.set('show_deferred_payment', document.getElementById('show_deferred_payment').checked);
-        formData.set('show_spot_down_payment', document.getElementById('show_spot_down_payment').checked);
-        formData.set('show_20_80_payment', document.getElementById('show_20_80_payment').checked);
-        formData.set('show_balance_5yr', document.getElementById('show_balance_5yr').checked);
-        formData.set('show_balance_7yr', document.getElementById('show_balance_7yr').checked);
-        formData.set('show_balance_10yr', document.getElementById('show_balance_10yr').checked);
-        
-        // Handle conditional fields based on product type
-        const productTypeValue = formData.get('product_type');
-        
-        if (productTypeValue === 'Vertical') {
-            formData.set('project_type', formData.get('project_type') || '');
-            formData.set('brand', formData.get('brand') || formData.get('brand_vertical') || '');
-            formData.set('address', formData.get('address') || formData.get('address_vertical') || '');
-            formData.set('property_details_vertical', formData.get('property_details_vertical') || '');
-            formData.set('floor_area', formData.get('floor_area') || formData.get('floor_area_vertical') || '');
+        // Without a connection, keep the submission for later
+        if (!navigator.onLine && typeof Outbox !== 'undefined') {
+            await queueSubmission(formData);
+            return;
+        }
+        
+        // Send request
+        let response;
+        try {
+            response = await fetch('/generate-proposal', {
+                method: 'POST',
+                body: formData
+            });
+        } catch (error) {
+            // The request never reached the server: queue it if we can
+            if (typeof Outbox === 'undefined') {
+                throw error;
+            }
+            await queueSubmission(formData);
+            return;
+        }
+        
+        await deliverPdfResponse(response);
+    } catch (error) {
+        console.error('Error:', error);
+        showMessage('error', 'An error occurred while generating the proposal. Please try again.');
+    } finally {
+        generateBtn.disabled = false;
+        loadingSpinner.style.display = 'none';
+    }
+}
+
+/**
+ * Download the PDF in a /generate-proposal style response, or show its error
+ */
+async function deliverPdfResponse(response) {
+    if (response.ok) {
+        // Check if response is a PDF file
+        const contentType = response.headers.get('content-type');
+        if (contentType && contentType.includes('application/pdf')) {
+            // Get the blob and trigger download
+            const blob = await response.blob();
             
-            const pictureFiles = document.getElementById('picture_vertical').files;
-            if (pictureFiles.length > 0) {
-                for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
-                    formData.append('pictures', pictureFiles[i]);
+            // Get filename from Content-Disposition header or use default
+            const contentDisposition = response.headers.get('content-disposition');
+            let filename = 'proposal.pdf';
+            if (contentDisposition) {
+                const filenameMatch = contentDisposition.match(/filename[^;=\n]*=((['"]).*?\2|[^;\n]*)/);
+                if (filenameMatch && filenameMatch[1]) {
+                    filename = filenameMatch[1].replace(/['"]/g, '');
                 }
             }
-        } else {
-            formData.set('project_type', formData.get('project_type_horiz') || '');
-            formData.set('brand', formData.get('brand_horiz') || '');
-            formData.set('address', formData.get('address_horiz') || '');
+            downloadBlob(blob, filename);
             
-            if (formData.get('project_type_horiz') === 'House and Lot') {
-                formData.set('lot_area', formData.get('lot_area_hl') || '');
-                formData.set('floor_area', formData.get('floor_area_hl') || '');
-                
-                const pictureFiles = document.getElementById('picture_hl').files;
-                if (pictureFiles.length > 0) {
-                    for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
-                        formData.append('pictures', pictureFiles[i]);
-                    }
-                }
+            const rejected = parseRejectedUploads(response.headers.get('X-Rejected-Uploads'));
+            if (rejected.length > 0) {
+                showMessage('success', 'Proposal generated and downloaded. Some photos were left out:<br>' +
+                    rejected.map(item => `${escapeHtml(item.file)}: ${escapeHtml(item.reason)}`).join('<br>'));
             } else {
-                formData.set('lot_area', formData.get('lot_area_lot') || '');
-                
-                const pictureFiles = document.getElementById('picture_lot').files;
-                if (pictureFiles.length > 0) {
-                    for (let i = 0; i < Math.min(pictureFiles.length, 4); i++) {
-                        formData.append('pictures', pictureFiles[i]);
-                    }
-                }
+                showMessage('success', 'Proposal generated and downloaded successfully!');
             }
+        } else {
+            // Try to parse as JSON for error messages
+            const result = await response.json();
+            showMessage('error', result.message || 'Failed to generate proposal');
         }
-        
-        // Send request
-        const response = await fetch('/generate-proposal', {
-            method: 'POST',
-            body: formData
+    } else {
+        // Handle error response
+        try {
+            const result = await response.json();
+            showMessage('error', result.message || 'Failed to generate proposal');
+        } catch {
+            showMessage('error', 'Failed to generate proposal. Please try again.');
+        }
+    }
+}
+
+/**
+ * Save a file to the device
+ */
+function downloadBlob(blob, filename) {
+    const url = window.URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.style.display = 'none';
+    a.href = url;
+    a.download = filename;
+    
+    document.body.appendChild(a);
+    a.click();
+    window.URL.revokeObjectURL(url);
+    document.body.removeChild(a);
+}
+
+/**
+ * Keep a submission in the offline outbox and ask for it to be sent once online
+ */
+async function queueSubmission(formData) {
+    await Outbox.add(formData);
+    
+    const registration = navigator.serviceWorker ? await navigator.serviceWorker.getRegistration() : null;
+    if (registration && registration.sync) {
+        try {
+            await registration.sync.register('proposal-outbox');
+        } catch {
+            // Background Sync refused; the page sends it when it comes back online
+        }
+    }
+    
+    const pending = await Outbox.count();
+    showMessage('success', `You're offline, so the proposal was saved on this device (${pending} waiting). ` +
+        'It will be generated and downloaded when the connection is back.');
+}
+
+/**
+ * Send queued submissions: through the service worker if one controls the page
+ */
+async function flushOutbox() {
+    if (typeof Outbox === 'undefined' || !navigator.onLine) {
+        return;
+    }
+    if (navigator.serviceWorker && navigator.serviceWorker.controller) {
+        navigator.serviceWorker.controller.postMessage({ type: 'flush-outbox' });
+    } else {
+        await Outbox.flush();
+        await deliverQueuedResults();
+    }
+}
+
+/**
+ * Download the PDFs of queued submissions that were sent, and report failures
+ */
+async function deliverQueuedResults() {
+    const results = await Outbox.takeResults();
+    const failures = [];
+    results.sort((a, b) => a.created - b.created).forEach(result => {
+        if (result.pdf) {
+            downloadBlob(result.pdf, result.filename);
+        } else {
+            failures.push(`${escapeHtml(result.label || 'Proposal')}: ${escapeHtml(result.error)}`);
+        }
+    });
+    
+    if (failures.length > 0) {
+        showMessage('error', 'Some saved proposals could not be generated:<br>' + failures.join('<br>'));
+    } else if (results.length > 0) {
+        showMessage('success', `${results.length} saved proposal(s) generated and downloaded.`);
+    }
+}
+
+/**
+ * Show the client-side preview of the current form
+ */
+async function handlePreview() {
+    if (!validateForm()) {
+        return;
+    }
+    await ProposalPreview.show(buildFormData(), {
+        rulesUrl: document.body.dataset.pricingRules,
+        headerUrl: document.body.dataset.headerImage
+    });
+}
+
+/**
+ * Register the service worker and the outbox triggers (PWA mode only)
+ */
+function initOfflineSupport() {
+    const serviceWorkerUrl = document.body.dataset.serviceWorker;
+    if (!serviceWorkerUrl || typeof Outbox === 'undefined') {
+        return;
+    }
+    
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register(serviceWorkerUrl).catch(error => {
+            console.error('Service worker registration failed:', error);
         });
-        
-        if (response.ok) {
-            // Check if response is a PDF file
-            const contentType = response.headers.get('content-type');
-            if (contentType && contentType.includes('application/pdf')) {
-                // Get the blob and trigger download
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.style.display = 'none';
-                a.href = url;
-                
-                // Get filename from Content-Disposition header or use default
-                const contentDisposition = response.headers.get('content-disposition');
-                let filename = 'proposal.pdf';
-                if (contentDisposition) {
-                    const filenameMatch = contentDisposition.match(/filename[^;=\n]*=((['"]).*?\2|[^;\n]*)/);
-                    if (filenameMatch && filenameMatch[1]) {
-                        filename = filenameMatch[1].replace(/['"]/g, '');
-                    }
-                }
-                a.download = filename;
-                
-                document.body.appendChild(a);
-                a.click();
-                window.URL.revokeObjectURL(url);
-                document.body.removeChild(a);
-                
-                showMessage('success', 'Proposal generated and downloaded successfully!');
-            } else {
-                // Try to parse as JSON for error messages
-                const result = await response.json();
-                showMessage('error', result.message || 'Failed to generate proposal');
+        navigator.serviceWorker.addEventListener('message', event => {
+            if (event.data && event.data.type === 'outbox-synced') {
+                deliverQueuedResults();
             }
-        } else {
-            // Handle error response
-            try {
-                const result = await response.json();
-                showMessage('error', result.message || 'Failed to generate proposal');
-            } catch {
-                showMessage('error', 'Failed to generate proposal. Please try again.');
+        });
+    }
+    
+    window.addEventListener('online', flushOutbox);
+    deliverQueuedResults().then(flushOutbox);
+}
+
+/**
+ * Restore the saved draft, if any, and save changes as they are made (drafts mode only)
+ */
+async function initDrafts() {
+    draftState.url = document.body.dataset.drafts;
+    if (!draftState.url || !window.localStorage) {
+        return;
+    }
+    
+    const id = localStorage.getItem(DRAFT_STORAGE_KEY);
+    draftState.token = localStorage.getItem(DRAFT_TOKEN_STORAGE_KEY);
+    if (id && draftState.token) {
+        try {
+            const response = await fetch(`${draftState.url}/${id}`, { headers: draftHeaders() });
+            if (response.ok) {
+                const draft = (await response.json()).data;
+                adoptDraft(draft);
+                restoreDraftFields(draft.fields);
+                const photos = draft.pictures.length > 0 ? ` with ${draft.pictures.length} saved photo(s)` : '';
+                showMessage('success', `Your saved draft${photos} was restored.`);
+            } else if (response.status === 404) {
+                localStorage.removeItem(DRAFT_STORAGE_KEY);
+                localStorage.removeItem(DRAFT_TOKEN_STORAGE_KEY);
             }
+        } catch {
+            // Offline: the first save once back online starts a new draft
+        }
+    }
+    
+    proposalForm.addEventListener('input', event => {
+        if (event.target.type !== 'file') {
+            scheduleDraftSave();
+        }
+    });
+    proposalForm.addEventListener('change', event => {
+        if (event.target.type === 'file') {
+            // Photos are processed once, when chosen, and kept with the draft
+            saveDraft(Array.from(event.target.files).slice(0, 4));
+        } else {
+            scheduleDraftSave();
+        }
+    });
+    window.addEventListener('online', scheduleDraftSave);
+}
+
+/**
+ * Take a draft sent by the server as the one being edited
+ */
+function adoptDraft(draft) {
+    draftState.id = draft.id;
+    draftState.revision = draft.revision;
+    draftState.saved = draft.fields;
+    localStorage.setItem(DRAFT_STORAGE_KEY, draft.id);
+    if (draft.token) {
+        // Only sent when the draft is created
+        draftState.token = draft.token;
+        localStorage.setItem(DRAFT_TOKEN_STORAGE_KEY, draft.token);
+    }
+    regenerateBtn.hidden = false;
+}
+
+/**
+ * Headers for a call on the current draft (its token, plus any others)
+ */
+function draftHeaders(headers = {}) {
+    return { ...headers, 'X-Draft-Token': draftState.token || '' };
+}
+
+/**
+ * The fields saved in a draft: those sent to /generate-proposal, without the computed ones
+ */
+function draftFields() {
+    const fields = {};
+    for (const [name, value] of buildFormData().entries()) {
+        const element = proposalForm.elements.namedItem(name);
+        if (typeof value === 'string' && !(element && element.readOnly)) {
+            fields[name] = value;
+        }
+    }
+    return fields;
+}
+
+/**
+ * The change from the fields the server has to the given ones
+ */
+function draftChanges(fields) {
+    const changes = { revision: draftState.revision, set: {}, unset: [] };
+    Object.entries(fields).forEach(([name, value]) => {
+        if (draftState.saved[name] !== value) {
+            changes.set[name] = value;
+        }
+    });
+    Object.keys(draftState.saved).forEach(name => {
+        if (!(name in fields)) {
+            changes.unset.push(name);
+        }
+    });
+    return changes;
+}
+
+/**
+ * Whether a draft change changes anything
+ */
+function hasDraftChanges(changes) {
+    return Object.keys(changes.set).length > 0 || changes.unset.length > 0;
+}
+
+/**
+ * Fill the form from saved draft fields
+ */
+function restoreDraftFields(fields) {
+    // Selects whose change handlers reset other fields go first
+    if (fields.product_type) {
+        productType.value = fields.product_type;
+    }
+    handleProductTypeChange();
+    if (productType.value === 'Vertical' && fields.project_type) {
+        projectTypeVertical.value = fields.project_type;
+        handleProjectTypeVerticalChange();
+    } else if (productType.value !== 'Vertical' && fields.project_type_horiz) {
+        projectTypeHorizontal.value = fields.project_type_horiz;
+        handleProjectTypeHorizontalChange();
+    }
+    
+    // The other product type's fields share names with these (project_type, brand, ...)
+    const otherFields = productType.value === 'Vertical' ? horizontalFields : verticalFields;
+    Array.from(proposalForm.elements).forEach(element => {
+        if (!element.name || element.type === 'file' || element.readOnly || element.disabled ||
+            otherFields.contains(element)) {
+            return;
+        }
+        if (element.type === 'checkbox') {
+            element.checked = fields[element.name] === 'true' || fields[element.name] === 'on';
+        } else if (element.name in fields) {
+            element.value = fields[element.name];
+        }
+    });
+    
+    calculateAll();
+}
+
+/**
+ * Save the draft once the agent pauses typing
+ */
+function scheduleDraftSave() {
+    clearTimeout(draftState.timer);
+    draftState.timer = setTimeout(() => saveDraft(), DRAFT_SAVE_DELAY);
+}
+
+/**
+ * Save the form (and newly chosen photos) to the draft now. Saves run one at
+ * a time; a failed one is retried with the next change.
+ */
+function saveDraft(pictures) {
+    clearTimeout(draftState.timer);
+    draftState.saving = draftState.saving
+        .then(() => sendDraft())
+        .then(() => pictures && sendDraftPictures(pictures))
+        .catch(error => console.warn('Draft not saved:', error));
+    return draftState.saving;
+}
+
+/**
+ * Create the draft, or send the fields changed since the last save
+ */
+async function sendDraft(retry = true) {
+    const fields = draftFields();
+    if (!draftState.id) {
+        const response = await fetch(draftState.url, jsonRequest('POST', { fields }));
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
         }
+        adoptDraft((await response.json()).data);
+        return;
+    }
+    
+    const changes = draftChanges(fields);
+    if (!hasDraftChanges(changes)) {
+        return;
+    }
+    const response = await fetch(
+        `${draftState.url}/${draftState.id}`, jsonRequest('PATCH', changes, draftHeaders())
+    );
+    if (retry && response.status === 409) {
+        // Saved from another tab meanwhile: send the change from what the server has
+        adoptDraft((await response.json()).data);
+        return sendDraft(false);
+    }
+    if (retry && response.status === 404) {
+        // Expired: start a new draft
+        draftState.id = null;
+        return sendDraft(false);
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    draftState.revision = (await response.json()).data.revision;
+    draftState.saved = fields;
+}
+
+/**
+ * Replace the draft's photos with the chosen files
+ */
+async function sendDraftPictures(files) {
+    const formData = new FormData();
+    files.forEach(file => formData.append('pictures', file));
+    
+    const response = await fetch(`${draftState.url}/${draftState.id}/pictures`, {
+        method: 'PUT', body: formData, headers: draftHeaders()
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        showMessage('error', result.message || 'The photos could not be saved with the draft');
+    } else if (result.data.rejected.length > 0) {
+        showMessage('error', 'Some photos will be left out:<br>' +
+            result.data.rejected.map(item => `${escapeHtml(item.file)}: ${escapeHtml(item.reason)}`).join('<br>'));
+    }
+}
+
+/**
+ * fetch() options for a JSON request
+ */
+function jsonRequest(method, body, headers = {}) {
+    return {
+        method,
+        headers: { ...headers, 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    };
+}
+
+/**
+ * Generate the proposal from the saved draft: photos and figures already on
+ * the server are reused, so nothing is uploaded again
+ */
+async function handleRegenerate() {
+    if (!validateForm()) {
+        return;
+    }
+    
+    regenerateBtn.disabled = true;
+    loadingSpinner.style.display = 'block';
+    messageDisplay.style.display = 'none';
+    
+    try {
+        await saveDraft();
+        if (!draftState.id || hasDraftChanges(draftChanges(draftFields()))) {
+            showMessage('error', 'The draft could not be saved. Please check your connection and try again.');
+            return;
+        }
+        
+        const response = await fetch(`${draftState.url}/${draftState.id}/generate`, {
+            method: 'POST', headers: draftHeaders()
+        });
+        await deliverPdfResponse(response);
     } catch (error) {
         console.error('Error:', error);
         showMessage('error', 'An error occurred while generating the proposal. Please try again.');
     } finally {
-        generateBtn.disabled = false;
+        regenerateBtn.disabled = false;
         loadingSpinner.style.display = 'none';
     }
 }
@@ -727,6 +1146,29 @@ function showMessage(type, message) {
     messageDisplay.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
 }
 
+/**
+ * Parse the list of skipped photos sent with a generated proposal
+ */
+function parseRejectedUploads(header) {
+    if (!header) {
+        return [];
+    }
+    try {
+        return JSON.parse(header);
+    } catch {
+        return [];
+    }
+}
+
+/**
+ * Escape text for insertion into HTML
+ */
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = String(text);
+    return div.innerHTML;
+}
+
 /**
  * Format number as currency with Peso sign
  */
@@ -747,4 +1189,6 @@ function formatPercent(value) {
 // Initialize calculations on page load
 window.addEventListener('load', () => {
     calculateAll();
+    initOfflineSupport();
+    initDrafts();
 });
@@ -0,0 +1,105 @@
+/**
+ * Service worker: keeps the form usable offline and syncs queued proposals.
+ * Rendered by app/routes/pwa.py, which fills in the app shell URLs.
+ */
+const CACHE_PREFIX = 'realty-shell-';
+const CACHE = CACHE_PREFIX + {{ version|tojson }};
+const SHELL = {{ shell|tojson }};
+const SYNC_TAG = 'proposal-outbox';
+
+importScripts({{ outbox_url|tojson }});
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE)
+            .then(cache => cache.addAll(SHELL))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith(CACHE_PREFIX) && key !== CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.mode === 'navigate') {
+        // Fresh page when online, the cached form when not
+        event.respondWith(networkFirst(request, SHELL[0]));
+    } else if (url.pathname.startsWith('/static/dist/')) {
+        // Fingerprinted files never change
+        event.respondWith(cacheFirst(request));
+    } else if (SHELL.includes(url.pathname)) {
+        event.respondWith(networkFirst(request));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(flushOutbox(true));
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'flush-outbox') {
+        event.waitUntil(flushOutbox(false));
+    }
+});
+
+/**
+ * Send queued proposals and tell open pages which ones are ready
+ */
+async function flushOutbox(failWhenPending) {
+    const { sent, remaining } = await Outbox.flush();
+    if (sent.length > 0) {
+        const windows = await self.clients.matchAll({ type: 'window' });
+        windows.forEach(client => client.postMessage({ type: 'outbox-synced', ids: sent }));
+    }
+    if (remaining > 0 && failWhenPending) {
+        // A failed sync event is retried by the browser later
+        throw new Error(`${remaining} queued proposal(s) not sent yet`);
+    }
+}
+
+async function networkFirst(request, fallbackUrl) {
+    const cache = await caches.open(CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request, { ignoreVary: true })
+            || (fallbackUrl && await cache.match(fallbackUrl, { ignoreVary: true }));
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(CACHE);
+    const cached = await cache.match(request, { ignoreVary: true });
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        cache.put(request, response.clone());
+    }
+    return response;
+}
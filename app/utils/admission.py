@@ -0,0 +1,355 @@
+"""Admission control for the heavy endpoints: per-client rate limits, a global build limit and idempotency keys."""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from flask import Flask, current_app, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    client TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS slots (
+    id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    """Tokens in a bucket after refilling at ``rate`` per second since ``updated``, capped at ``burst``."""
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryAdmissionBackend:
+    """Admission state for one worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._slots: Dict[str, float] = {}
+        self._keys: Dict[str, float] = {}
+
+    def take_token(self, client: str, rate: float, burst: float) -> float:
+        """
+        Take one token from a client's bucket.
+
+        Returns:
+            0 if a token was taken, else seconds until one is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                return 0.0
+            self._buckets[client] = (tokens, now)
+            # Forget idle clients whose buckets are full again
+            if len(self._buckets) > 10000:
+                self._buckets = {
+                    name: state for name, state in self._buckets.items()
+                    if _refill(*state, now, rate, burst) < burst
+                }
+        return (1 - tokens) / rate
+
+    def acquire_slot(self, limit: int, ttl: float) -> Optional[str]:
+        """Take one of ``limit`` build slots; returns its id, or None if all are taken."""
+        now = time.monotonic()
+        with self._lock:
+            self._slots = {slot: expires for slot, expires in self._slots.items() if expires > now}
+            if len(self._slots) >= limit:
+                return None
+            slot = uuid.uuid4().hex
+            self._slots[slot] = now + ttl
+            return slot
+
+    def release_slot(self, slot: str) -> None:
+        """Give a build slot back."""
+        with self._lock:
+            self._slots.pop(slot, None)
+
+    def claim_key(self, key: str, ttl: float) -> bool:
+        """Mark an idempotency key as in flight; False if it already is."""
+        now = time.monotonic()
+        with self._lock:
+            if self._keys.get(key, 0) > now:
+                return False
+            self._keys = {name: expires for name, expires in self._keys.items() if expires > now}
+            self._keys[key] = now + ttl
+            return True
+
+    def release_key(self, key: str) -> None:
+        """Mark an idempotency key as no longer in flight."""
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+class SQLiteAdmissionBackend:
+    """
+    Admission state shared by every worker process through one SQLite file.
+
+    Slots and keys expire after their ``ttl``, so a worker that dies while
+    holding one does not leak it.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the backend, creating the database if needed.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction, taken up front."""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def take_token(self, client: str, rate: float, burst: float) -> float:
+        """
+        Take one token from a client's bucket.
+
+        Returns:
+            0 if a token was taken, else seconds until one is available
+        """
+        # Wall-clock time, since it is compared across processes
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE client = ?', (client,)).fetchone()
+            tokens = _refill(*row, now, rate, burst) if row else burst
+            taken = tokens >= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (client, tokens, updated) VALUES (?, ?, ?)',
+                (client, tokens - 1 if taken else tokens, now)
+            )
+            # Full buckets carry no state worth keeping
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - burst / rate,))
+        return 0.0 if taken else (1 - tokens) / rate
+
+    def acquire_slot(self, limit: int, ttl: float) -> Optional[str]:
+        """Take one of ``limit`` build slots; returns its id, or None if all are taken."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM slots WHERE expires <= ?', (now,))
+            (count,) = conn.execute('SELECT COUNT(*) FROM slots').fetchone()
+            if count >= limit:
+                return None
+            slot = uuid.uuid4().hex
+            conn.execute('INSERT INTO slots (id, expires) VALUES (?, ?)', (slot, now + ttl))
+        return slot
+
+    def release_slot(self, slot: str) -> None:
+        """Give a build slot back."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM slots WHERE id = ?', (slot,))
+
+    def claim_key(self, key: str, ttl: float) -> bool:
+        """Mark an idempotency key as in flight; False if it already is."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM idempotency_keys WHERE expires <= ?', (now,))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO idempotency_keys (key, expires) VALUES (?, ?)', (key, now + ttl)
+            )
+        return cursor.rowcount == 1
+
+    def release_key(self, key: str) -> None:
+        """Mark an idempotency key as no longer in flight."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+
+class AdmissionController:
+    """
+    Decides whether a heavy request (image processing and a PDF build) may run now.
+
+    In order, a request is turned away:
+
+    - with 429 if another request with its Idempotency-Key is still running
+      (a duplicate submission);
+    - with 429 if its client has used up its token bucket (``rate`` builds
+      per second, in bursts of up to ``burst``);
+    - with 503 if ``max_concurrent`` builds are already running and no slot
+      frees up within ``queue_timeout`` seconds.
+
+    Each rejection carries a Retry-After header.
+    """
+
+    def __init__(self, backend, rate: float, burst: float, max_concurrent: int, queue_timeout: float = 0.0,
+                 slot_ttl: float = 300.0, retry_after: float = 2.0, client_header: Optional[str] = None):
+        """
+        Initialize the controller.
+
+        Args:
+            backend: MemoryAdmissionBackend or SQLiteAdmissionBackend
+            rate: Tokens added to each client's bucket per second
+            burst: Bucket size: builds a client may start at once
+            max_concurrent: Builds allowed to run at the same time
+            queue_timeout: Seconds to wait for a free build slot before a 503
+            slot_ttl: Seconds after which a held slot or key counts as abandoned
+            retry_after: Retry-After seconds sent with a 503 or duplicate 429
+            client_header: Request header naming the client (default: remote address)
+        """
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.slot_ttl = slot_ttl
+        self.retry_after = retry_after
+        self.client_header = client_header
+
+    def client_id(self) -> str:
+        """Identify the current request's client."""
+        if self.client_header:
+            value = request.headers.get(self.client_header, '')
+            # In X-Forwarded-For style lists only the last value, added by our own proxy, can be
+            # trusted; the client can put anything before it
+            value = value.split(',')[-1].strip()
+            if value:
+                return value
+        return request.remote_addr or 'unknown'
+
+    def acquire_slot(self) -> Optional[str]:
+        """Take a build slot, waiting up to queue_timeout for one."""
+        deadline = time.monotonic() + self.queue_timeout
+        delay = 0.01
+        while True:
+            slot = self.backend.acquire_slot(self.max_concurrent, self.slot_ttl)
+            if slot is not None or time.monotonic() >= deadline:
+                return slot
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 0.2)
+
+
+def _reject(status: int, reason: str, message: str, retry_after: float):
+    """JSON error response with a Retry-After header."""
+    metrics.observe_admission(reason)
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admit(view: Callable) -> Callable:
+    """
+    Run a heavy view only once the admission controller lets it in.
+
+    A no-op unless ADMISSION_ENABLED is set. The request body is read
+    (and uploads spooled) after the rate limit but before a build slot is
+    taken, so slow uploads do not hold slots while no work runs. The build
+    slot and the idempotency key are held until the view returns.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        controller: Optional[AdmissionController] = current_app.extensions.get('admission')
+        if controller is None:
+            return view(*args, **kwargs)
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key:
+            key = f"{request.path}:{key}"
+            if not controller.backend.claim_key(key, controller.slot_ttl):
+                return _reject(429, 'duplicate', 'This submission is already being processed',
+                               controller.retry_after)
+        try:
+            wait = controller.backend.take_token(controller.client_id(), controller.rate, controller.burst)
+            if wait > 0:
+                return _reject(429, 'rate_limited', 'Too many proposals requested; please wait a moment', wait)
+
+            try:
+                # Parses (and caches) form data and uploads, or reads any other body
+                request.get_data(cache=True, parse_form_data=True)
+            except HTTPException as e:
+                # Upload rejected while streaming in (too large)
+                current_app.logger.warning(f"Rejected upload to {request.path}: {e.description}")
+                return jsonify({'success': False, 'message': e.description}), e.code
+
+            slot = controller.acquire_slot()
+            if slot is None:
+                return _reject(503, 'busy', 'The server is busy generating other proposals; please try again',
+                               controller.retry_after)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.backend.release_slot(slot)
+        finally:
+            if key:
+                controller.backend.release_key(key)
+    return wrapper
+
+
+def init_admission(app: Flask) -> None:
+    """
+    Create the admission controller for an app (no-op unless ADMISSION_ENABLED).
+
+    Args:
+        app: Flask application
+    """
+    config = app.config
+    if not config['ADMISSION_ENABLED']:
+        return
+
+    backend_name = config['ADMISSION_BACKEND']
+    if backend_name == 'memory':
+        backend = MemoryAdmissionBackend()
+    elif backend_name == 'sqlite':
+        backend = SQLiteAdmissionBackend(config['ADMISSION_DB_PATH'])
+    else:
+        raise ValueError(f"Unknown ADMISSION_BACKEND: {backend_name!r} (expected memory or sqlite)")
+
+    app.extensions['admission'] = AdmissionController(
+        backend,
+        rate=config['ADMISSION_RATE'],
+        burst=config['ADMISSION_BURST'],
+        max_concurrent=config['ADMISSION_MAX_CONCURRENT'],
+        queue_timeout=config['ADMISSION_QUEUE_TIMEOUT'],
+        slot_ttl=config['ADMISSION_SLOT_TTL'],
+        retry_after=config['ADMISSION_RETRY_AFTER'],
+        client_header=config['ADMISSION_CLIENT_HEADER']
+    )
+    logger.info(
+        f"Admission control ({backend_name}): {config['ADMISSION_RATE']}/s per client, "
+        f"burst {config['ADMISSION_BURST']}, {config['ADMISSION_MAX_CONCURRENT']} concurrent builds"
+    )
@@ -0,0 +1,342 @@
+"""ASGI serving mode: request and response I/O on an event loop, the Flask app on a thread pool."""
+import asyncio
+import contextvars
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Returned by next() once a response body is exhausted
+_DONE = object()
+
+
+class ClientDisconnected(Exception):
+    """The client went away before its request body was read."""
+
+
+class ASGIAdapter:
+    """
+    Serve the Flask app from an ASGI server (uvicorn, hypercorn, ...).
+
+    Under a WSGI server, a worker thread is held for the whole request,
+    including a slow client's upload and download. Here the event loop
+    buffers request bodies of up to ``spool_size`` bytes in memory and writes
+    the response as the client accepts it; only the app itself (parsing,
+    ImageService, PDFService) runs on the thread pool, once such a body is
+    complete. A larger body (photo uploads) is passed to the app as it
+    arrives instead, so the app's upload checks see it early and spooling it
+    to disk happens on the pool, not the loop; its thread then waits for the
+    rest of the upload. Response bodies other than plain byte lists (files, streamed
+    storage objects, compressed streams) are pulled one chunk per pool call,
+    so a slow download holds no thread between chunks. One process can so
+    keep many slow mobile connections open with a few threads.
+
+    Each request runs in its own copy of the context variables, so
+    context-local state moves with it between pool threads.
+    """
+
+    def __init__(self, app: Flask, threads: Optional[int] = None, max_body_size: Optional[int] = None,
+                 spool_size: Optional[int] = None):
+        """
+        Wrap a Flask app.
+
+        Args:
+            app: Flask application
+            threads: Threads running the app (default: ASGI_THREADS)
+            max_body_size: Larger request bodies get a 413 (default: MAX_CONTENT_LENGTH)
+            spool_size: Request bodies above this many bytes are passed to the app
+                as they arrive (default: UPLOAD_SPOOL_THRESHOLD)
+        """
+        self.app = app
+        self.threads = threads or app.config['ASGI_THREADS']
+        self.max_body_size = max_body_size if max_body_size is not None else app.config['MAX_CONTENT_LENGTH']
+        self.spool_size = spool_size if spool_size is not None else app.config['UPLOAD_SPOOL_THRESHOLD']
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi-app')
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        """ASGI entry point (HTTP and lifespan; other protocols are not served)."""
+        if scope['type'] == 'http':
+            await self._handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+
+    async def _handle_lifespan(self, receive: Callable, send: Callable) -> None:
+        """Report start-up and shut the pool down (after running requests) on shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                logger.info(f"ASGI mode: app runs on {self.threads} threads")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle_http(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        """Read the start of the request body, then run the app and stream its response."""
+        declared = _header(scope, b'content-length')
+        declared = int(declared) if declared and declared.isdigit() else None
+        if self.max_body_size is not None and declared is not None and declared > self.max_body_size:
+            await _send_plain(send, 413, b'Request Entity Too Large')
+            return
+
+        try:
+            head, more_body = await self._read_head(receive)
+        except ClientDisconnected:
+            return
+        except OverflowError:
+            await _send_plain(send, 413, b'Request Entity Too Large')
+            return
+
+        body = RequestBody(head, receive if more_body else None, asyncio.get_running_loop(), self.max_body_size)
+        with io.BufferedReader(body) as stream:
+            environ = build_environ(scope, stream, declared if more_body else len(head))
+            await self._respond(environ, send)
+
+    async def _read_head(self, receive: Callable) -> Tuple[bytes, bool]:
+        """
+        Read the request body without holding a thread, up to spool_size bytes.
+
+        Returns:
+            (bytes read, whether more of the body is still to come)
+
+        Raises:
+            ClientDisconnected: If the client goes away first
+            OverflowError: If the body is larger than max_body_size
+        """
+        chunks = []
+        length = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            length += len(chunk)
+            if self.max_body_size is not None and length > self.max_body_size:
+                raise OverflowError(length)
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+            if not more_body or length > self.spool_size:
+                return b''.join(chunks), more_body
+
+    async def _respond(self, environ: Dict[str, Any], send: Callable) -> None:
+        """Run the app on the pool and send its response from the event loop."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+
+        def in_pool(fn: Callable, *args):
+            return loop.run_in_executor(self.executor, context.run, fn, *args)
+
+        response = WSGIResponse()
+        try:
+            await in_pool(response.start, self.app, environ)
+        except Exception:
+            logger.exception(f"Error running {environ['REQUEST_METHOD']} {environ['PATH_INFO']}")
+            await _send_plain(send, 500, b'Internal Server Error')
+            return
+
+        try:
+            await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+            for chunk in response.chunks:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if response.iterator is not None:
+                while True:
+                    chunk = await in_pool(next, response.iterator, _DONE)
+                    if chunk is _DONE:
+                        break
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            # Client went away mid-response (the server's send raised)
+            pass
+        finally:
+            close = getattr(response.iterable, 'close', None)
+            if close:
+                await in_pool(close)
+
+
+class RequestBody(io.RawIOBase):
+    """
+    ``wsgi.input`` for a request body, read on a pool thread while it may still be arriving.
+
+    Starts with the bytes the event loop has already read; further chunks
+    are received from the loop as the app reads past them.
+    """
+
+    def __init__(self, head: bytes, receive: Optional[Callable], loop: asyncio.AbstractEventLoop,
+                 max_size: Optional[int] = None):
+        """
+        Wrap a request body.
+
+        Args:
+            head: Body bytes already read
+            receive: ASGI receive callable for the rest, or None if the body is complete
+            loop: Event loop the ASGI server runs receive on
+            max_size: Bodies growing past this many bytes raise RequestEntityTooLarge
+        """
+        super().__init__()
+        self._chunk = memoryview(head)
+        self._receive = receive
+        self._loop = loop
+        self._max_size = max_size
+        self._length = len(head)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Copy body bytes into a buffer, waiting for the next chunk when needed; 0 at the end."""
+        while not self._chunk and self._receive is not None:
+            self._chunk = memoryview(self._next_chunk())
+        count = min(len(buffer), len(self._chunk))
+        buffer[:count] = self._chunk[:count]
+        self._chunk = self._chunk[count:]
+        return count
+
+    def _next_chunk(self) -> bytes:
+        """
+        Receive the next body chunk from the event loop.
+
+        Raises:
+            ClientDisconnected: If the client goes away first
+            RequestEntityTooLarge: If the body grows past max_size
+        """
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message['type'] == 'http.disconnect':
+            self._receive = None
+            raise ClientDisconnected()
+        if not message.get('more_body', False):
+            self._receive = None
+        chunk = message.get('body', b'')
+        self._length += len(chunk)
+        if self._max_size is not None and self._length > self._max_size:
+            self._receive = None
+            raise RequestEntityTooLarge()
+        return chunk
+
+
+class WSGIResponse:
+    """Status, headers and body of one WSGI call, collected on a pool thread."""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.iterable: Optional[Iterable[bytes]] = None
+        # Body chunks already produced, then the rest (None if there is no rest)
+        self.chunks: List[bytes] = []
+        self.iterator = None
+
+    def start_response(self, status: str, headers: List[Tuple[str, str]], exc_info=None) -> Callable:
+        """WSGI start_response; returns the legacy write() callable."""
+        if exc_info and self.status is not None and self.chunks:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return self.chunks.append
+
+    def start(self, app: Callable, environ: Dict[str, Any]) -> None:
+        """
+        Call the app and collect its body up to the first chunk.
+
+        Plain byte lists (most Flask responses) are collected whole;
+        other bodies are left to be iterated chunk by chunk.
+        """
+        self.iterable = app(environ, self.start_response)
+        try:
+            if isinstance(self.iterable, (list, tuple)):
+                self.chunks.extend(self.iterable)
+            else:
+                self.iterator = iter(self.iterable)
+                # start_response may only be called once the body is first iterated
+                first = next(self.iterator, _DONE)
+                if first is _DONE:
+                    self.iterator = None
+                else:
+                    self.chunks.append(first)
+            if self.status is None:
+                raise RuntimeError("The app returned without calling start_response")
+        except BaseException:
+            close = getattr(self.iterable, 'close', None)
+            if close:
+                close()
+            raise
+
+
+def build_environ(scope: Dict, body, length: Optional[int]) -> Dict[str, Any]:
+    """
+    Build the WSGI environ for an ASGI HTTP request.
+
+    Args:
+        scope: ASGI connection scope
+        body: Stream of the request body
+        length: Body length in bytes, or None if unknown (read until the end)
+
+    Returns:
+        WSGI environ (PEP 3333)
+    """
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI strings are latin-1 decoded bytes
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if length is not None:
+        environ['CONTENT_LENGTH'] = str(length)
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').lower()
+        value = raw_value.decode('latin-1')
+        # CONTENT_LENGTH is set above from what is known; transfer framing is the ASGI server's
+        if name in ('content-length', 'transfer-encoding'):
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else f"HTTP_{name.upper().replace('-', '_')}"
+        if key in environ:
+            value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+        environ[key] = value
+    return environ
+
+
+def _header(scope: Dict, name: bytes) -> Optional[str]:
+    """First value of a request header, or None."""
+    for key, value in scope.get('headers', []):
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_plain(send: Callable, status: int, body: bytes) -> None:
+    """Send a short text/plain response."""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,374 @@
+"""Static asset pipeline: minified, fingerprinted and precompressed copies of app/static."""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from flask import Flask, Response, current_app, render_template, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+# Built files go to <static folder>/dist, so a front-end server mapping /static/ serves them too
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Content codings in order of preference, with the suffix of their precompressed file
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.ico', '.map'}
+# Below this size compression saves too little to be worth a second copy
+MIN_COMPRESS_SIZE = 512
+
+# Characters next to which whitespace can go (not + - / or ., which need care)
+_JS_PUNCT = re.compile(r'[ \t]*([{}()\[\];,:=<>!&|?*%^~])[ \t]*')
+# Line breaks that cannot end a statement, so removing them cannot trigger or stop ASI
+_JS_JOIN = re.compile(r'(?<=[{(\[,;])\n|\n(?=[})\],;])')
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*|(:)\s+')
+# A '/' after these starts a regex literal rather than a division
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^') | {''}
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+
+
+def minify_css(text: str) -> str:
+    """
+    Minify a stylesheet: drop comments and redundant whitespace.
+
+    Strings are kept as they are.
+
+    Args:
+        text: CSS source
+
+    Returns:
+        Minified CSS
+    """
+    parts = []
+    for literal, segment in _split(text, js=False):
+        if not literal:
+            segment = re.sub(r'\s+', ' ', segment)
+            segment = _CSS_PUNCT.sub(lambda m: m.group(1) or m.group(2), segment)
+            segment = segment.replace(';}', '}')
+        parts.append(segment)
+    return ''.join(parts).strip()
+
+
+def minify_js(text: str) -> str:
+    """
+    Minify a script conservatively: drop comments, indentation and blank lines.
+
+    Strings, template literals and regex literals are kept as they are, and line
+    breaks that could end a statement stay, so automatic semicolon insertion
+    behaves exactly as in the source. Names are not mangled.
+
+    Args:
+        text: JavaScript source
+
+    Returns:
+        Minified JavaScript
+    """
+    parts = []
+    for literal, segment in _split(text, js=True):
+        if not literal:
+            segment = re.sub(r'[ \t]*\n\s*', '\n', segment)
+            segment = re.sub(r'[ \t]+', ' ', segment)
+            segment = _JS_PUNCT.sub(r'\1', segment)
+        parts.append(segment)
+    code = ''.join(parts).strip()
+    # Joining lines can only happen once literals are back in place
+    return _join_lines(code)
+
+
+def _join_lines(code: str) -> str:
+    """Remove line breaks next to brackets, commas and semicolons outside literals."""
+    parts = []
+    for literal, segment in _split(code, js=True):
+        parts.append(segment if literal else _JS_JOIN.sub('', segment))
+    return ''.join(parts)
+
+
+def _split(text: str, js: bool) -> Iterator[Tuple[bool, str]]:
+    """
+    Split source into (is_literal, text) segments, dropping comments.
+
+    Literals are strings, plus template and regex literals when ``js`` is set.
+    A comment becomes a line break if it spanned one, else a space.
+    """
+    i, start, n = 0, 0, len(text)
+    last = ''  # last significant code character, to tell a regex from a division
+    while i < n:
+        ch = text[i]
+        nxt = text[i + 1] if i + 1 < n else ''
+        if ch in '\'"' or (js and ch == '`'):
+            end = _skip_quoted(text, i)
+        elif ch == '/' and nxt == '*':
+            end = text.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            yield False, text[start:i] + ('\n' if '\n' in text[i:end] else ' ')
+            i = start = end
+            continue
+        elif js and ch == '/' and nxt == '/':
+            end = text.find('\n', i)
+            end = n if end < 0 else end
+            yield False, text[start:i]
+            i = start = end
+            continue
+        elif js and ch == '/' and (last in _REGEX_AFTER or _last_word(text, i) in _REGEX_KEYWORDS):
+            end = _skip_regex(text, i)
+        else:
+            if not ch.isspace():
+                last = ch
+            i += 1
+            continue
+        yield False, text[start:i]
+        yield True, text[i:end]
+        last = text[end - 1]
+        i = start = end
+    yield False, text[start:]
+
+
+def _skip_quoted(text: str, i: int) -> int:
+    """Index just past the string or template literal starting at ``i``."""
+    quote, i, depth = text[i], i + 1, 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if quote == '`' and depth == 0 and text.startswith('${', i):
+            depth, i = 1, i + 2
+            continue
+        if depth:
+            # Inside a ${...} expression: track braces and skip nested literals
+            if ch in '\'"`':
+                i = _skip_quoted(text, i)
+                continue
+            depth += {'{': 1, '}': -1}.get(ch, 0)
+        elif ch == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(text: str, i: int) -> int:
+    """Index just past the regex literal (and its flags) starting at ``i``."""
+    i, in_class = i + 1, False
+    while i < len(text) and text[i] != '\n':
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(text) and text[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _last_word(text: str, i: int) -> str:
+    """The identifier that ends just before ``i`` (skipping whitespace), if any."""
+    match = re.search(r'([A-Za-z_$][\w$]*)\s*$', text[max(0, i - 32):i])
+    return match.group(1) if match else ''
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class AssetManifest:
+    """Fingerprinted names and precompressed variants of the built static files."""
+
+    def __init__(self, build_folder: str):
+        self.build_folder = build_folder
+        # Source name (css/style.css) -> name served under /static (dist/css/style.1a2b3c4d5e.css)
+        self.files: Dict[str, str] = {}
+        # Served name (dist/css/style.1a2b3c4d5e.css) -> content codings available besides identity
+        self.encodings: Dict[str, Tuple[str, ...]] = {}
+        # Rendered pages, keyed by (template, script root)
+        self.pages: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def url_name(self, filename: str) -> Optional[str]:
+        """Fingerprinted name of a source file, or None if it was not built."""
+        return self.files.get(filename)
+
+    def render(self, template_name: str) -> str:
+        """Render a template that does not depend on the request, once per script root."""
+        key = (template_name, request.script_root)
+        html = self.pages.get(key)
+        if html is None:
+            html = render_template(template_name)
+            with self._lock:
+                self.pages[key] = html
+        return html
+
+
+def build_assets(static_folder: str) -> AssetManifest:
+    """
+    Minify, fingerprint and precompress every file of a static folder.
+
+    Built files are named after a hash of their (minified) content and written to
+    ``<static_folder>/dist`` along with .gz and, if the brotli package is
+    installed, .br variants. Files already built are not rewritten, so several
+    workers may build at once. Files of builds other than this one and the
+    previous one are removed.
+
+    Args:
+        static_folder: The app's static folder
+
+    Returns:
+        Manifest of the build
+    """
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    manifest = AssetManifest(build_folder)
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.info("brotli is not installed; static assets are precompressed with gzip only")
+
+    for filename in _source_files(static_folder):
+        with open(os.path.join(static_folder, filename), 'rb') as fh:
+            content = fh.read()
+        root, ext = os.path.splitext(filename)
+        minify = MINIFIERS.get(ext.lower())
+        if minify:
+            content = minify(content.decode('utf-8')).encode('utf-8')
+
+        built = f"{root}.{hashlib.sha256(content).hexdigest()[:10]}{ext}".replace(os.sep, '/')
+        target = os.path.join(build_folder, built)
+        variants = {'': content}
+        if ext.lower() in COMPRESSIBLE and len(content) >= MIN_COMPRESS_SIZE:
+            variants['.gz'] = gzip.compress(content, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants['.br'] = brotli.compress(content, quality=11)
+
+        codings = []
+        for suffix, data in variants.items():
+            if suffix and len(data) >= len(content):
+                continue
+            _write_once(target + suffix, data)
+            codings.extend(coding for coding, coding_suffix in ENCODINGS if coding_suffix == suffix)
+        manifest.files[filename.replace(os.sep, '/')] = f"{BUILD_DIR}/{built}"
+        manifest.encodings[f"{BUILD_DIR}/{built}"] = tuple(coding for coding, _ in ENCODINGS if coding in codings)
+
+    _prune(build_folder, manifest)
+    return manifest
+
+
+def _source_files(static_folder: str) -> Iterator[str]:
+    """Paths, relative to the static folder, of the files to build."""
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder and BUILD_DIR in dirnames:
+            dirnames.remove(BUILD_DIR)
+        dirnames.sort()
+        for name in sorted(filenames):
+            if not name.startswith('.'):
+                yield os.path.relpath(os.path.join(dirpath, name), static_folder)
+
+
+def _write_once(path: str, data: bytes) -> None:
+    """Write a content-addressed file unless it exists, atomically."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _prune(build_folder: str, manifest: AssetManifest) -> None:
+    """Remove built files of older builds, keeping the previous one for cached pages."""
+    manifest_path = os.path.join(build_folder, MANIFEST_NAME)
+    keep = set(manifest.files.values())
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            previous = json.load(fh)
+        if previous != manifest.files:
+            keep.update(previous.values())
+    except (OSError, ValueError):
+        pass
+
+    keep = {os.path.normpath(os.path.join(build_folder, os.pardir, name)) for name in keep}
+    for dirpath, _, filenames in os.walk(build_folder):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            base = re.sub(r'\.(gz|br)$', '', path)
+            if name != MANIFEST_NAME and os.path.normpath(base) not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest.files, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def get_assets() -> Optional[AssetManifest]:
+    """The current app's asset manifest, or None when the pipeline is disabled."""
+    return current_app.extensions.get('assets')
+
+
+def render_page(template_name: str) -> str:
+    """Render a request-independent page, from memory when the asset pipeline is enabled."""
+    assets = get_assets()
+    if assets is None:
+        return render_template(template_name)
+    return assets.render(template_name)
+
+
+def init_assets(app: Flask) -> None:
+    """
+    Build the static assets and serve the built copies (if enabled).
+
+    ``url_for('static', filename=...)`` then points at the fingerprinted copy,
+    which is served precompressed per Accept-Encoding with immutable caching.
+    Files without a built copy are served as before.
+
+    Args:
+        app: Flask application instance
+    """
+    if not app.config.get('ASSET_PIPELINE_ENABLED'):
+        return
+
+    manifest = build_assets(app.static_folder)
+    app.extensions['assets'] = manifest
+    logger.info(f"Built {len(manifest.files)} static assets into {manifest.build_folder}")
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint: str, values: Dict) -> None:
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.url_name(values['filename']) or values['filename']
+
+    app.view_functions['static'] = _serve_static
+
+
+def _serve_static(filename: str) -> Response:
+    """Serve a built asset in the best content coding the client accepts."""
+    app = current_app
+    manifest: AssetManifest = app.extensions['assets']
+    codings = manifest.encodings.get(filename)
+    if codings is None:
+        return app.send_static_file(filename)
+
+    coding = next((c for c in codings if request.accept_encodings[c] > 0), None)
+    suffix = dict(ENCODINGS).get(coding, '')
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype)
+    if coding:
+        response.headers['Content-Encoding'] = coding
+    if codings:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
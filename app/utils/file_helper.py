@@ -4,20 +4,38 @@ from typing import Optional
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 
+from app.utils.image_header import ImageCheck, check_image, formats_for_extensions
 
-def allowed_file(filename: str, allowed_extensions: set) -> bool:
+
+def allowed_file(file: FileStorage, allowed_extensions: set) -> bool:
+    """
+    Check if an upload is an image in one of the allowed formats.
+    
+    The format is read from the file's magic bytes, not its name.
+    
+    Args:
+        file: Uploaded file object
+        allowed_extensions: Set of allowed file extensions (e.g. Config.ALLOWED_EXTENSIONS)
+        
+    Returns:
+        True if the file's content is an allowed image, False otherwise
+    """
+    return check_upload(file, allowed_extensions).ok
+
+
+def check_upload(file: FileStorage, allowed_extensions: set, max_pixels: Optional[int] = None) -> ImageCheck:
     """
-    Check if file has an allowed extension.
+    Validate an upload from its header, without decoding it.
     
     Args:
-        filename: Name of the file to check
+        file: Uploaded file object
         allowed_extensions: Set of allowed file extensions
+        max_pixels: Largest width x height to accept (optional)
         
     Returns:
-        True if file extension is allowed, False otherwise
+        ImageCheck with the format, dimensions and, if rejected, the reason
     """
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    return check_image(file.stream, file.filename or '', formats_for_extensions(allowed_extensions), max_pixels)
 
 
 def save_uploaded_file(file: FileStorage, upload_folder: str, allowed_extensions: set) -> Optional[str]:
@@ -32,7 +50,7 @@ def save_uploaded_file(file: FileStorage, upload_folder: str, allowed_extensions
     Returns:
         Path to saved file or None if save failed
     """
-    if file and file.filename and allowed_file(file.filename, allowed_extensions):
+    if file and file.filename and allowed_file(file, allowed_extensions):
         filename = secure_filename(file.filename)
         
         # Add timestamp to filename to avoid collisions
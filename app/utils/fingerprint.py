@@ -0,0 +1,55 @@
+"""Stable fingerprints of request inputs."""
+import hashlib
+import json
+from typing import Optional
+
+from flask import Request, request as current_request
+
+CHUNK_SIZE = 64 * 1024
+
+
+def fingerprint_request(req: Optional[Request] = None) -> str:
+    """
+    Hash the normalized inputs of a request.
+
+    Two requests with the same method, path, query parameters and form
+    fields (in any order), JSON body (with keys in any order) and uploaded file contents get the
+    same fingerprint. Upload streams are rewound afterwards.
+
+    Args:
+        req: Request to fingerprint (defaults to the current request)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    req = req or current_request
+    digest = hashlib.sha256()
+    digest.update(f"{req.method} {req.path}\n".encode('utf-8'))
+    for key in sorted(req.args):
+        for value in req.args.getlist(key):
+            digest.update(f"?{key}={value}\n".encode('utf-8'))
+
+    if req.is_json:
+        body = req.get_json(silent=True)
+        digest.update(json.dumps(body, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    else:
+        for key in sorted(req.form):
+            for value in req.form.getlist(key):
+                digest.update(f"{key}={value}\n".encode('utf-8'))
+
+        for key in sorted(req.files):
+            for file in req.files.getlist(key):
+                digest.update(f"{key}:{file.filename}:".encode('utf-8'))
+                digest.update(hash_stream(file.stream).encode('ascii'))
+
+    return digest.hexdigest()
+
+
+def hash_stream(stream) -> str:
+    """Return the SHA-256 of a seekable stream's content and rewind it."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
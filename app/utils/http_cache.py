@@ -0,0 +1,191 @@
+"""Response compression and request-derived ETags for the JSON APIs."""
+import hashlib
+import itertools
+import zlib
+from functools import wraps
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, make_response, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+from app.utils.fingerprint import fingerprint_request
+
+# Content codings in order of preference
+CODINGS = ('br', 'gzip')
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+    'text/css', 'text/csv', 'text/html', 'text/javascript', 'text/plain', 'text/xml',
+}
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware that compresses responses with brotli or gzip as they stream out.
+
+    Only 200 responses of a compressible type are compressed, and only when
+    they are at least ``min_size`` bytes or of unknown length (streamed).
+    Responses that are already encoded, ranged or marked ``no-transform``
+    pass through. A strong ETag gets the coding appended (``"abc-gzip"``),
+    since the encoded body is a different representation.
+    """
+
+    def __init__(self, app: Callable, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        """
+        Wrap a WSGI application.
+
+        Args:
+            app: WSGI application
+            min_size: Smallest Content-Length worth compressing
+            gzip_level: zlib compression level (1-9)
+            brotli_quality: brotli quality (0-11); dynamic responses favour speed
+        """
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        self._brotli = brotli
+        self.codings = tuple(c for c in CODINGS if c != 'br' or brotli is not None)
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        state: dict = {}
+
+        def _start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            state['started'] = True
+            response_headers = Headers(headers)
+            if self._varies(status, response_headers):
+                vary = response_headers.get('Vary')
+                response_headers['Vary'] = _add_vary(vary) if vary else 'Accept-Encoding'
+                coding = next((c for c in self.codings if accepted[c] > 0), None)
+                if coding:
+                    state['coding'] = coding
+                    state['streamed'] = 'Content-Length' not in response_headers
+                    response_headers.remove('Content-Length')
+                    response_headers['Content-Encoding'] = coding
+                    etag = response_headers.get('ETag')
+                    if etag and etag.endswith('"') and not etag.startswith('W/'):
+                        response_headers['ETag'] = f'{etag[:-1]}-{coding}"'
+            return start_response(status, response_headers.to_wsgi_list(), exc_info)
+
+        app_iter = self.app(environ, _start_response)
+        chunks: Iterable[bytes] = app_iter
+        if 'started' not in state:
+            # The app calls start_response once its body starts, so look at the first chunk
+            chunks = iter(app_iter)
+            chunks = itertools.chain([next(chunks, b'')], chunks)
+        coding = state.get('coding')
+        if coding is not None:
+            chunks = self._compress(chunks, coding, state['streamed'])
+        if chunks is app_iter:
+            return app_iter
+        return ClosingIterator(chunks, getattr(app_iter, 'close', None))
+
+    def _varies(self, status: str, headers: Headers) -> bool:
+        """Whether a response's body would be compressed for a client that accepts it."""
+        if not status.startswith('200') or 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if mimetype not in COMPRESSIBLE_TYPES:
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def _compress(self, chunks: Iterable[bytes], coding: str, streamed: bool) -> Iterator[bytes]:
+        """Compress chunks as they come, flushing after each one of a streamed response."""
+        if coding == 'br':
+            compressor = self._brotli.Compressor(quality=self.brotli_quality)
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compress, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+
+        for chunk in chunks:
+            data = compress(chunk)
+            if streamed:
+                data += flush()
+            if data:
+                yield data
+        yield finish()
+
+
+def _add_vary(vary: str) -> str:
+    """Add Accept-Encoding to a Vary header value unless it is already covered."""
+    fields = {field.strip().lower() for field in vary.split(',')}
+    if '*' in fields or 'accept-encoding' in fields:
+        return vary
+    return f"{vary}, Accept-Encoding"
+
+
+def request_etag(version: Optional[Callable[[], str]] = None) -> Callable:
+    """
+    Give a view a deterministic ETag derived from its normalized request.
+
+    For views whose response depends only on the request (and ``version``),
+    the ETag is a hash of the request fingerprint and the version token. If
+    a GET or HEAD request's If-None-Match already holds it, in any content
+    coding, the view is skipped and a 304 is returned. Any other method
+    gets a 412 instead (RFC 9110, section 13.1.2), so views that also take
+    POST should offer a GET form of the same request for revalidation.
+
+    Args:
+        version: Returns a token for other inputs the response depends on,
+            such as the pricing rules
+
+    Returns:
+        View decorator
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = version() if version else ''
+            etag = hashlib.sha256(f"{fingerprint_request()}\n{token}".encode('utf-8')).hexdigest()[:32]
+
+            matched = _matching_etag(etag)
+            if matched and request.method not in ('GET', 'HEAD'):
+                return Response(status=412)
+            if matched:
+                response = Response(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            # Clients may store the response but must revalidate before reuse
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def _matching_etag(etag: str) -> Optional[str]:
+    """The variant of ``etag`` (identity or per coding) listed in If-None-Match, if any."""
+    if_none_match = request.if_none_match
+    for candidate in (etag, *(f"{etag}-{coding}" for coding in CODINGS)):
+        if if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def init_http_cache(app: Flask) -> None:
+    """Wrap the app in CompressionMiddleware when RESPONSE_COMPRESSION_ENABLED is set."""
+    if not app.config.get('RESPONSE_COMPRESSION_ENABLED'):
+        return
+
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=app.config['RESPONSE_COMPRESSION_MIN_SIZE'],
+        gzip_level=app.config['RESPONSE_GZIP_LEVEL'],
+        brotli_quality=app.config['RESPONSE_BROTLI_QUALITY'],
+    )
@@ -0,0 +1,213 @@
+"""Identify and validate images from their headers, without decoding pixels."""
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Optional, Tuple
+
+# Bytes needed to recognise every supported format (WebP needs 12)
+SNIFF_BYTES = 12
+
+# Bytes holding the dimensions of every format except JPEG
+_HEADER_BYTES = 32
+
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+# File extensions and the format each one names
+EXTENSION_FORMATS = {
+    'jpg': 'jpeg',
+    'jpeg': 'jpeg',
+    'png': 'png',
+    'gif': 'gif',
+    'bmp': 'bmp',
+    'webp': 'webp',
+}
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_JPEG_MAX_SEGMENTS = 256
+
+
+@dataclass(frozen=True)
+class ImageCheck:
+    """Outcome of validating one upload."""
+
+    filename: str
+    ok: bool
+    reason: str = ''
+    format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """
+    Return the image format named by a file's magic bytes.
+
+    Args:
+        header: First SNIFF_BYTES bytes of the file (fewer if the file is shorter)
+
+    Returns:
+        'jpeg', 'png', 'gif', 'bmp' or 'webp', or None if unrecognised
+    """
+    for signature, name in _SIGNATURES:
+        if header.startswith(signature):
+            return name
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def probe(stream: BinaryIO) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+    """
+    Read an image's format and dimensions from its header.
+
+    Only the header is read: a few dozen bytes, or for JPEG the marker
+    segments up to the frame header, skipping segment bodies with seek.
+    The stream position is restored afterwards.
+
+    Args:
+        stream: Seekable binary stream positioned anywhere
+
+    Returns:
+        (format, (width, height)); either may be None if not determinable
+    """
+    position = stream.tell()
+    try:
+        stream.seek(0)
+        header = stream.read(_HEADER_BYTES)
+        fmt = sniff_format(header[:SNIFF_BYTES])
+        if fmt == 'jpeg':
+            stream.seek(2)
+            size = _jpeg_size(stream)
+        elif fmt is not None:
+            size = _HEADER_PARSERS[fmt](header)
+        else:
+            size = None
+        return fmt, size
+    except (struct.error, IndexError):
+        return fmt, None
+    finally:
+        stream.seek(position)
+
+
+def check_image(stream: BinaryIO, filename: str, allowed_formats: Optional[Iterable[str]] = None,
+                max_pixels: Optional[int] = None) -> ImageCheck:
+    """
+    Accept or reject an upload from its header alone.
+
+    Args:
+        stream: Seekable binary stream with the upload
+        filename: Name reported in the result
+        allowed_formats: Formats to accept (default: every supported format)
+        max_pixels: Largest width x height to accept (optional)
+
+    Returns:
+        ImageCheck with ok set and, when rejected, a human-readable reason
+    """
+    fmt, size = probe(stream)
+    if fmt is None:
+        position = stream.tell()
+        empty = not stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        reason = 'file is empty' if empty else 'not a JPEG, PNG, GIF, BMP or WebP image'
+        return ImageCheck(filename, False, reason)
+
+    if allowed_formats is not None and fmt not in allowed_formats:
+        return ImageCheck(filename, False, f"{fmt.upper()} images are not accepted", fmt)
+
+    if size is None:
+        return ImageCheck(filename, False, f"{fmt.upper()} header is damaged or truncated", fmt)
+
+    width, height = size
+    if width <= 0 or height <= 0:
+        return ImageCheck(filename, False, f"invalid dimensions {width}x{height}", fmt, width, height)
+    if max_pixels and width * height > max_pixels:
+        return ImageCheck(
+            filename, False, f"{width}x{height} is over the {max_pixels // 1_000_000} megapixel limit",
+            fmt, width, height
+        )
+    return ImageCheck(filename, True, '', fmt, width, height)
+
+
+def formats_for_extensions(extensions: Iterable[str]) -> set:
+    """Map allowed file extensions (e.g. Config.ALLOWED_EXTENSIONS) to formats."""
+    return {EXTENSION_FORMATS[ext] for ext in extensions if ext in EXTENSION_FORMATS}
+
+
+def _jpeg_size(stream: BinaryIO) -> Optional[Tuple[int, int]]:
+    """Walk JPEG marker segments (after SOI) to the start-of-frame header."""
+    for _ in range(_JPEG_MAX_SEGMENTS):
+        marker = stream.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # Fill bytes
+            fill = stream.read(1)
+            if not fill:
+                return None
+            code = fill[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue  # Markers without a length
+        if code in (0xD9, 0xDA):
+            return None  # End of image or scan data before any frame header
+
+        length_bytes = stream.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            return None
+        if code in _JPEG_SOF_MARKERS:
+            frame = stream.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        stream.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _png_size(header: bytes) -> Optional[Tuple[int, int]]:
+    if header[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+
+def _gif_size(header: bytes) -> Tuple[int, int]:
+    return struct.unpack('<HH', header[6:10])
+
+
+def _bmp_size(header: bytes) -> Tuple[int, int]:
+    if struct.unpack('<I', header[14:18])[0] == 12:  # OS/2 BITMAPCOREHEADER
+        return struct.unpack('<HH', header[18:22])
+    width, height = struct.unpack('<ii', header[18:26])
+    return width, abs(height)  # Negative height means top-down rows
+
+
+def _webp_size(header: bytes) -> Optional[Tuple[int, int]]:
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and header[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and header[20] == 0x2F:
+        bits = struct.unpack('<I', header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+_HEADER_PARSERS = {
+    'png': _png_size,
+    'gif': _gif_size,
+    'bmp': _bmp_size,
+    'webp': _webp_size,
+}
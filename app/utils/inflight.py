@@ -0,0 +1,207 @@
+"""Sharing one build between identical submissions that arrive while it runs."""
+import logging
+import math
+import threading
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, jsonify, make_response, request
+from werkzeug.exceptions import HTTPException
+
+from app.utils import metrics
+from app.utils.admission import IDEMPOTENCY_HEADER
+from app.utils.fingerprint import fingerprint_request
+from app.utils.timing import phase
+
+logger = logging.getLogger(__name__)
+
+
+class _Build:
+    """One running build and, once it is done, the response its followers get."""
+
+    __slots__ = ('done', 'followers', 'status', 'headers', 'body')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        # Left as None unless the build succeeded (2xx); followers then run their own
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[str, str]] = []
+        self.body = b''
+
+
+class InFlightBuilds:
+    """
+    Builds running in this process, by submission key.
+
+    A build is registered under the request's Idempotency-Key (scoped to the
+    client that sent it) and under the fingerprint of its inputs (form
+    fields, JSON body and upload contents). A submission matching either joins the running build and gets a copy of
+    its response instead of processing the same images and PDF again.
+    """
+
+    def __init__(self, wait_timeout: float = 120.0):
+        """
+        Initialize the registry.
+
+        Args:
+            wait_timeout: Seconds a joined submission waits for the build
+        """
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._builds: Dict[str, _Build] = {}
+
+    def join(self, keys: List[str]) -> Tuple[_Build, bool]:
+        """
+        Join the build running under any of the keys, or register a new one.
+
+        Returns:
+            (build, True if the caller is to run it)
+        """
+        with self._lock:
+            for key in keys:
+                build = self._builds.get(key)
+                if build is not None:
+                    build.followers += 1
+                    return build, False
+            build = _Build()
+            for key in keys:
+                self._builds[key] = build
+            return build, True
+
+    def finish(self, keys: List[str], build: _Build, response: Optional[Response]) -> None:
+        """
+        Hand a finished build's response to its followers and unregister it.
+
+        Args:
+            keys: Keys the build was registered under
+            build: The build
+            response: Its response, or None if it raised
+
+        Only a successful (2xx) response is shared. An error may be specific to
+        the leader (its rate limit, a full server), so followers run their own.
+        """
+        with self._lock:
+            for key in keys:
+                if self._builds.get(key) is build:
+                    del self._builds[key]
+            followers = build.followers
+        try:
+            if response is not None and followers and 200 <= response.status_code < 300:
+                build.body = _buffer(response)
+                build.status = response.status_code
+                build.headers = list(response.headers.items())
+        finally:
+            build.done.set()
+
+
+def _buffer(response: Response) -> bytes:
+    """
+    Read a response's body into memory, leaving the response able to send it.
+
+    A streamed body (a file or storage object) can only be read once, so it is
+    replaced with the bytes read. Bodies handed off to the front-end server
+    (X-Sendfile, X-Accel-Redirect) are empty and are shared as headers.
+    """
+    if not response.is_sequence:
+        iterable = response.response
+        response.direct_passthrough = False
+        try:
+            body = b''.join(response.iter_encoded())
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close:
+                close()
+        response.set_data(body)
+    return response.get_data()
+
+
+def _submission_keys(fingerprint: bool = True) -> List[str]:
+    """
+    Keys identifying the current submission: its Idempotency-Key and its input fingerprint.
+
+    The Idempotency-Key is chosen by the client, so it only matches
+    submissions from the same client; otherwise anyone reusing a key would
+    get another client's PDF. Matching inputs need no scope, since the PDF
+    only holds what the submission itself sent.
+
+    Args:
+        fingerprint: Include the input fingerprint (reads and hashes the whole body)
+    """
+    keys = [f"{request.path}:input:{fingerprint_request()}"] if fingerprint else []
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    if idempotency_key:
+        keys.insert(0, f"{request.path}:key:{_client_id()}:{idempotency_key}")
+    return keys
+
+
+def _client_id() -> str:
+    """The current client, as admission control identifies it (or its remote address)."""
+    controller = current_app.extensions.get('admission')
+    if controller is not None:
+        return controller.client_id()
+    return request.remote_addr or 'unknown'
+
+
+def coalesce(view: Callable) -> Callable:
+    """
+    Let identical submissions that arrive while a build runs share its response.
+
+    A no-op unless INFLIGHT_DEDUP_ENABLED is set. Apply above ``admit``, so a
+    joined submission neither uses a token nor waits for a build slot.
+
+    With admission control on, submissions are matched by Idempotency-Key
+    only: fingerprinting the inputs parses and hashes the whole upload,
+    which would happen before admission could turn the request away.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        builds: Optional[InFlightBuilds] = current_app.extensions.get('inflight')
+        if builds is None:
+            return view(*args, **kwargs)
+
+        try:
+            with phase('fingerprint'):
+                keys = _submission_keys(fingerprint='admission' not in current_app.extensions)
+        except HTTPException as e:
+            # Upload rejected while streaming in (too large)
+            current_app.logger.warning(f"Rejected upload to {request.path}: {e.description}")
+            return jsonify({'success': False, 'message': e.description}), e.code
+        if not keys:
+            return view(*args, **kwargs)
+
+        build, leader = builds.join(keys)
+        metrics.observe_cache('inflight', hit=not leader)
+        if leader:
+            response = None
+            try:
+                response = make_response(view(*args, **kwargs))
+                return response
+            finally:
+                builds.finish(keys, build, response)
+
+        with phase('inflight'):
+            finished = build.done.wait(builds.wait_timeout)
+        if not finished:
+            response = jsonify({'success': False, 'message': 'The same submission is still being processed'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(1, math.ceil(builds.wait_timeout / 10)))
+            return response
+        if build.status is None:
+            # The build failed or was turned away (e.g. rate-limited); run this submission itself
+            return view(*args, **kwargs)
+        logger.info(f"{request.path}: sent the response of an identical submission already in progress")
+        return current_app.response_class(build.body, status=build.status, headers=build.headers)
+    return wrapper
+
+
+def init_inflight(app: Flask) -> None:
+    """
+    Create the in-flight build registry for an app (no-op unless INFLIGHT_DEDUP_ENABLED).
+
+    Args:
+        app: Flask application
+    """
+    if not app.config['INFLIGHT_DEDUP_ENABLED']:
+        return
+    app.extensions['inflight'] = InFlightBuilds(wait_timeout=app.config['INFLIGHT_WAIT_TIMEOUT'])
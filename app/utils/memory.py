@@ -0,0 +1,181 @@
+"""Opt-in tracemalloc tracking of peak memory and allocation sites per request phase."""
+import os
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from flask import Flask, Response, current_app, g, jsonify, request
+
+MB = 1024 * 1024
+
+# Files whose allocations only show the tracer or the import system
+_IGNORED_FILES = (tracemalloc.__file__, __file__, '<frozen importlib._bootstrap>',
+                  '<frozen importlib._bootstrap_external>', '<unknown>')
+
+_recent: deque = deque(maxlen=50)
+_recent_lock = threading.Lock()
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB (Linux /proc; None elsewhere)."""
+    try:
+        with open('/proc/self/statm', 'r') as handle:
+            pages = int(handle.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / MB, 1)
+
+
+def top_sites(snapshot: tracemalloc.Snapshot, baseline: Optional[tracemalloc.Snapshot] = None,
+              limit: int = 5) -> List[Dict]:
+    """
+    Largest allocation sites in a snapshot, or largest growth since a baseline.
+
+    Args:
+        snapshot: Snapshot to inspect
+        baseline: Earlier snapshot to diff against (optional)
+        limit: Number of sites to return
+
+    Returns:
+        List of dicts with site ("file:line"), size_kb and count
+    """
+    sizes = _sizes_by_line(snapshot)
+    if baseline is not None:
+        before = _sizes_by_line(baseline)
+        sizes = {
+            frame: (size - before.get(frame, (0, 0))[0], count - before.get(frame, (0, 0))[1])
+            for frame, (size, count) in sizes.items()
+        }
+    stats = sorted(
+        ((frame, size, count) for frame, (size, count) in sizes.items() if size > 0),
+        key=lambda item: item[1], reverse=True
+    )
+
+    return [
+        {'site': f"{frame.filename}:{frame.lineno}", 'size_kb': round(size / 1024, 1), 'count': count}
+        for frame, size, count in stats[:limit]
+    ]
+
+
+def _sizes_by_line(snapshot: tracemalloc.Snapshot) -> Dict[tracemalloc.Frame, tuple]:
+    # Grouping first and filtering the groups is much cheaper than Snapshot.filter_traces
+    return {
+        stat.traceback[0]: (stat.size, stat.count)
+        for stat in snapshot.statistics('lineno')
+        if stat.traceback[0].filename not in _IGNORED_FILES
+    }
+
+
+class MemoryTracker:
+    """Collects per-phase memory figures for a single request."""
+
+    __slots__ = ('top_limit', 'phases', 'peak_bytes')
+
+    def __init__(self, top_limit: int = 0):
+        self.top_limit = top_limit
+        self.phases: List[Dict] = []
+        self.peak_bytes = 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Record peak traced memory and net allocation sites of the enclosed block.
+
+        The peak is relative to the memory traced when the phase started.
+        Phases must not nest, because each one resets the tracemalloc peak.
+        Allocation sites need two snapshots, which take around a second each
+        once ReportLab is loaded, so they are only collected when top_limit > 0.
+        """
+        baseline = tracemalloc.take_snapshot() if self.top_limit else None
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            end, peak = tracemalloc.get_traced_memory()
+            self.peak_bytes = max(self.peak_bytes, peak)
+            self.phases.append({
+                'phase': name,
+                'peak_mb': round((peak - start) / MB, 2),
+                'retained_mb': round((end - start) / MB, 2),
+                'rss_mb': current_rss_mb(),
+                'top_sites': top_sites(tracemalloc.take_snapshot(), baseline, self.top_limit) if baseline else [],
+            })
+
+
+def recent_requests() -> List[Dict]:
+    """Memory records of the most recent tracked requests, newest first."""
+    with _recent_lock:
+        return list(reversed(_recent))
+
+
+def init_memory_profiling(app: Flask) -> None:
+    """
+    Start tracemalloc and register request hooks when MEMORY_PROFILING_ENABLED is set.
+
+    tracemalloc is process-wide, so per-phase figures are only exact when the
+    worker serves one request at a time. Pillow allocates pixel buffers outside
+    the Python allocator; the RSS figures recorded next to each phase cover them.
+    """
+    if not app.config.get('MEMORY_PROFILING_ENABLED'):
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(app.config.get('MEMORY_TRACE_FRAMES', 1))
+    top_limit = app.config.get('MEMORY_TOP_SITES', 0)
+
+    @app.before_request
+    def _start_memory_tracking():
+        if request.endpoint in ('static', 'debug_memory'):
+            return
+        g.memory_tracker = MemoryTracker(top_limit)
+        g.memory_started = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    @app.after_request
+    def _finish_memory_tracking(response: Response) -> Response:
+        tracker: Optional[MemoryTracker] = g.pop('memory_tracker', None)
+        if tracker is None:
+            return response
+
+        # Phases reset the tracemalloc peak, so combine it with the peaks they saw
+        _, peak = tracemalloc.get_traced_memory()
+        request_peak = (max(peak, tracker.peak_bytes) - g.pop('memory_started', 0)) / MB
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        record = {
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'peak_mb': round(request_peak, 2),
+            'rss_mb': current_rss_mb(),
+            'phases': tracker.phases,
+        }
+        with _recent_lock:
+            _recent.append(record)
+
+        fields = ' '.join(f"{item['phase']}_peak_mb={item['peak_mb']}" for item in tracker.phases)
+        current_app.logger.info(
+            f"request_memory method={request.method} route={route} status={response.status_code} "
+            f"peak_mb={record['peak_mb']} rss_mb={record['rss_mb']} {fields}".rstrip()
+        )
+        for item in tracker.phases:
+            if item['top_sites']:
+                sites = ', '.join(f"{site['site']} +{site['size_kb']}KB" for site in item['top_sites'])
+                current_app.logger.info(f"request_memory_sites route={route} phase={item['phase']} {sites}")
+        return response
+
+    def debug_memory():
+        """Current traced memory, top live allocation sites and recent requests."""
+        current, peak = tracemalloc.get_traced_memory()
+        return jsonify({
+            'traced_current_mb': round(current / MB, 2),
+            'traced_peak_mb': round(peak / MB, 2),
+            'rss_mb': current_rss_mb(),
+            'top_sites': top_sites(tracemalloc.take_snapshot(), limit=request.args.get('limit', 10, type=int)),
+            'requests': recent_requests(),
+        })
+
+    app.add_url_rule('/debug/memory', 'debug_memory', debug_memory)
@@ -0,0 +1,189 @@
+"""Prometheus metrics collection and the /metrics endpoint."""
+import os
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from flask import Flask, Response, g, request
+
+_NOOP = nullcontext()
+
+# Latency buckets (seconds) shared by request and PDF build histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6)
+
+
+class _Metrics:
+    """Holds the metric objects once prometheus_client has been configured."""
+
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+
+        self.requests = Counter(
+            'proposal_http_requests_total', 'HTTP requests by route',
+            ['method', 'route', 'status']
+        )
+        self.request_latency = Histogram(
+            'proposal_http_request_duration_seconds', 'HTTP request latency by route',
+            ['method', 'route'], buckets=LATENCY_BUCKETS
+        )
+        self.request_phase = Histogram(
+            'proposal_request_phase_duration_seconds', 'Time spent in each phase of a request',
+            ['route', 'phase'], buckets=LATENCY_BUCKETS
+        )
+        self.pdf_build = Histogram(
+            'proposal_pdf_build_duration_seconds', 'Time spent laying out and writing a PDF',
+            ['kind'], buckets=LATENCY_BUCKETS
+        )
+        self.pdf_size = Histogram(
+            'proposal_pdf_size_bytes', 'Size of generated PDFs',
+            ['kind'], buckets=SIZE_BUCKETS
+        )
+        self.image_bytes = Counter(
+            'proposal_image_bytes_processed_total', 'Bytes of uploaded images read'
+        )
+        self.image_pixels = Counter(
+            'proposal_image_pixels_decoded_total', 'Pixels decoded from uploaded images'
+        )
+        self.cache_lookups = Counter(
+            'proposal_cache_lookups_total', 'Cache lookups by cache and result',
+            ['cache', 'result']
+        )
+        self.renders_in_progress = Gauge(
+            'proposal_renders_in_progress', 'Image and PDF renders currently running',
+            ['kind'], multiprocess_mode='livesum'
+        )
+        self.admission_rejections = Counter(
+            'proposal_admission_rejections_total', 'Heavy requests turned away by admission control',
+            ['reason']
+        )
+
+
+_metrics: Optional[_Metrics] = None
+_temp_files: Optional['_TempFileCollector'] = None
+
+
+class _TempFileCollector:
+    """Counts files left in the upload and temp folders at scrape time."""
+
+    def __init__(self, upload_folder: str, proposal_folder: str):
+        self.upload_folder = upload_folder
+        self.proposal_folder = proposal_folder
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        family = GaugeMetricFamily(
+            'proposal_temp_files', 'Files currently in the upload and temp folders', labels=['location']
+        )
+        family.add_metric(['uploads'], _count_files(self.upload_folder))
+        family.add_metric(['tmp_proposals'], _count_files(self.proposal_folder, prefix='proposal_'))
+        yield family
+
+
+def _count_files(folder: str, prefix: str = '') -> int:
+    """Count regular files in a folder, optionally only those with a prefix."""
+    try:
+        with os.scandir(folder) as entries:
+            return sum(
+                1 for entry in entries
+                if entry.is_file() and entry.name.startswith(prefix) and entry.name != '.gitkeep'
+            )
+    except OSError:
+        return 0
+
+
+def observe_phase(route: str, phase: str, seconds: float) -> None:
+    """Record one timed request phase."""
+    if _metrics is not None:
+        _metrics.request_phase.labels(route, phase).observe(seconds)
+
+
+def observe_pdf(kind: str, seconds: float, size_bytes: int) -> None:
+    """Record one PDF build."""
+    if _metrics is not None:
+        _metrics.pdf_build.labels(kind).observe(seconds)
+        _metrics.pdf_size.labels(kind).observe(size_bytes)
+
+
+def observe_image(size_bytes: int, pixels: int) -> None:
+    """Record one decoded upload."""
+    if _metrics is not None:
+        _metrics.image_bytes.inc(size_bytes)
+        _metrics.image_pixels.inc(pixels)
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+    """Record a cache lookup."""
+    if _metrics is not None:
+        _metrics.cache_lookups.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_admission(reason: str) -> None:
+    """Record a request turned away by admission control."""
+    if _metrics is not None:
+        _metrics.admission_rejections.labels(reason).inc()
+
+
+def rendering(kind: str):
+    """Context manager tracking an in-progress image or PDF render."""
+    if _metrics is None:
+        return _NOOP
+    return _metrics.renders_in_progress.labels(kind).track_inprogress()
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Enable metrics collection and register the /metrics endpoint.
+
+    When PROMETHEUS_MULTIPROC_DIR is configured, each worker process writes
+    its samples to that directory and /metrics aggregates all of them, so any
+    worker can answer a scrape. The directory must exist and should be emptied
+    whenever the server (not an individual worker) restarts.
+    """
+    global _metrics, _temp_files
+
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    # prometheus_client picks its storage mode at import time
+    multiproc_dir = app.config.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', multiproc_dir)
+
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    from prometheus_client import multiprocess
+
+    if _metrics is None:
+        _metrics = _Metrics()
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    if _temp_files is None or registry is not REGISTRY:
+        _temp_files = _TempFileCollector(app.config['UPLOAD_FOLDER'], app.config['PROPOSAL_FOLDER'])
+        registry.register(_temp_files)
+    _temp_files.upload_folder = app.config['UPLOAD_FOLDER']
+    _temp_files.proposal_folder = app.config['PROPOSAL_FOLDER']
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response: Response) -> Response:
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            _metrics.requests.labels(request.method, route, str(response.status_code)).inc()
+            _metrics.request_latency.labels(request.method, route).observe(time.perf_counter() - started)
+        return response
+
+    def metrics_endpoint():
+        """Expose metrics in the Prometheus text format."""
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
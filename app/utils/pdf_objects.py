@@ -0,0 +1,266 @@
+"""Minimal reader (and incremental-update writer) for the objects and cross-reference tables of a PDF file."""
+import re
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+_STARTXREF = re.compile(rb'startxref\s+(\d+)\s*%%EOF\s*$')
+_SUBSECTION = re.compile(rb'(\d+) (\d+)[ \t]*\r?\n')
+_OBJECT_HEADER = re.compile(rb'(\d+) (\d+) obj')
+_PREV = re.compile(rb'/Prev\s+(\d+)')
+_REFERENCE = rb'(\d+) \d+ R'
+_KIDS = re.compile(rb'/Kids\s*\[([^\]]*)\]')
+_TYPE_PAGES = re.compile(rb'/Type\s*/Pages\b')
+# Trailer entries an update carries over: /Root and /Info references, the /ID pair
+_TRAILER_KEEP = re.compile(rb'/(?:Root|Info)\s+\d+ \d+ R|/ID\s*\[[^\]]*\]')
+_SIZE = re.compile(rb'/Size\s+(\d+)')
+
+# Classic cross-reference entries are exactly this long ("oooooooooo ggggg n\r\n")
+_ENTRY_SIZE = 20
+
+
+class PDFParseError(ValueError):
+    """The file is not a PDF this reader understands (e.g. it uses cross-reference streams)."""
+
+
+class XrefSection(NamedTuple):
+    """One cross-reference table and the trailer after it."""
+
+    offset: int  # Of the 'xref' keyword
+    # Object number -> (byte offset, generation) of the objects in use
+    objects: Dict[int, Tuple[int, int]]
+    trailer: bytes  # The trailer dictionary, '<<' to '>>'
+
+
+class ObjectSpan(NamedTuple):
+    """Where one indirect object sits in the file."""
+
+    number: int
+    generation: int
+    start: int  # Of 'N G obj'
+    body: int  # Just past 'N G obj'
+    end: int  # Where the next object or cross-reference table starts
+
+
+def read_xref(data: bytes) -> List[XrefSection]:
+    """
+    Read every cross-reference section, newest first (following /Prev).
+
+    Args:
+        data: Whole PDF file
+
+    Returns:
+        The sections; an incrementally updated file has more than one
+
+    Raises:
+        PDFParseError: If there is no classic cross-reference table
+    """
+    match = _STARTXREF.search(data, max(0, len(data) - 1024))
+    if not match:
+        raise PDFParseError("No startxref at the end of the file")
+
+    sections = []
+    offset = int(match.group(1))
+    seen = set()
+    while offset is not None:
+        if offset in seen or not data.startswith(b'xref', offset):
+            raise PDFParseError(f"No cross-reference table at offset {offset}")
+        seen.add(offset)
+        section = _read_section(data, offset)
+        sections.append(section)
+        prev = _PREV.search(section.trailer)
+        offset = int(prev.group(1)) if prev else None
+    return sections
+
+
+def _read_section(data: bytes, offset: int) -> XrefSection:
+    """Read the cross-reference table at an offset and its trailer."""
+    pos = offset + len(b'xref')
+    while data[pos:pos + 1] in (b'\r', b'\n', b' '):
+        pos += 1
+
+    objects = {}
+    while True:
+        subsection = _SUBSECTION.match(data, pos)
+        if not subsection:
+            break
+        first, count = int(subsection.group(1)), int(subsection.group(2))
+        pos = subsection.end()
+        for number in range(first, first + count):
+            entry = data[pos:pos + _ENTRY_SIZE]
+            if len(entry) < _ENTRY_SIZE or entry[17:18] not in (b'n', b'f'):
+                raise PDFParseError(f"Bad cross-reference entry at offset {pos}")
+            if entry[17:18] == b'n':
+                objects[number] = (int(entry[0:10]), int(entry[11:16]))
+            pos += _ENTRY_SIZE
+
+    trailer_start = data.find(b'trailer', pos)
+    dict_start = data.find(b'<<', trailer_start)
+    dict_end = data.find(b'startxref', dict_start)
+    if trailer_start < 0 or dict_start < 0 or dict_end < 0:
+        raise PDFParseError(f"No trailer after the cross-reference table at offset {offset}")
+    trailer = data[dict_start:data.rfind(b'>>', dict_start, dict_end) + 2]
+    return XrefSection(offset, objects, trailer)
+
+
+def object_spans(data: bytes) -> List[ObjectSpan]:
+    """
+    Locate every indirect object in the file, in file order.
+
+    Objects replaced by an incremental update are included, since their
+    bytes are still in the file. Each object runs until the next object or
+    cross-reference table, so the spans and the bytes between them cover
+    the whole file.
+
+    Args:
+        data: Whole PDF file
+
+    Returns:
+        One span per object
+
+    Raises:
+        PDFParseError: If the file cannot be read
+    """
+    sections = read_xref(data)
+    starts = {}
+    for section in sections:
+        for number, (offset, generation) in section.objects.items():
+            starts[offset] = (number, generation)
+    boundaries = sorted(set(starts) | {section.offset for section in sections})
+
+    spans = []
+    for index, start in enumerate(boundaries):
+        if start not in starts:
+            continue
+        number, generation = starts[start]
+        header = _OBJECT_HEADER.match(data, start)
+        if not header or (int(header.group(1)), int(header.group(2))) != (number, generation):
+            raise PDFParseError(f"Object {number} {generation} is not at offset {start}")
+        end = boundaries[index + 1] if index + 1 < len(boundaries) else len(data)
+        spans.append(ObjectSpan(number, generation, start, header.end(), end))
+    return spans
+
+
+def read_object(data: bytes, number: int, sections: Optional[List[XrefSection]] = None) -> bytes:
+    """
+    Return the body of an object (between 'N G obj' and 'endobj') in its newest version.
+
+    Args:
+        data: Whole PDF file
+        number: Object number
+        sections: The file's cross-reference sections, if already read
+
+    Raises:
+        PDFParseError: If the object is not in the file
+    """
+    for section in sections or read_xref(data):
+        if number in section.objects:
+            offset, generation = section.objects[number]
+            header = _OBJECT_HEADER.match(data, offset)
+            end = data.find(b'endobj', offset)
+            if not header or int(header.group(1)) != number or end < 0:
+                raise PDFParseError(f"Object {number} {generation} is not at offset {offset}")
+            return data[header.end():end].strip()
+    raise PDFParseError(f"No object {number} in the file")
+
+
+def page_objects(data: bytes) -> List[int]:
+    """
+    Object numbers of the pages, in page order.
+
+    Args:
+        data: Whole PDF file
+
+    Raises:
+        PDFParseError: If the page tree cannot be read
+    """
+    sections = read_xref(data)
+    root = re.search(rb'/Root\s+' + _REFERENCE, sections[0].trailer)
+    if not root:
+        raise PDFParseError("No /Root in the trailer")
+    pages = re.search(rb'/Pages\s+' + _REFERENCE, read_object(data, int(root.group(1)), sections))
+    if not pages:
+        raise PDFParseError("No /Pages in the document catalog")
+
+    numbers = []
+    pending = [int(pages.group(1))]
+    while pending:
+        number = pending.pop(0)
+        body = read_object(data, number, sections)
+        kids = _KIDS.search(body)
+        if _TYPE_PAGES.search(body) and kids:
+            pending[0:0] = [int(kid) for kid in re.findall(_REFERENCE, kids.group(1))]
+        else:
+            numbers.append(number)
+    return numbers
+
+
+def next_object_number(data: bytes, sections: Optional[List[XrefSection]] = None) -> int:
+    """
+    The number the next new object would get (the trailer's /Size).
+
+    Raises:
+        PDFParseError: If the file cannot be read
+    """
+    size = _SIZE.search((sections or read_xref(data))[0].trailer)
+    if not size:
+        raise PDFParseError("No /Size in the trailer")
+    return int(size.group(1))
+
+
+def stream_object(content: bytes) -> bytes:
+    """Body of a Flate-compressed stream object holding some content."""
+    compressed = zlib.compress(content)
+    return b'<< /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream' % (len(compressed), compressed)
+
+
+def append_update(data: bytes, objects: Dict[int, bytes]) -> bytes:
+    """
+    Append an incremental update: new versions of some objects and new objects.
+
+    The original bytes are left as they are. The update adds the objects,
+    a cross-reference table for them and a trailer pointing back (/Prev)
+    at the previous table, as PDF editors do when saving changes.
+
+    Args:
+        data: Whole PDF file
+        objects: Object number -> body (what goes between 'N 0 obj' and 'endobj');
+            numbers from the trailer's /Size up are new objects
+
+    Returns:
+        The updated file
+
+    Raises:
+        PDFParseError: If the file cannot be read
+    """
+    sections = read_xref(data)
+    size = next_object_number(data, sections)
+
+    out = bytearray(data)
+    if not out.endswith(b'\n'):
+        out += b'\n'
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, objects[number])
+
+    xref_offset = len(out)
+    # Starts with the head of the free list, as a full table does; some readers expect it
+    out += b'xref\n0 1\n0000000000 65535 f\r\n'
+    numbers = sorted(offsets)
+    start = 0
+    while start < len(numbers):
+        # One subsection per run of consecutive object numbers
+        end = start + 1
+        while end < len(numbers) and numbers[end] == numbers[end - 1] + 1:
+            end += 1
+        out += b'%d %d\n' % (numbers[start], end - start)
+        for number in numbers[start:end]:
+            out += b'%010d 00000 n\r\n' % offsets[number]
+        start = end
+
+    entries = b'\n'.join(_TRAILER_KEEP.findall(sections[0].trailer))
+    new_size = max(size, numbers[-1] + 1)
+    out += b'trailer\n<<\n%s\n/Size %d\n/Prev %d\n>>\nstartxref\n%d\n%%%%EOF\n' % (
+        entries, new_size, sections[0].offset, xref_offset
+    )
+    return bytes(out)
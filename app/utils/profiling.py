@@ -0,0 +1,194 @@
+"""
+Opt-in cProfile capture for slow or sampled requests, plus a CLI to inspect them.
+
+When PROFILING_ENABLED is set, requests are profiled with cProfile. A
+profile is kept when the request takes longer than PROFILE_SLOW_MS, or when
+it was picked by PROFILE_SAMPLE_RATE. Each kept profile is saved to
+PROFILE_DIR as ``<stamp>_<fingerprint>.prof``, next to a ``.json`` file with
+the route, duration, status and request inputs needed to replay it. Client
+details (name, email, contact number) are redacted from those inputs.
+
+Usage:
+    python -m app.utils.profiling list
+    python -m app.utils.profiling show <profile> [--limit 30] [--all]
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from flask import Flask, Response, current_app, g, request
+
+# Frames shown by default: the services that dominate proposal builds
+DEFAULT_FRAME_FILTER = r'pdf_service|image_service'
+REDACTED = '[redacted]'
+
+
+def init_profiling(app: Flask) -> None:
+    """Register profiling hooks when PROFILING_ENABLED is set."""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    slow_ms = app.config.get('PROFILE_SLOW_MS')
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint in ('static', 'metrics'):
+            return
+        sampled = random.random() < sample_rate
+        if not sampled and not slow_ms:
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active on this interpreter (Python 3.12+ allows one)
+            return
+        g.profile = (profiler, time.perf_counter(), sampled)
+
+    @app.after_request
+    def _finish_profile(response: Response) -> Response:
+        state = g.pop('profile', None)
+        if state is None:
+            return response
+
+        profiler, started, sampled = state
+        profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        slow = bool(slow_ms) and duration_ms >= slow_ms
+        if slow or sampled:
+            try:
+                _save_profile(profiler, duration_ms, response.status_code, 'slow' if slow else 'sampled')
+            except OSError as e:
+                current_app.logger.warning(f"Could not save request profile: {str(e)}")
+        return response
+
+
+def _save_profile(profiler: cProfile.Profile, duration_ms: float, status: int, reason: str) -> str:
+    """Write the profile and its request metadata to PROFILE_DIR."""
+    from app.services.pdf_layouts import CLIENT_FIELDS
+    from app.utils.fingerprint import fingerprint_request, hash_stream
+
+    fingerprint = fingerprint_request()
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    base = os.path.join(current_app.config['PROFILE_DIR'], f"{stamp}_{fingerprint[:12]}")
+
+    profiler.dump_stats(f"{base}.prof")
+    with open(f"{base}.json", 'w', encoding='utf-8') as handle:
+        json.dump({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else request.path,
+            'status': status,
+            'duration_ms': round(duration_ms, 1),
+            'reason': reason,
+            'fingerprint': fingerprint,
+            'inputs': {
+                'form': _redact(request.form.to_dict(flat=False), CLIENT_FIELDS),
+                'json': _redact(request.get_json(silent=True), CLIENT_FIELDS) if request.is_json else None,
+                'files': [
+                    {'field': key, 'filename': file.filename, 'content_type': file.content_type,
+                     'sha256': hash_stream(file.stream)}
+                    for key in request.files for file in request.files.getlist(key)
+                ],
+            },
+        }, handle, indent=2)
+
+    current_app.logger.info(
+        f"request_profile reason={reason} route={request.path} duration_ms={duration_ms:.1f} file={base}.prof"
+    )
+    return f"{base}.prof"
+
+
+def _redact(value, fields):
+    """Copy parsed request data with the values of ``fields`` replaced, at any depth."""
+    if isinstance(value, dict):
+        return {key: REDACTED if key in fields else _redact(item, fields) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item, fields) for item in value]
+    return value
+
+
+def list_profiles(profile_dir: str) -> List[dict]:
+    """Return saved profile metadata, newest first."""
+    entries = []
+    if not os.path.isdir(profile_dir):
+        return entries
+    for name in sorted(os.listdir(profile_dir), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(profile_dir, name), 'r', encoding='utf-8') as handle:
+            meta = json.load(handle)
+        meta['profile'] = os.path.join(profile_dir, name[:-5] + '.prof')
+        entries.append(meta)
+    return entries
+
+
+def render_profile(path: str, limit: int = 30, frame_filter: Optional[str] = DEFAULT_FRAME_FILTER,
+                   sort: str = 'cumulative', stream=None) -> None:
+    """Print the hottest frames of a saved profile."""
+    stats = pstats.Stats(path, stream=stream or sys.stdout)
+    stats.strip_dirs().sort_stats(sort)
+    if frame_filter:
+        stats.print_stats(frame_filter, limit)
+    else:
+        stats.print_stats(limit)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Inspect request profiles captured by PROFILING_ENABLED.')
+    parser.add_argument('--dir', default=Config.PROFILE_DIR, help='Profile directory (default: PROFILE_DIR)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='List captured profiles, newest first')
+
+    show = commands.add_parser('show', help='Render the hottest frames of a profile')
+    show.add_argument('profile', help='Profile path, file name, or fingerprint prefix')
+    show.add_argument('--limit', type=int, default=30, help='Number of frames to show (default: 30)')
+    show.add_argument('--sort', default='cumulative', help='pstats sort key (default: cumulative)')
+    show.add_argument('--filter', default=DEFAULT_FRAME_FILTER, help='Regex of frames to keep')
+    show.add_argument('--all', action='store_true', help='Show all frames, not just PDF/image services')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        profiles = list_profiles(args.dir)
+        if not profiles:
+            print(f"No profiles in {args.dir}")
+            return 0
+        print(f"{'timestamp':<20} {'ms':>8} {'status':>6} {'reason':<8} {'route':<22} profile")
+        for meta in profiles:
+            print(f"{meta['timestamp']:<20} {meta['duration_ms']:>8.1f} {meta['status']:>6} "
+                  f"{meta['reason']:<8} {meta['route']:<22} {os.path.basename(meta['profile'])}")
+        return 0
+
+    path = args.profile
+    if not os.path.exists(path):
+        matches = [
+            meta['profile'] for meta in list_profiles(args.dir)
+            if os.path.basename(meta['profile']).startswith(path) or meta['fingerprint'].startswith(path)
+        ]
+        if len(matches) != 1:
+            print(f"{'No' if not matches else 'Several'} profiles match {path}")
+            return 1
+        path = matches[0]
+
+    render_profile(path, args.limit, None if args.all else args.filter, args.sort)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
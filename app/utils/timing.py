@@ -0,0 +1,97 @@
+"""Request-phase timing with Server-Timing headers and a Prometheus histogram."""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+
+from app.utils import metrics
+
+_NOOP = nullcontext()
+
+
+class PhaseTimer:
+    """Collects phase durations for a single request."""
+
+    __slots__ = ('started', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def total_ms(self) -> float:
+        """Milliseconds elapsed since the request started."""
+        return (time.perf_counter() - self.started) * 1000
+
+
+def phase(name: str):
+    """
+    Time a block of work as a phase of the current request.
+
+    When memory profiling is enabled the same block is also tracked by the
+    request's MemoryTracker. Returns a shared no-op context manager when
+    neither is active, so call sites cost one lookup.
+
+    Args:
+        name: Phase name (used as the Server-Timing metric name)
+    """
+    if not has_app_context():
+        return _NOOP
+    timer: Optional[PhaseTimer] = g.get('phase_timer')
+    tracker = g.get('memory_tracker')
+    if tracker is None:
+        return _NOOP if timer is None else timer.phase(name)
+    if timer is None:
+        return tracker.phase(name)
+    return _timed_and_tracked(timer, tracker, name)
+
+
+@contextmanager
+def _timed_and_tracked(timer: PhaseTimer, tracker, name: str) -> Iterator[None]:
+    # Memory tracking wraps timing so snapshot cost is not counted as phase time
+    with tracker.phase(name), timer.phase(name):
+        yield
+
+
+def init_timing(app: Flask) -> None:
+    """Register request hooks when REQUEST_TIMING_ENABLED is set."""
+    if not app.config.get('REQUEST_TIMING_ENABLED'):
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.phase_timer = PhaseTimer()
+
+    @app.after_request
+    def _finish_timer(response: Response) -> Response:
+        timer: Optional[PhaseTimer] = g.pop('phase_timer', None)
+        if timer is None:
+            return response
+
+        total_ms = timer.total_ms()
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        timings = [f"{name};dur={duration:.1f}" for name, duration in timer.phases]
+        timings.append(f"total;dur={total_ms:.1f}")
+        response.headers.add('Server-Timing', ', '.join(timings))
+
+        # proposal_request_phase_duration_seconds, when METRICS_ENABLED is set
+        for name, duration in timer.phases:
+            metrics.observe_phase(route, name, duration / 1000)
+        metrics.observe_phase(route, 'total', total_ms / 1000)
+
+        fields = ' '.join(f"{name}_ms={duration:.1f}" for name, duration in timer.phases)
+        current_app.logger.info(
+            f"request_timing method={request.method} route={route} "
+            f"status={response.status_code} total_ms={total_ms:.1f} {fields}".rstrip()
+        )
+        return response
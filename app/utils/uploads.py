@@ -0,0 +1,148 @@
+"""Streaming handling of uploaded images while the multipart body is parsed."""
+from tempfile import SpooledTemporaryFile
+from typing import IO, TYPE_CHECKING, Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app.utils.image_header import SNIFF_BYTES, sniff_format
+
+if TYPE_CHECKING:
+    from PIL import Image, ImageFile
+
+
+# Largest header buffered while waiting for Pillow to parse it (EXIF blocks are < 64KB)
+_MAX_HEADER_BYTES = 1024 * 1024
+
+# Same wording as image_header.check_image, so both paths report non-images alike
+_NOT_AN_IMAGE = 'not a JPEG, PNG, GIF, BMP or WebP image'
+
+
+class ImageUploadStream:
+    """
+    Destination for one uploaded file, written chunk by chunk by Werkzeug.
+
+    Each chunk is checked and spooled as it arrives:
+    - The magic bytes must name a supported image format. Otherwise the file
+      is marked rejected (``rejected_reason``), the rest of it is discarded,
+      and ImageService leaves it out of the proposal.
+    - The running size must stay under the per-file limit (else 413).
+    - Once the header is parsed, the pixel count must stay under the limit (else 413).
+    - Chunks go to a SpooledTemporaryFile, which moves to disk above the spool threshold.
+    - Chunks are fed to Pillow's ImageFile.Parser until it has parsed the
+      header. Formats the parser can decode incrementally (e.g. BMP) keep
+      being fed, so decoding overlaps the upload and ImageService reuses the
+      image. JPEG, PNG, GIF and WebP have no incremental decoder there; they
+      are opened from the spooled file (JPEGs drafted to the collage size).
+    """
+
+    def __init__(self, filename: str, max_size: int, spool_threshold: int,
+                 max_pixels: int, decode: bool = True):
+        self.filename = filename
+        self.max_size = max_size
+        self.max_pixels = max_pixels
+        self.size = 0
+        self.format: Optional[str] = None
+        # Why the file will be skipped, once it is known not to be an image
+        self.rejected_reason: Optional[str] = None
+        self._file = SpooledTemporaryFile(max_size=spool_threshold, mode='w+b')
+        self._header = b''
+        self._decode = decode
+        # Created on the first chunk (Pillow is imported lazily); dropped once it is of no further use
+        self._parser: Optional['ImageFile.Parser'] = None
+        self._checked_pixels = False
+
+    def write(self, data: bytes) -> int:
+        """Check and store the next chunk of the upload."""
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge(
+                f"{self.filename} is larger than {self.max_size // (1024 * 1024)} MB"
+            )
+        if self.rejected_reason:
+            return len(data)
+
+        if self.format is None and len(self._header) < SNIFF_BYTES:
+            self._header += data[:SNIFF_BYTES - len(self._header)]
+            if len(self._header) >= SNIFF_BYTES:
+                self.format = sniff_format(self._header)
+                if self.format is None:
+                    self.rejected_reason = _NOT_AN_IMAGE
+                    self._parser = None
+                    self._file.seek(0)
+                    self._file.truncate()
+                    return len(data)
+
+        if self._decode:
+            from PIL import ImageFile
+            # One parser per upload, from its first byte
+            self._decode = False
+            self._parser = ImageFile.Parser()
+        if self._parser is not None:
+            self._feed(data)
+        return self._file.write(data)
+
+    def _feed(self, data: bytes) -> None:
+        try:
+            self._parser.feed(data)
+        except (OSError, SyntaxError, ValueError):
+            # Corrupt or unusual file: ImageService checks and opens the spooled file instead
+            self._parser = None
+            return
+
+        image = self._parser.image
+        if image is None:
+            if self.size >= _MAX_HEADER_BYTES:
+                self._parser = None
+            return
+
+        if not self._checked_pixels:
+            self._checked_pixels = True
+            width, height = image.size
+            if width * height > self.max_pixels:
+                raise RequestEntityTooLarge(
+                    f"{self.filename} is {width}x{height}; "
+                    f"the limit is {self.max_pixels // 1_000_000} megapixels"
+                )
+        if self._parser.decoder is None:
+            # Header parsed, but the parser would only buffer the rest until close()
+            self._parser = None
+
+    def decoded_image(self) -> Optional['Image.Image']:
+        """
+        Return the image decoded while the upload streamed in, if there is one.
+
+        Returns None for formats the parser cannot decode incrementally, or
+        when the data could not be decoded; callers then open the spooled bytes.
+        """
+        if self._parser is None:
+            return None
+        parser, self._parser = self._parser, None
+        try:
+            return parser.close()
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+    def close(self) -> None:
+        """Release the spooled data and any parser state."""
+        self._parser = None
+        self._file.close()
+
+    def __getattr__(self, name: str):
+        # read/seek/tell/etc. go to the spooled file
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Request class that streams uploaded files through ImageUploadStream."""
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        config = current_app.config
+        return ImageUploadStream(
+            filename or 'upload',
+            max_size=config['UPLOAD_MAX_FILE_SIZE'],
+            spool_threshold=config['UPLOAD_SPOOL_THRESHOLD'],
+            max_pixels=config['UPLOAD_MAX_PIXELS'],
+            decode=config['UPLOAD_DECODE_WHILE_STREAMING'],
+        )
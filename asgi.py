@@ -0,0 +1,27 @@
+"""
+ASGI entry point: serves the app from an ASGI server, e.g.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+Slow uploads and downloads are handled on the server's event loop, so they
+do not hold one of the app's ASGI_THREADS threads while they trickle in or
+out (see app/utils/asgi.py).
+"""
+import os
+
+from app import create_app
+from app.utils.asgi import ASGIAdapter
+from config import config
+
+config_name = os.getenv('FLASK_ENV', 'production')
+app = create_app(config_name if config_name in config else 'default')
+
+# Load the PDF/image libraries (and warm their caches) before serving, as wsgi.py does
+if app.config['WARM_UP_ENABLED']:
+    from app.warmup import warm_up
+    warm_up(app)
+elif app.config['PRELOAD_MODULES']:
+    from app.warmup import preload
+    preload()
+
+application = ASGIAdapter(app)
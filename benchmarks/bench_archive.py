@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Time archive searches over a large index and downloads of archived PDFs.
+
+Fills a scratch archive index with N synthetic entries (clients, emails,
+projects, brands, units, TCPs and dates spread over two years), then times
+typical searches: prefix matches on each text field, date and TCP ranges,
+and paging. Finally archives one real proposal and compares downloading it
+from the archive with building it again. Reports median milliseconds.
+
+Usage:
+    python -m benchmarks.bench_archive
+    python -m benchmarks.bench_archive --entries 500000 --iterations 50
+"""
+import argparse
+import io
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.bench_pipeline import _time  # noqa: E402
+
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Grace', 'Paolo', 'Liza', 'Ramon', 'Carmela']
+LAST_NAMES = ['Dela Cruz', 'Santos', 'Reyes', 'Garcia', 'Mendoza', 'Bautista', 'Villanueva', 'Ramos', 'Aquino']
+PROJECTS = ['Ortigas Center, Pasig City', 'Silang, Cavite', 'Lipa, Batangas', 'Bonifacio Global City',
+            'Cebu IT Park', 'Davao City', 'Angeles, Pampanga', 'Sta. Rosa, Laguna']
+BRANDS = ['Metro Gate', 'Heritage', 'Moldex Residence', 'The Grand Series']
+
+
+def fill(archive, entries: int, seed: int = 0) -> None:
+    """Add synthetic index records (no stored PDFs) in batches."""
+    from app.models.archive_entry import ArchiveEntry
+
+    rng = random.Random(seed)
+    now = time.time()
+    batch = []
+    for i in range(entries):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        batch.append(ArchiveEntry(
+            id=f'{i:032x}', kind='proposal', file_name=f'proposal_{i}.pdf',
+            client_name=f'{first} {last} {i % 5000}', email=f'{first}.{last.replace(" ", "")}{i % 5000}@example.com',
+            project=rng.choice(PROJECTS), brand=rng.choice(BRANDS),
+            unit=f'Tower {rng.randint(1, 6)} Unit {rng.randint(100, 4000)}',
+            tcp=float(rng.randrange(1_500_000, 25_000_000, 10_000)),
+            created=now - rng.uniform(0, 2 * 365 * 86400), size=60000, stored_size=40000
+        ))
+        if len(batch) == 20000:
+            archive._insert(batch)
+            batch = []
+    if batch:
+        archive._insert(batch)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--entries', type=int, default=200000, help='Synthetic index entries (default: 200000)')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed runs per query (default: 20)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Config is read at import, so point it at scratch storage first
+        os.environ.update({
+            'ARCHIVE_ENABLED': 'true',
+            'ARCHIVE_FOLDER': os.path.join(tmp, 'archive'),
+            'ARCHIVE_DB_PATH': os.path.join(tmp, 'archive.sqlite3'),
+            'ARCHIVE_API_TOKEN': 'bench',
+            'DRAFTS_ENABLED': 'false',
+            'STORAGE_BACKEND': 'memory',
+            'INFLIGHT_DEDUP_ENABLED': 'false',
+        })
+        from app import create_app
+        from benchmarks.fixtures import FORMS, make_images
+
+        app = create_app('development')
+        archive = app.extensions['archive']
+
+        start = time.perf_counter()
+        fill(archive, args.entries)
+        print(f"indexed {args.entries} entries in {time.perf_counter() - start:.1f} s "
+              f"({os.path.getsize(archive.path) / 1e6:.0f} MB index)")
+
+        year_ago = time.time() - 365 * 86400
+        queries = {
+            'client prefix': dict(prefixes={'client': 'maria san'}),
+            'email prefix': dict(prefixes={'email': 'ana.reyes12'}),
+            'project + last month': dict(prefixes={'project': 'silang'}, since=time.time() - 30 * 86400),
+            'brand + tcp range': dict(prefixes={'brand': 'heritage'}, tcp_min=3e6, tcp_max=3.5e6),
+            'unit prefix': dict(prefixes={'unit': 'tower 3 unit 12'}),
+            'date range': dict(since=year_ago, until=year_ago + 7 * 86400),
+            'newest': dict(),
+        }
+        print(f"{'search':<22} {'p50 ms':>8} {'rows':>6}")
+        for name, query in queries.items():
+            samples, rows = _time(lambda: archive.search(**query), args.iterations, warmup=1)
+            print(f"{name:<22} {statistics.median(samples):>8.2f} {len(rows):>6}")
+
+        last = archive.search(prefixes={'brand': 'metro'}, limit=50)[-1].id
+        samples, rows = _time(
+            lambda: archive.search(prefixes={'brand': 'metro'}, limit=50, before=last), args.iterations, warmup=1
+        )
+        print(f"{'next page':<22} {statistics.median(samples):>8.2f} {len(rows):>6}")
+
+        client = app.test_client()
+        images = make_images(4, 'large')
+
+        def build():
+            data = dict(FORMS['house_and_lot'], pictures=[(io.BytesIO(content), name) for name, content in images])
+            response = client.post('/generate-proposal', data=data, content_type='multipart/form-data')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response
+
+        entry_id = build().headers['X-Archive-Id']
+        entry = archive.get(entry_id)
+
+        def download(encoding: str):
+            response = client.get(f'/api/archive/{entry_id}/pdf', headers={
+                'Accept-Encoding': encoding, 'Authorization': 'Bearer bench'
+            })
+            assert response.status_code == 200
+            return response.data
+
+        print(f"\nproposal with 4 photos: {entry.size} bytes, archived as {entry.stored_size} "
+              f"({entry.stored_size / entry.size:.0%})")
+        print(f"{'retrieval':<22} {'p50 ms':>8}")
+        for name, fn in (('build again', build), ('archive (gzip)', lambda: download('gzip')),
+                         ('archive (identity)', lambda: download('identity'))):
+            samples, _ = _time(fn, 5, warmup=1)
+            print(f"{name:<22} {statistics.median(samples):>8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare archive storage per proposal: gzip files against shared PDF objects.
+
+Generates N proposals the way agents produce them: a few projects, each
+with its own photo set, many clients, and a handful of units and prices per
+project. Each PDF is archived both gzip-compressed and as an ObjectArchive
+record (objects shared between PDFs stored once). Reports stored bytes per
+proposal for each and the time to read a PDF back, and checks that every
+rebuilt PDF is byte-identical to the original.
+
+Usage:
+    python -m benchmarks.bench_archive_dedup
+    python -m benchmarks.bench_archive_dedup --proposals 300 --resolution medium
+"""
+import argparse
+import gzip
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+CLIENTS = ['Juan Dela Cruz', 'Maria Santos', 'Jose Reyes', 'Ana Garcia', 'Mark Mendoza', 'Grace Bautista',
+           'Paolo Villanueva', 'Liza Ramos', 'Ramon Aquino', 'Carmela Torres', 'Miguel Castro', 'Sofia Navarro']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--proposals', type=int, default=120, help='Proposals to archive (default: 120)')
+    parser.add_argument('--images', type=int, default=3, help='Photos per project (default: 3)')
+    parser.add_argument('--resolution', default='large', help='small, medium or large (default: large)')
+    parser.add_argument('--min-size', type=int, default=512, help='ARCHIVE_OBJECT_MIN_SIZE (default: 512)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    os.environ.update({'STORAGE_BACKEND': 'memory', 'DRAFTS_ENABLED': 'false', 'INFLIGHT_DEDUP_ENABLED': 'false'})
+    from app import create_app
+    from app.services.object_archive import ObjectArchive
+    from benchmarks.fixtures import FORMS, make_image
+
+    app = create_app('development')
+    client = app.test_client()
+
+    # Two projects per product, each with its own photos
+    projects = []
+    for index, (product, form) in enumerate(sorted(FORMS.items()) * 2):
+        photos = [(f'photo_{i + 1}.jpg', make_image(args.resolution, seed=index * 10 + i))
+                  for i in range(args.images)]
+        projects.append((form, photos))
+
+    print(f"generating {args.proposals} proposals ({len(projects)} projects, {len(CLIENTS)} clients)")
+    pdfs = []
+    for i in range(args.proposals):
+        form, photos = projects[i % len(projects)]
+        name = CLIENTS[i % len(CLIENTS)]
+        data = dict(
+            form, client_name=name, email=f"{name.lower().replace(' ', '.')}@example.com",
+            tcp=str(int(float(form['tcp'])) + (i // len(projects)) % 4 * 50000),
+            pictures=[(io.BytesIO(content), file_name) for file_name, content in photos]
+        )
+        response = client.post('/generate-proposal', data=data, content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_data(as_text=True)
+        pdfs.append(response.data)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        objects = ObjectArchive(os.path.join(tmp, 'objects.sqlite3'), min_size=args.min_size)
+        gzipped = []
+        object_bytes = 0
+        for index, pdf in enumerate(pdfs):
+            gzipped.append(gzip.compress(pdf, 6, mtime=0))
+            object_bytes += objects.put(str(index), pdf)
+
+        mismatches = sum(objects.read(str(index)) != pdf for index, pdf in enumerate(pdfs))
+        stats = objects.stats()
+        on_disk = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+
+        def read_times(read) -> float:
+            samples = []
+            for index in range(len(pdfs)):
+                start = time.perf_counter()
+                read(index)
+                samples.append((time.perf_counter() - start) * 1000)
+            return statistics.median(samples)
+
+        gzip_ms = read_times(lambda index: gzip.decompress(gzipped[index]))
+        objects_ms = read_times(lambda index: objects.read(str(index)))
+
+    count = len(pdfs)
+    raw = sum(map(len, pdfs))
+    print(f"{'format':<10} {'KB/proposal':>12} {'of PDF size':>12} {'read p50 ms':>12}")
+    print(f"{'pdf':<10} {raw / count / 1024:>12.1f} {1:>12.0%} {'':>12}")
+    print(f"{'gzip':<10} {sum(map(len, gzipped)) / count / 1024:>12.1f} "
+          f"{sum(map(len, gzipped)) / raw:>12.0%} {gzip_ms:>12.2f}")
+    print(f"{'objects':<10} {object_bytes / count / 1024:>12.1f} {object_bytes / raw:>12.0%} {objects_ms:>12.2f}")
+    print(f"objects: {stats['objects']} shared objects referenced {stats['object_references']} times; "
+          f"records average {stats['record_bytes'] / count / 1024:.1f} KB; "
+          f"SQLite files {on_disk / count / 1024:.1f} KB/proposal")
+    print(f"byte-identical rebuilds: {count - mismatches}/{count}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare one multi-unit comparison PDF against separate proposals per unit.
+
+For each unit count, times building and rendering N full proposals (one
+ProposalService.build and PDFService.render per unit) against one
+ProposalService.build_comparison and PDFService.render_comparison, and
+reports median milliseconds, total bytes and pages.
+
+Usage:
+    python -m benchmarks.bench_comparison
+    python -m benchmarks.bench_comparison --units 3,5,10 --iterations 10
+"""
+import argparse
+import io
+import logging
+import os
+import re
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.bench_pipeline import _time  # noqa: E402
+
+_PAGE = re.compile(rb'/Type /Page\b')
+
+
+def make_units(product: str, count: int) -> List[Dict[str, str]]:
+    """Per-unit fields for ``count`` units, with rising prices."""
+    field = 'floor_unit' if product == 'vertical' else 'block_lot'
+    return [
+        {'tcp': str(3_800_000 + i * 275_000), field: f"Unit {i + 1:02d}", 'floor_area': f"{28 + 2 * i} sqm"}
+        for i in range(count)
+    ]
+
+
+def measure(product: str, count: int, iterations: int) -> Dict[str, Dict[str, float]]:
+    """Time N separate proposals and one comparison for ``count`` units."""
+    from app.services.pdf_service import PDFService
+    from app.services.proposal_service import ProposalService
+    from app.services.storage import MemoryStorage
+    from benchmarks.fixtures import FORMS
+
+    form = FORMS[product]
+    units = make_units(product, count)
+    pdf_service = PDFService(storage=MemoryStorage())
+
+    def separate():
+        outputs = []
+        for unit in units:
+            proposal = ProposalService().build(dict(form, **unit))
+            buffer = io.BytesIO()
+            pdf_service.render(proposal, buffer)
+            outputs.append(buffer.getvalue())
+        return outputs
+
+    def comparison():
+        buffer = io.BytesIO()
+        pdf_service.render_comparison(ProposalService().build_comparison(form, units, max_units=count), buffer)
+        return [buffer.getvalue()]
+
+    results = {}
+    for name, fn in (('separate', separate), ('comparison', comparison)):
+        samples, outputs = _time(fn, iterations, warmup=1)
+        results[name] = {
+            'p50_ms': statistics.median(samples),
+            'bytes': sum(len(pdf) for pdf in outputs),
+            'pages': sum(len(_PAGE.findall(pdf)) for pdf in outputs),
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--units', default='3,5,10', help='Comma-separated unit counts (default: 3,5,10)')
+    parser.add_argument('--product', default='vertical', help='Form fixture: vertical, house_and_lot, lot')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed runs per case (default: 5)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    from app import create_app
+    app = create_app('development')
+
+    print(f"{'units':>5} {'mode':<11} {'p50 ms':>9} {'bytes':>9} {'pages':>6}")
+    with app.app_context():
+        for count in (int(value) for value in args.units.split(',')):
+            results = measure(args.product, count, args.iterations)
+            for mode, row in results.items():
+                print(f"{count:>5} {mode:<11} {row['p50_ms']:>9.1f} {row['bytes']:>9} {row['pages']:>6}")
+            ratio = results['comparison']['bytes'] / results['separate']['bytes']
+            speedup = results['separate']['p50_ms'] / results['comparison']['p50_ms']
+            print(f"{'':>5} comparison is {ratio:.0%} of the size, {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
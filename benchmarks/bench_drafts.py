@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare a full proposal submission against regenerating it from a draft.
+
+Submits the form with its photos to /generate-proposal (upload, image
+processing, computations and PDF), then saves the same form and photos as a
+draft and times /api/drafts/<id>/generate, which reuses the processed
+picture. Reports median
+milliseconds per request; request bytes show what each retry sends.
+
+Usage:
+    python -m benchmarks.bench_drafts
+    python -m benchmarks.bench_drafts --images 4 --resolution large --iterations 10
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.bench_pipeline import _time  # noqa: E402
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--product', default='house_and_lot', help='Form fixture: vertical, house_and_lot, lot')
+    parser.add_argument('--images', type=int, default=4, help='Photos per submission (default: 4)')
+    parser.add_argument('--resolution', default='large', help='small, medium or large (default: large)')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed runs per case (default: 5)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Config is read at import, so point it at scratch storage first
+        os.environ.update({
+            'DRAFTS_ENABLED': 'true',
+            'DRAFTS_DB_PATH': os.path.join(tmp, 'drafts.sqlite3'),
+            'STORAGE_BACKEND': 'memory',
+        })
+        from app import create_app
+        from benchmarks.fixtures import FORMS, make_images
+
+        app = create_app('development')
+        client = app.test_client()
+        form = FORMS[args.product]
+        images = make_images(args.images, args.resolution)
+        upload_bytes = sum(len(data) for _, data in images)
+
+        def submit():
+            data = dict(form, pictures=[(io.BytesIO(content), name) for name, content in images])
+            response = client.post('/generate-proposal', data=data, content_type='multipart/form-data')
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response.data
+
+        draft = client.post('/api/drafts', json={'fields': form}).get_json()['data']
+        draft_id, headers = draft['id'], {'X-Draft-Token': draft['token']}
+        response = client.put(
+            f'/api/drafts/{draft_id}/pictures',
+            data={'pictures': [(io.BytesIO(content), name) for name, content in images]},
+            content_type='multipart/form-data', headers=headers
+        )
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+        def regenerate():
+            response = client.post(f'/api/drafts/{draft_id}/generate', headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response.data
+
+        print(f"{args.product}, {args.images} x {args.resolution} photos ({upload_bytes / 1024:.0f} KB)")
+        print(f"{'mode':<22} {'p50 ms':>9} {'sent bytes':>11} {'pdf bytes':>10}")
+        results = {}
+        for mode, fn, sent in (('full submission', submit, upload_bytes), ('regenerate from draft', regenerate, 0)):
+            samples, pdf = _time(fn, args.iterations, warmup=1)
+            results[mode] = statistics.median(samples)
+            print(f"{mode:<22} {results[mode]:>9.1f} {sent:>11} {len(pdf):>10}")
+        speedup = results['full submission'] / results['regenerate from draft']
+        print(f"regenerating from the draft is {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure worker start-up: app import and creation, preload/warm-up, and first requests.
+
+Each run starts a fresh interpreter, times ``create_app()``, lists which heavy
+libraries are already loaded, then times the first GET /, the first
+/api/compute and the first /generate-proposal. Runs that are lazy, that call
+``app.warmup.preload()`` and that call ``app.warmup.warm_up()`` show where
+the cold-start cost moves.
+
+Usage:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('lazy', 'preload', 'warm_up')
+
+# Runs in the child interpreter; prints one JSON line
+_CHILD = r'''
+import json, logging, sys, time
+logging.disable(logging.INFO)
+started = time.perf_counter()
+from app import create_app
+app = create_app('development')
+timings = {'create_app_ms': (time.perf_counter() - started) * 1000}
+heavy = [name for name in ('reportlab.platypus', 'PIL.Image') if name in sys.modules]
+
+if MODE == 'preload':
+    from app.warmup import preload
+    timings['startup_ms'] = preload() * 1000
+elif MODE == 'warm_up':
+    from app.warmup import warm_up
+    timings['startup_ms'] = warm_up(app) * 1000
+
+from benchmarks.fixtures import FORMS
+client = app.test_client()
+for label, call in (
+    ('first_index_ms', lambda: client.get('/')),
+    ('first_compute_ms', lambda: client.post('/api/compute', json={
+        'type': 'spot_cash', 'tcp': 4850000, 'discount': 10, 'reservation_fee': 25000,
+        'registration_fee_percent': 5, 'move_in_fee_percent': 2})),
+    ('first_proposal_ms', lambda: client.post('/generate-proposal', data=dict(FORMS['vertical']))),
+):
+    start = time.perf_counter()
+    response = call()
+    timings[label] = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, (label, response.status_code)
+    response.close()
+print(json.dumps({'timings': timings, 'heavy_at_startup': heavy}))
+'''
+
+
+def run_once(mode: str) -> Dict:
+    """Start a fresh interpreter and return its timings."""
+    code = f"MODE = {mode!r}\n{_CHILD}"
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=BASE_DIR, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per mode (default: 5)')
+    args = parser.parse_args(argv)
+
+    columns = ('create_app_ms', 'startup_ms', 'first_index_ms', 'first_compute_ms', 'first_proposal_ms')
+    print(f"{'mode':<10} " + ' '.join(f"{column[:-3]:>16}" for column in columns) + '  loaded at start-up')
+    for mode in MODES:
+        runs = [run_once(mode) for _ in range(args.runs)]
+        medians = {
+            column: statistics.median(run['timings'][column] for run in runs)
+            for column in columns if column in runs[0]['timings']
+        }
+        cells = ' '.join(f"{medians[column]:>16.1f}" if column in medians else f"{'-':>16}" for column in columns)
+        heavy = ', '.join(runs[0]['heavy_at_startup']) or 'none'
+        print(f"{mode:<10} {cells}  {heavy}")
+    print(f"\nMedian milliseconds over {args.runs} fresh interpreter(s) per mode")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Check peak memory of a proposal with four 12-megapixel photos.
+
+Posts four 4000x3000 JPEGs to /generate-proposal through the Flask test
+client with MEMORY_PROFILING_ENABLED, in a fresh process, and prints the
+traced peak per phase plus the growth of the process's peak RSS. Pillow's
+pixel buffers are not visible to tracemalloc, so the RSS figure is the one
+that predicts OOM kills.
+
+Usage:
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --max-rss-mb 300 --max-traced-mb 32
+
+Exits with status 1 when either peak exceeds its budget. The same budgets
+are enforced by tests/test_memory_budget.py.
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.bench_pipeline import peak_rss_mb  # noqa: E402
+
+IMAGE_COUNT = 4
+RESOLUTION = 'large'  # 4000x3000 = 12 MP
+
+# Default budgets (MB) for the request's peak RSS growth and tracemalloc peak
+MAX_RSS_MB = 250
+MAX_TRACED_MB = 16
+
+
+def measure(product: str) -> Dict:
+    """Run one 4x12MP proposal and return its memory record (runs in a child process)."""
+    os.environ['MEMORY_PROFILING_ENABLED'] = 'true'
+    logging.disable(logging.INFO)
+    from app import create_app
+    from app.utils.memory import recent_requests
+    from benchmarks.fixtures import FORMS, make_images
+
+    images = make_images(IMAGE_COUNT, RESOLUTION)
+    app = create_app('development')
+    client = app.test_client()
+
+    def post(photos):
+        data = dict(FORMS[product])
+        data['pictures'] = [(io.BytesIO(raw), name) for name, raw in photos]
+        response = client.post('/generate-proposal', data=data, content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"Route returned {response.status_code}")
+        response.close()
+
+    # Load fonts, codecs and caches first so only the request itself is measured
+    post(images[:1])
+    rss_before = peak_rss_mb()
+    post(images)
+    rss_after = peak_rss_mb()
+
+    record = recent_requests()[0]
+    record['rss_growth_mb'] = round(rss_after - rss_before, 1) if rss_before is not None else None
+    record['upload_mb'] = round(sum(len(raw) for _, raw in images) / (1024 * 1024), 1)
+    return record
+
+
+def _worker(queue, product: str) -> None:
+    try:
+        queue.put(('ok', measure(product)))
+    except Exception as e:  # Report failures instead of hanging the parent
+        queue.put(('error', f"{type(e).__name__}: {e}"))
+
+
+def measure_in_child(product: str = 'house_and_lot') -> Dict:
+    """
+    Run measure() in a fresh process, so the peak RSS belongs to this request only.
+
+    Raises:
+        RuntimeError: If the proposal could not be generated
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_worker, args=(queue, product))
+    process.start()
+    status, record = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError(record)
+    return record
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--product', default='house_and_lot', help='Form fixture: vertical, house_and_lot, lot')
+    parser.add_argument('--max-rss-mb', type=float, default=MAX_RSS_MB,
+                        help=f'Budget for peak RSS growth during the request (default: {MAX_RSS_MB})')
+    parser.add_argument('--max-traced-mb', type=float, default=MAX_TRACED_MB,
+                        help=f'Budget for the tracemalloc peak of the request (default: {MAX_TRACED_MB})')
+    parser.add_argument('--json', action='store_true', help='Print the full memory record as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        record = measure_in_child(args.product)
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    if args.json:
+        print(json.dumps(record, indent=2))
+    print(f"{IMAGE_COUNT} x 12MP upload ({record['upload_mb']} MB), product={args.product}")
+    print(f"{'phase':<10} {'traced peak MB':>15} {'retained MB':>12} {'RSS MB':>8}")
+    for item in record['phases']:
+        print(f"{item['phase']:<10} {item['peak_mb']:>15.2f} {item['retained_mb']:>12.2f} {item['rss_mb'] or 0:>8.1f}")
+    print(f"\nTraced peak: {record['peak_mb']} MB (budget {args.max_traced_mb} MB)")
+    print(f"Peak RSS growth: {record['rss_growth_mb']} MB (budget {args.max_rss_mb} MB)")
+
+    failures = []
+    if record['peak_mb'] > args.max_traced_mb:
+        failures.append('traced peak')
+    if record['rss_growth_mb'] is not None and record['rss_growth_mb'] > args.max_rss_mb:
+        failures.append('peak RSS growth')
+    if failures:
+        print(f"Over budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
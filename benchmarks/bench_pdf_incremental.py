@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Time proposals for many clients of one unit: full layout against cached layouts.
+
+For each form fixture (with a photo collage), renders the same unit's
+proposal for N clients twice: with PDFService laying out every proposal,
+and with a layout cache, where the first client lays the proposal out and
+the others only get their date and client table drawn over it. Reports
+median milliseconds per proposal and PDF sizes.
+
+Usage:
+    python -m benchmarks.bench_pdf_incremental
+    python -m benchmarks.bench_pdf_incremental --clients 50 --images 4
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=20, help='Clients per unit (default: 20)')
+    parser.add_argument('--images', type=int, default=3, help='Photos in the collage (default: 3)')
+    parser.add_argument('--resolution', default='large', help='small, medium or large (default: large)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    from werkzeug.datastructures import FileStorage
+
+    from app import create_app
+    from app.services.image_service import ImageService
+    from app.services.pdf_layouts import LayoutCache
+    from app.services.pdf_service import PDFService
+    from app.services.proposal_service import ProposalService
+    from app.services.storage import MemoryStorage
+    from benchmarks.fixtures import FORMS, make_images
+
+    app = create_app('development')
+    pictures = MemoryStorage()
+    images = make_images(args.images, args.resolution)
+
+    print(f"{'form':<14} {'mode':<8} {'first ms':>9} {'p50 ms':>8} {'KB':>7}")
+    with app.app_context():
+        picture_key = ImageService(storage=pictures).process_uploaded_images(
+            [FileStorage(stream=io.BytesIO(content), filename=name) for name, content in images]
+        )
+        for product, form in FORMS.items():
+            proposals = [
+                ProposalService().build(dict(
+                    form, client_name=f"Client {i}", email=f"client{i}@example.com", contact_no=f"0917 555 {i:04d}"
+                ), picture_key)
+                for i in range(args.clients)
+            ]
+            medians = {}
+            for mode, layouts in (('full', None), ('cached', LayoutCache())):
+                pdf_service = PDFService(storage=MemoryStorage(), picture_storage=pictures, layouts=layouts)
+                samples, sizes = [], []
+                for proposal in proposals:
+                    buffer = io.BytesIO()
+                    start = time.perf_counter()
+                    pdf_service.render(proposal, buffer)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    sizes.append(buffer.tell())
+                medians[mode] = statistics.median(samples[1:])
+                print(f"{product:<14} {mode:<8} {samples[0]:>9.1f} {medians[mode]:>8.2f} "
+                      f"{statistics.median(sizes) / 1024:>7.1f}")
+            print(f"{'':<14} cached layouts are {medians['full'] / medians['cached']:.0f}x faster per client")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
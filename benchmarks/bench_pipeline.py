@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Benchmark the proposal pipeline stage by stage and end to end.
+
+Runs every (product, image count, resolution) case from benchmarks.fixtures
+through four stages -- ``images`` (ImageService collage), ``compute``
+(ProposalService), ``pdf`` (PDFService) and ``route`` (POST /generate-proposal
+through the Flask test client) -- and records latency percentiles, peak RSS
+and output size. Each case runs in its own process so peak RSS is not
+polluted by earlier cases.
+
+Usage:
+    python -m benchmarks.bench_pipeline                      # full matrix
+    python -m benchmarks.bench_pipeline --quick              # small smoke matrix
+    python -m benchmarks.bench_pipeline --save-baseline      # record a baseline
+    python -m benchmarks.bench_pipeline --baseline benchmarks/results/baseline.json --threshold 0.2
+
+Exits with status 1 when any stage's p50 latency, peak RSS or output size
+regresses past the threshold relative to the baseline.
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+STAGES = ('images', 'compute', 'pdf', 'route')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _file_storages(images: List[Tuple[str, bytes]]):
+    """Wrap encoded images in fresh FileStorage objects, as Flask would."""
+    from werkzeug.datastructures import FileStorage
+
+    return [
+        FileStorage(stream=io.BytesIO(data), filename=name, content_type='image/jpeg')
+        for name, data in images
+    ]
+
+
+def _time(fn: Callable[[], Any], iterations: int, warmup: int) -> Tuple[List[float], Any]:
+    """Call ``fn`` repeatedly and return per-call milliseconds and the last result."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, result
+
+
+def _summarize(samples: List[float], output_bytes: Optional[int]) -> Dict[str, Any]:
+    return {
+        'iterations': len(samples),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p90_ms': round(percentile(samples, 90), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'output_bytes': output_bytes,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_stage(product: str, image_count: int, resolution: str, stage: str,
+              iterations: int, warmup: int) -> Dict[str, Any]:
+    """Benchmark one stage of one case (runs inside a child process)."""
+    logging.disable(logging.INFO)
+    from app import create_app
+    from app.services.image_service import ImageService
+    from app.services.pdf_service import PDFService
+    from app.services.proposal_service import ProposalService
+    from benchmarks.fixtures import FORMS, make_images
+
+    form = FORMS[product]
+    images = make_images(image_count, resolution) if image_count else []
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+    app = create_app('development')
+
+    try:
+        with app.app_context():
+            picture_key = None
+            if images:
+                picture_key = ImageService(work_dir).process_uploaded_images(_file_storages(images))
+
+            if stage == 'images':
+                def images_stage():
+                    path = os.path.join(work_dir, ImageService(work_dir).process_uploaded_images(_file_storages(images)))
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    return size
+                samples, size = _time(images_stage, iterations, warmup)
+
+            elif stage == 'compute':
+                samples, _ = _time(lambda: ProposalService().build(form, picture_key), iterations, warmup)
+                size = None
+
+            elif stage == 'pdf':
+                proposal = ProposalService().build(form, picture_key)
+
+                def pdf_stage():
+                    path = os.path.join(work_dir, PDFService(work_dir).generate_proposal(proposal))
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    return size
+                samples, size = _time(pdf_stage, iterations, warmup)
+
+            else:  # route
+                client = app.test_client()
+
+                def route_stage():
+                    data = dict(form)
+                    data['pictures'] = [(io.BytesIO(raw), name) for name, raw in images]
+                    response = client.post('/generate-proposal', data=data, content_type='multipart/form-data')
+                    if response.status_code != 200:
+                        raise RuntimeError(f"Route returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+                    size = len(response.get_data())
+                    response.close()
+                    return size
+                samples, size = _time(route_stage, iterations, warmup)
+
+        return _summarize(samples, size)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _stage_worker(queue, *args) -> None:
+    try:
+        queue.put(('ok', run_stage(*args)))
+    except Exception as e:  # Report failures instead of hanging the parent
+        queue.put(('error', f"{type(e).__name__}: {e}"))
+
+
+def run_isolated(*args) -> Dict[str, Any]:
+    """Run a stage in a fresh process and return its summary."""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_stage_worker, args=(queue, *args))
+    process.start()
+    status, payload = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError(payload)
+    return payload
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    List regressions of ``results`` against ``baseline``.
+
+    Latency regresses when p50 grows by more than ``threshold`` (fractional)
+    and by at least ``min_delta_ms``; peak RSS and output size regress when
+    they grow by more than ``threshold``.
+    """
+    previous = {(r['case'], r['stage']): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['case'], result['stage']))
+        if before is None:
+            continue
+        label = f"{result['case']} [{result['stage']}]"
+
+        old, new = before['p50_ms'], result['p50_ms']
+        if new > old * (1 + threshold) and new - old >= min_delta_ms:
+            regressions.append(f"{label}: p50 {old:.1f}ms -> {new:.1f}ms (+{(new / old - 1) * 100:.0f}%)")
+
+        for key, unit in (('peak_rss_mb', 'MB'), ('output_bytes', 'B')):
+            old, new = before.get(key), result.get(key)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{label}: {key} {old}{unit} -> {new}{unit} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    from benchmarks.fixtures import cases
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=5, help='Timed runs per stage (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per stage (default: 1)')
+    parser.add_argument('--quick', action='store_true', help='Only 0 and 2 small images, fewer iterations')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated stages to run')
+    parser.add_argument('--product', action='append', help='Limit to product(s): vertical, house_and_lot, lot')
+    parser.add_argument('--output', help='Where to write results JSON (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='Baseline results JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write results to benchmarks/results/baseline.json')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed fractional regression (default: 0.2)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore latency changes smaller than this')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+    if args.quick:
+        matrix = cases(image_counts=(0, 2), resolutions=('small',))
+        args.iterations = min(args.iterations, 3)
+    else:
+        matrix = cases()
+    if args.product:
+        matrix = [case for case in matrix if case[0] in args.product]
+
+    results = []
+    print(f"{'case':<30} {'stage':<8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'bytes':>10}")
+    for product, image_count, resolution in matrix:
+        case = f"{product}/{image_count}img/{resolution}"
+        for stage in stages:
+            if stage == 'images' and image_count == 0:
+                continue
+            summary = run_isolated(product, image_count, resolution, stage, args.iterations, args.warmup)
+            summary.update(case=case, stage=stage)
+            results.append(summary)
+            print(f"{case:<30} {stage:<8} {summary['p50_ms']:>9.1f} {summary['p90_ms']:>9.1f} "
+                  f"{summary['p99_ms']:>9.1f} {summary['peak_rss_mb'] or 0:>8.1f} {summary['output_bytes'] or 0:>10}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+        },
+        'results': results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        shutil.copyfile(output, os.path.join(RESULTS_DIR, 'baseline.json'))
+        print(f"Baseline saved to {os.path.join(RESULTS_DIR, 'baseline.json')}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as handle:
+            baseline = json.load(handle)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Hold many slow uploads open and measure what they cost the server.
+
+Starts the app under Werkzeug's threaded WSGI server or under uvicorn through
+asgi.py (ASGI mode), opens N connections that each send only the start of a
+proposal upload, and then measures:
+
+- the server's thread count while the uploads trickle;
+- the latency of /api/compute calls made meanwhile;
+- how many of the uploads complete once the rest of their bodies is sent.
+
+Linux only (thread counts come from /proc). The ASGI mode needs uvicorn.
+
+Usage:
+    python -m benchmarks.bench_slow_clients
+    python -m benchmarks.bench_slow_clients --clients 200 --threads 4 --servers asgi
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.loadtest import _free_port, encode_multipart, start_server  # noqa: E402
+
+COMPUTE_BODY = json.dumps({'type': 'spot_cash', 'tcp': 4850000, 'discount': 10, 'reservation_fee': 25000}).encode()
+
+
+def start_asgi_server(port: int, threads: int) -> subprocess.Popen:
+    """Start uvicorn on asgi.py in a child process and wait until it accepts connections."""
+    env = dict(os.environ, FLASK_ENV='development', ASGI_THREADS=str(threads), INFLIGHT_DEDUP_ENABLED='false')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port), '--log-level', 'warning'],
+        cwd=BASE_DIR, env=env
+    )
+    for _ in range(100):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+def thread_count(pid: int) -> int:
+    """Threads of a process, from /proc."""
+    with open(f'/proc/{pid}/status') as fh:
+        for line in fh:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(port: int, pid: int, clients: int, body: bytes, content_type: str, head: int) -> Dict[str, float]:
+    """Open slow uploads, time compute calls meanwhile, then let the uploads finish."""
+    idle_threads = thread_count(pid)
+    connections = []
+    for _ in range(clients):
+        conn = socket.create_connection(('127.0.0.1', port))
+        conn.sendall(
+            f'POST /generate-proposal HTTP/1.1\r\nHost: localhost\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body[:head]
+        )
+        connections.append(conn)
+    time.sleep(1)
+    busy_threads = thread_count(pid)
+
+    samples = []
+    for _ in range(10):
+        start = time.perf_counter()
+        request = urllib.request.Request(
+            f'http://127.0.0.1:{port}/api/compute', data=COMPUTE_BODY, headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    completed = 0
+    for conn in connections:
+        conn.sendall(body[head:])
+    for conn in connections:
+        conn.settimeout(60)
+        status = conn.recv(12)
+        while conn.recv(65536):
+            pass
+        conn.close()
+        completed += status.startswith(b'HTTP/1.1 200')
+
+    return {
+        'idle_threads': idle_threads,
+        'busy_threads': busy_threads,
+        'compute_p50_ms': statistics.median(samples),
+        'completed': completed,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=50, help='Slow uploads held open (default: 50)')
+    parser.add_argument('--threads', type=int, default=2, help='ASGI_THREADS for the ASGI server (default: 2)')
+    parser.add_argument('--servers', default='wsgi,asgi', help='Comma-separated: wsgi, asgi (default: both)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    from benchmarks.fixtures import FORMS, make_images
+
+    images = [('pictures', name, data) for name, data in make_images(2, 'small')]
+    body, content_type = encode_multipart(FORMS['house_and_lot'], images)
+    head = len(body) // 10
+
+    print(f"{args.clients} slow uploads of {len(body) / 1024:.0f} KB")
+    print(f"{'server':<7} {'idle thr':>9} {'busy thr':>9} {'compute p50 ms':>15} {'completed':>10}")
+    for name in args.servers.split(','):
+        port = _free_port()
+        server = start_asgi_server(port, args.threads) if name == 'asgi' else start_server(port, 1)
+        try:
+            row = measure(port, server.pid, args.clients, body, content_type, head)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:<7} {row['idle_threads']:>9} {row['busy_threads']:>9} "
+              f"{row['compute_p50_ms']:>15.1f} {row['completed']:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
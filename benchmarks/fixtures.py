@@ -0,0 +1,122 @@
+"""Deterministic proposal and image fixtures shared by the benchmarks."""
+import io
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+# Image resolutions used by the benchmark cases (width, height)
+RESOLUTIONS = {
+    'small': (1024, 768),
+    'medium': (2048, 1536),
+    'large': (4000, 3000),  # ~12MP phone photo
+}
+
+_COMMON_FORM = {
+    'client_name': 'Juan Dela Cruz',
+    'email': 'juan.delacruz@example.com',
+    'contact_no': '0917 123 4567',
+    'tcp': '4850000',
+    'reservation_fee': '25000',
+    'registration_fee_percent': '5',
+    'move_in_fee_percent': '2',
+    'use_tlp_toggle': 'on',
+    'show_spot_cash': 'true',
+    'spot_cash_discount': '10',
+    'show_deferred_payment': 'true',
+    'deferred_term1': '12',
+    'deferred_term2': '24',
+    'deferred_term3': '36',
+    'show_spot_down_payment': 'true',
+    'spot_down_discount': '5',
+    'show_20_80_payment': 'true',
+    'payment_20_80_term1': '12',
+    'payment_20_80_term2': '18',
+    'payment_20_80_term3': '24',
+    'show_balance_5yr': 'true',
+    'show_balance_7yr': 'true',
+    'show_balance_10yr': 'true',
+}
+
+FORMS: Dict[str, Dict[str, str]] = {
+    'vertical': {
+        **_COMMON_FORM,
+        'product_type': 'Vertical',
+        'project_type': 'High Rise Building',
+        'brand': 'The Grand Series',
+        'address': 'Ortigas Center, Pasig City',
+        'property_details_vertical': '1 Bedroom with balcony',
+        'tower_building': 'Tower 2',
+        'floor_unit': '23F / Unit 2308',
+        'floor_area': '42.5 sqm',
+        'project_advantages': 'Walking distance to malls\nNear business district\nAmenity deck with pool',
+    },
+    'house_and_lot': {
+        **_COMMON_FORM,
+        'product_type': 'Horizontal',
+        'project_type': 'House and Lot',
+        'brand': 'Metro Gate',
+        'address': 'Silang, Cavite',
+        'phase': 'Phase 3',
+        'block_lot': 'Block 12 Lot 7',
+        'house_model': 'Ella',
+        'property_details': '3 Bedrooms, 2 T&B',
+        'lot_area': '120 sqm',
+        'floor_area': '86 sqm',
+        'project_advantages_horiz': 'Gated community\nClubhouse and parks\nNear schools',
+    },
+    'lot': {
+        **_COMMON_FORM,
+        'product_type': 'Horizontal',
+        'project_type': 'Lot Only',
+        'brand': 'Heritage',
+        'address': 'Lipa, Batangas',
+        'phase': 'Phase 1',
+        'block_lot': 'Block 4 Lot 19',
+        'lot_area': '200 sqm',
+        'tcp': '3200000',
+        'project_advantages_horiz': 'Corner lot\nNear main road',
+    },
+}
+
+
+def make_image(resolution: str, seed: int = 0, fmt: str = 'JPEG') -> bytes:
+    """
+    Render a deterministic photo-like image and encode it.
+
+    A Mandelbrot render compresses like a real photo far better than a flat
+    color, so decode and collage costs are realistic.
+
+    Args:
+        resolution: Key of RESOLUTIONS
+        seed: Varies the rendered region so images in one case differ
+        fmt: Pillow format name to encode with
+    """
+    width, height = RESOLUTIONS[resolution]
+    extent = (-2.0 + 0.05 * seed, -1.2, 1.0 + 0.05 * seed, 1.2)
+    gray = Image.effect_mandelbrot((width, height), extent, 64)
+    image = Image.merge('RGB', (gray, gray.point(lambda v: 255 - v), gray.point(lambda v: (v * 3) % 256)))
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
+
+
+def make_images(count: int, resolution: str) -> List[Tuple[str, bytes]]:
+    """Build ``count`` named, encoded images at one resolution."""
+    return [(f'photo_{i + 1}.jpg', make_image(resolution, seed=i)) for i in range(count)]
+
+
+def cases(image_counts=(0, 1, 2, 3, 4), resolutions=('small', 'large')) -> List[Tuple[str, int, str]]:
+    """
+    Enumerate (product, image count, resolution) benchmark cases.
+
+    Cases without images are listed once per product with resolution '-'.
+    """
+    result = []
+    for product in FORMS:
+        for count in image_counts:
+            if count == 0:
+                result.append((product, 0, '-'))
+                continue
+            for resolution in resolutions:
+                result.append((product, count, resolution))
+    return result
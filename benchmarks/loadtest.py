@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Launch-day load test for the proposal generator.
+
+Starts the app locally (or targets --url), then replays a mix of /api/compute
+previews and multipart /generate-proposal submissions with photos at one or
+more concurrency levels. For each level it reports throughput, latency
+percentiles per request kind and error rate, and it samples server memory
+once per second, so the saturation point shows up as the level where
+throughput stops growing while tail latency climbs.
+
+Only the standard library (plus the app's own dependencies) is used.
+
+Usage:
+    python -m benchmarks.loadtest --concurrency 10,50,100 --duration 30
+    python -m benchmarks.loadtest --processes 4 --mix compute=0.7,proposal=0.3
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --server-pid 1234
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.bench_pipeline import RESULTS_DIR, percentile  # noqa: E402
+from benchmarks.fixtures import FORMS, make_image  # noqa: E402
+
+COMPUTE_PAYLOADS = [
+    {'type': 'spot_cash', 'tcp': 4850000, 'discount': 10, 'reservation_fee': 25000,
+     'registration_fee_percent': 5, 'move_in_fee_percent': 2},
+    {'type': 'spot_down_payment', 'tcp': 3200000, 'discount': 5, 'reservation_fee': 20000,
+     'registration_fee_percent': 5, 'move_in_fee_percent': 2},
+    {'type': 'deferred_payment', 'tcp': 2750000, 'reservation_fee': 20000,
+     'registration_fee_percent': 5, 'move_in_fee_percent': 2, 'terms': [12, 24, 36]},
+    {'type': '20_80_payment', 'tcp': 6100000, 'reservation_fee': 50000,
+     'registration_fee_percent': 5, 'move_in_fee_percent': 2, 'terms': [12, 18, 24]},
+    {'type': '80_balance', 'tcp': 6100000, 'years': 7, 'rate': 13},
+]
+
+
+def encode_multipart(fields: Dict[str, str], files: List[Tuple[str, str, bytes]]) -> Tuple[bytes, str]:
+    """Encode form fields and (field, filename, bytes) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        )
+    for field, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'.encode('utf-8') + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class RequestFactory:
+    """Builds the request mix; proposal bodies are encoded once up front."""
+
+    def __init__(self, mix: Dict[str, float], resolution: str, seed: int = 0):
+        self.random = random.Random(seed)
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        photos = [make_image(resolution, seed=i) for i in range(4)]
+        self.proposals = []
+        for product, form in FORMS.items():
+            for count in range(5):  # 0-4 photos
+                files = [('pictures', f'photo_{i + 1}.jpg', photos[i]) for i in range(count)]
+                self.proposals.append(encode_multipart(form, files))
+
+    def next(self, base_url: str) -> Tuple[str, urllib.request.Request]:
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        if kind == 'compute':
+            payload = json.dumps(self.random.choice(COMPUTE_PAYLOADS)).encode('utf-8')
+            request = urllib.request.Request(
+                f'{base_url}/api/compute', data=payload, headers={'Content-Type': 'application/json'}
+            )
+        else:
+            body, content_type = self.random.choice(self.proposals)
+            request = urllib.request.Request(
+                f'{base_url}/generate-proposal', data=body, headers={'Content-Type': content_type}
+            )
+        return kind, request
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and its children in MB (Linux /proc; None elsewhere)."""
+    total_kb = 0
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as handle:
+            pids += [int(child) for child in handle.read().split()]
+    except OSError:
+        pass
+    for process_id in pids:
+        try:
+            with open(f'/proc/{process_id}/status', 'r') as handle:
+                for line in handle:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            if process_id == pid:
+                return None
+    return round(total_kb / 1024, 1)
+
+
+def run_level(base_url: str, factory: RequestFactory, concurrency: int, duration: float,
+              timeout: float, server_pid: Optional[int]) -> Dict:
+    """Drive one concurrency level for ``duration`` seconds."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    memory: List[Tuple[float, Optional[float]]] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+
+    def worker():
+        while time.monotonic() < deadline:
+            with lock:
+                kind, request = factory.next(base_url)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, socket.timeout, ConnectionError):
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        if server_pid:
+            memory.append((round(time.monotonic() - started, 1), rss_mb(server_pid)))
+        time.sleep(1)
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+
+    kinds = {}
+    total_ok = total_errors = 0
+    for kind in set(latencies) | set(errors):
+        samples = latencies.get(kind, [])
+        total_ok += len(samples)
+        total_errors += errors.get(kind, 0)
+        kinds[kind] = {
+            'ok': len(samples),
+            'errors': errors.get(kind, 0),
+            'p50_ms': round(percentile(samples, 50), 1) if samples else None,
+            'p95_ms': round(percentile(samples, 95), 1) if samples else None,
+            'p99_ms': round(percentile(samples, 99), 1) if samples else None,
+        }
+    attempts = total_ok + total_errors
+    rss_values = [value for _, value in memory if value is not None]
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(wall, 1),
+        'throughput_rps': round(total_ok / wall, 2),
+        'error_rate': round(total_errors / attempts, 4) if attempts else 0,
+        'kinds': kinds,
+        'server_rss_mb': memory,
+        'server_rss_peak_mb': max(rss_values) if rss_values else None,
+    }
+
+
+def start_server(port: int, processes: int) -> subprocess.Popen:
+    """Start the app with Werkzeug's server in a child process and wait until it accepts connections."""
+    code = (
+        "import logging, sys; sys.path.insert(0, %r); logging.disable(logging.INFO)\n"
+        "from werkzeug.serving import run_simple\n"
+        "from run import app\n"
+        "run_simple('127.0.0.1', %d, app, threaded=%r, processes=%d)\n"
+    ) % (BASE_DIR, port, processes == 1, processes)
+    # The mix repeats a few proposals; build each one rather than share concurrent builds
+    env = dict(os.environ, INFLIGHT_DEDUP_ENABLED='false')
+    server = subprocess.Popen([sys.executable, '-c', code], cwd=BASE_DIR, env=env)
+    for _ in range(100):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in ('compute', 'proposal'):
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='PID to sample memory from when using --url')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Worker processes for the local server (1 = threaded, default: 1)')
+    parser.add_argument('--concurrency', default='5,20,50', help='Comma-separated client concurrency levels')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency level (default: 20)')
+    parser.add_argument('--mix', type=_parse_mix, default=_parse_mix('compute=0.8,proposal=0.2'),
+                        help='Request mix weights (default: compute=0.8,proposal=0.2)')
+    parser.add_argument('--resolution', default='medium', help='Photo resolution: small, medium, large')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/loadtest_<timestamp>.json)')
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    print('Preparing request bodies...')
+    factory = RequestFactory(args.mix, args.resolution)
+
+    server = None
+    if args.url:
+        base_url, server_pid = args.url.rstrip('/'), args.server_pid
+    else:
+        port = _free_port()
+        server = start_server(port, args.processes)
+        base_url, server_pid = f'http://127.0.0.1:{port}', server.pid
+        print(f'Started local server at {base_url} (pid {server_pid}, {args.processes} process(es))')
+
+    results = []
+    try:
+        print(f"\n{'conc':>5} {'rps':>8} {'err%':>6} {'compute p50/p99 ms':>20} {'proposal p50/p99 ms':>21} {'peak RSS MB':>12}")
+        for level in levels:
+            result = run_level(base_url, factory, level, args.duration, args.timeout, server_pid)
+            results.append(result)
+            cells = []
+            for kind in ('compute', 'proposal'):
+                stats = result['kinds'].get(kind)
+                cells.append(f"{stats['p50_ms']}/{stats['p99_ms']}" if stats and stats['ok'] else '-')
+            print(f"{level:>5} {result['throughput_rps']:>8.1f} {result['error_rate'] * 100:>6.1f} "
+                  f"{cells[0]:>20} {cells[1]:>21} {result['server_rss_peak_mb'] or 0:>12.1f}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    best = max(results, key=lambda result: result['throughput_rps'])
+    print(f"\nPeak throughput {best['throughput_rps']} rps at concurrency {best['concurrency']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'target': base_url,
+                'processes': None if args.url else args.processes,
+                'mix': args.mix,
+                'resolution': args.resolution,
+                'duration_s': args.duration,
+            },
+            'levels': results,
+        }, handle, indent=2)
+    print(f'Results written to {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
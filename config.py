@@ -1,5 +1,6 @@
 """Configuration settings for the Flask application."""
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +17,141 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
+    # Uploads are checked as they stream in: magic bytes (non-images are skipped), per-file
+    # size and pixel count (413). Files above the spool threshold go to disk; formats Pillow's
+    # ImageFile.Parser decodes incrementally are decoded while they arrive.
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 12 * 1024 * 1024))  # 12MB
+    UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 512 * 1024))  # 512KB
+    UPLOAD_MAX_PIXELS = int(os.getenv('UPLOAD_MAX_PIXELS', 50_000_000))
+    UPLOAD_DECODE_WHILE_STREAMING = os.getenv('UPLOAD_DECODE_WHILE_STREAMING', 'true').lower() == 'true'
+    
+    # Where processed pictures (UPLOAD_FOLDER) and generated PDFs are kept: local | memory | s3.
+    # Local PDFs are served by the WSGI server's sendfile (direct), or handed to the front-end
+    # server with X-Sendfile (x-sendfile) or X-Accel-Redirect under STORAGE_ACCEL_PREFIX (x-accel);
+    # handed-off files are purged after STORAGE_HANDOFF_TTL seconds, so PROPOSAL_FOLDER must
+    # only hold generated PDFs.
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    PROPOSAL_FOLDER = os.getenv('PROPOSAL_FOLDER', os.path.join(tempfile.gettempdir(), 'realty-proposals'))
+    STORAGE_SERVE_MODE = os.getenv('STORAGE_SERVE_MODE', 'direct')
+    STORAGE_ACCEL_PREFIX = os.getenv('STORAGE_ACCEL_PREFIX', '/protected')
+    STORAGE_HANDOFF_TTL = float(os.getenv('STORAGE_HANDOFF_TTL', 300))
+    # S3-compatible backend (needs boto3); set the endpoint for MinIO or a local moto_server
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET')
+    STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')
+    STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION')
+    
+    # Pricing rules (factor rates, VAT, static terms) - re-read when the file changes
+    PRICING_RULES_PATH = os.getenv('PRICING_RULES_PATH', os.path.join(BASE_DIR, 'app', 'data', 'pricing_rules.json'))
+    PRICING_RULES_RELOAD_INTERVAL = float(os.getenv('PRICING_RULES_RELOAD_INTERVAL', 5))
+    
+    # Scenario sweeps (/api/sweep) - cap on grid points per request
+    SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 10000))
+    
+    # Unit comparisons (/generate-comparison) - most units in one PDF
+    COMPARISON_MAX_UNITS = int(os.getenv('COMPARISON_MAX_UNITS', 10))
+    
+    # Proposals that differ only in the client details share one layout: the PDF is laid out
+    # once with the date and client table blank, and each client's copy adds them as an
+    # incremental update. PDF_LAYOUT_CACHE_SIZE layouts are kept per process
+    PDF_INCREMENTAL_ENABLED = os.getenv('PDF_INCREMENTAL_ENABLED', 'false').lower() == 'true'
+    PDF_LAYOUT_CACHE_SIZE = int(os.getenv('PDF_LAYOUT_CACHE_SIZE', 32))
+    
+    # Static assets minified, fingerprinted and precompressed (gzip, plus brotli if installed) into
+    # app/static/dist at start-up and served with immutable caching; the index page is rendered once
+    ASSET_PIPELINE_ENABLED = os.getenv('ASSET_PIPELINE_ENABLED', 'true').lower() == 'true'
+    
+    # Responses of text types (JSON, HTML, ...) of at least RESPONSE_COMPRESSION_MIN_SIZE bytes are
+    # compressed with brotli (if installed) or gzip as they stream out
+    RESPONSE_COMPRESSION_ENABLED = os.getenv('RESPONSE_COMPRESSION_ENABLED', 'true').lower() == 'true'
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+    RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 6))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 5))
+    
+    # Installable offline mode: a service worker caches the form, the in-browser preview works
+    # without a connection, and proposals submitted offline are queued and sent on reconnect
+    PWA_ENABLED = os.getenv('PWA_ENABLED', 'true').lower() == 'true'
+    
+    # Form drafts autosaved as field diffs in a local SQLite file, with their processed photos,
+    # so regenerating from a draft does not upload or process the photos again; drafts
+    # untouched for DRAFT_TTL seconds are removed, and every DRAFT_SNAPSHOT_INTERVAL changes
+    # are folded into a snapshot. Each draft only opens with the token returned when it was created
+    DRAFTS_ENABLED = os.getenv('DRAFTS_ENABLED', 'true').lower() == 'true'
+    DRAFTS_DB_PATH = os.getenv('DRAFTS_DB_PATH', os.path.join(BASE_DIR, 'instance', 'drafts.sqlite3'))
+    DRAFT_TTL = float(os.getenv('DRAFT_TTL', 7 * 24 * 3600))
+    DRAFT_SNAPSHOT_INTERVAL = int(os.getenv('DRAFT_SNAPSHOT_INTERVAL', 50))
+    
+    # ASGI serving mode (asgi.py): request bodies up to UPLOAD_SPOOL_THRESHOLD are read and responses
+    # sent on an event loop; the app (upload parsing, images, PDFs) runs on ASGI_THREADS threads
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+    
+    # Admission control for the heavy endpoints (proposal, comparison and draft builds): each
+    # client (remote address, or the last value of ADMISSION_CLIENT_HEADER behind a proxy) gets
+    # ADMISSION_RATE builds per second in bursts of ADMISSION_BURST, at most
+    # ADMISSION_MAX_CONCURRENT builds run at once (a request waits up to ADMISSION_QUEUE_TIMEOUT
+    # seconds for a slot), and a repeated Idempotency-Key is refused while its first request runs.
+    # Rejections are 429/503 with Retry-After. Use the sqlite backend to share the limits between
+    # worker processes.
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'false').lower() == 'true'
+    ADMISSION_BACKEND = os.getenv('ADMISSION_BACKEND', 'memory')
+    ADMISSION_DB_PATH = os.getenv('ADMISSION_DB_PATH', os.path.join(BASE_DIR, 'instance', 'admission.sqlite3'))
+    ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', 0.5))
+    ADMISSION_BURST = float(os.getenv('ADMISSION_BURST', 5))
+    ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', os.cpu_count() or 2))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))
+    ADMISSION_SLOT_TTL = float(os.getenv('ADMISSION_SLOT_TTL', 300))
+    ADMISSION_RETRY_AFTER = float(os.getenv('ADMISSION_RETRY_AFTER', 2))
+    ADMISSION_CLIENT_HEADER = os.getenv('ADMISSION_CLIENT_HEADER')
+    
+    # A proposal or comparison submission with the same Idempotency-Key or the same inputs
+    # (fields and photo contents) as one still being built in this process waits for that
+    # build, up to INFLIGHT_WAIT_TIMEOUT seconds, and gets a copy of its response
+    INFLIGHT_DEDUP_ENABLED = os.getenv('INFLIGHT_DEDUP_ENABLED', 'true').lower() == 'true'
+    INFLIGHT_WAIT_TIMEOUT = float(os.getenv('INFLIGHT_WAIT_TIMEOUT', 120))
+    
+    # Archive of generated PDFs: each one is kept gzip-compressed in the 'archive' storage area
+    # (ARCHIVE_FOLDER with local storage) and indexed by client, project, unit, TCP and date in
+    # ARCHIVE_DB_PATH, so it can be found and downloaded again without rebuilding it
+    ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', 'false').lower() == 'true'
+    ARCHIVE_FOLDER = os.getenv('ARCHIVE_FOLDER', os.path.join(BASE_DIR, 'instance', 'archive'))
+    ARCHIVE_DB_PATH = os.getenv('ARCHIVE_DB_PATH', os.path.join(BASE_DIR, 'instance', 'archive.sqlite3'))
+    ARCHIVE_COMPRESSION_LEVEL = int(os.getenv('ARCHIVE_COMPRESSION_LEVEL', 6))
+    # ARCHIVE_FORMAT=objects keeps each PDF as a small record plus the objects (images, pages)
+    # of at least ARCHIVE_OBJECT_MIN_SIZE bytes it shares with other PDFs, stored once by
+    # content hash in ARCHIVE_OBJECTS_DB_PATH (a local SQLite file)
+    ARCHIVE_FORMAT = os.getenv('ARCHIVE_FORMAT', 'gzip')
+    ARCHIVE_OBJECTS_DB_PATH = os.getenv(
+        'ARCHIVE_OBJECTS_DB_PATH', os.path.join(BASE_DIR, 'instance', 'archive-objects.sqlite3')
+    )
+    ARCHIVE_OBJECT_MIN_SIZE = int(os.getenv('ARCHIVE_OBJECT_MIN_SIZE', 512))
+    ARCHIVE_PAGE_SIZE = int(os.getenv('ARCHIVE_PAGE_SIZE', 50))
+    # Bearer token required by the /api/archive endpoints; they answer 403 while it is unset
+    ARCHIVE_API_TOKEN = os.getenv('ARCHIVE_API_TOKEN', '')
+    
+    # Request-phase timing (Server-Timing headers, timing log lines, phase histogram in /metrics)
+    REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'false').lower() == 'true'
+    
+    # Prometheus metrics at /metrics; set the directory when running several worker processes
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+    PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    
+    # cProfile capture for slow (>= PROFILE_SLOW_MS, 0 = off) or sampled requests
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', 2000))
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+    
+    # tracemalloc peaks per request phase and /debug/memory; MEMORY_TOP_SITES > 0 also
+    # logs the top allocation sites of each phase (slow: about a second per phase)
+    MEMORY_PROFILING_ENABLED = os.getenv('MEMORY_PROFILING_ENABLED', 'false').lower() == 'true'
+    MEMORY_TOP_SITES = int(os.getenv('MEMORY_TOP_SITES', 0))
+    MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', 1))
+    
+    # Start-up work done by wsgi.py: import ReportLab/Pillow, and optionally also render a
+    # throwaway proposal so the first real one is not slowed by cold caches
+    PRELOAD_MODULES = os.getenv('PRELOAD_MODULES', 'true').lower() == 'true'
+    WARM_UP_ENABLED = os.getenv('WARM_UP_ENABLED', 'true').lower() == 'true'
+    
     # CSRF Protection
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
@@ -37,6 +173,8 @@ class DevelopmentConfig(Config):
     """Development configuration."""
     
     DEBUG = True
+    # Serve static files as edited, without rebuilding
+    ASSET_PIPELINE_ENABLED = os.getenv('ASSET_PIPELINE_ENABLED', 'false').lower() == 'true'
 
 
 class ProductionConfig(Config):
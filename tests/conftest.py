@@ -0,0 +1,7 @@
+"""Shared pytest setup: make the app and benchmark packages importable."""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
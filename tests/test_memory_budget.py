@@ -0,0 +1,20 @@
+"""Peak memory of a proposal with four 12-megapixel photos stays within budget."""
+import pytest
+
+from benchmarks.bench_memory import MAX_RSS_MB, MAX_TRACED_MB, measure_in_child
+
+
+@pytest.fixture(scope='module')
+def record():
+    """Memory record of one 4 x 12 MP /generate-proposal request, made in a fresh process."""
+    return measure_in_child('house_and_lot')
+
+
+def test_traced_peak_within_budget(record):
+    assert record['peak_mb'] <= MAX_TRACED_MB, record['phases']
+
+
+def test_rss_growth_within_budget(record):
+    if record['rss_growth_mb'] is None:
+        pytest.skip('Peak RSS is not available on this platform')
+    assert record['rss_growth_mb'] <= MAX_RSS_MB, record['phases']
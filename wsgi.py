@@ -19,3 +19,11 @@ from app import create_app
 
 application = create_app('production')
 
+# Load the PDF/image libraries (and warm their caches) once here so pre-fork workers share them
+if application.config['WARM_UP_ENABLED']:
+    from app.warmup import warm_up
+    warm_up(application)
+elif application.config['PRELOAD_MODULES']:
+    from app.warmup import preload
+    preload()
+